@@ -0,0 +1,35 @@
+"""Times finding blocks of consecutive free slots over a year of dates.
+
+Usage: python benchmarks/bench_blocks.py [--days 365] [--courts 40] [--k 3] [--repeat 5]
+"""
+
+import argparse
+import time
+
+from eversports_scraper import blocks, scraper
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--courts", type=int, default=40)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    grid = scraper.get_all_slots()
+    courts = list(range(1, args.courts + 1))
+    free = {slot: [c for c in courts if (i + c) % 5] for i, slot in enumerate(grid)}
+
+    best = float("inf")
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        for _ in range(args.days):
+            blocks.find_blocks(free, grid, args.k)
+        best = min(best, time.perf_counter() - started)
+    print(f"{args.days} days, {args.courts} courts, {len(grid)} slots per day")
+    print(f"find_blocks: {best * 1000:.1f}ms, {best / args.days * 1e6:.0f}us per day")
+
+
+if __name__ == "__main__":
+    main()
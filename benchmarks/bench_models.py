@@ -0,0 +1,124 @@
+"""Compares building day availabilities with the previous pydantic models and with the slotted dataclasses.
+
+Usage: python benchmarks/bench_models.py [--days 365] [--courts 12] [--repeat 5]
+"""
+
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+from datetime import date, timedelta
+from typing import Callable, Dict, List
+
+from pydantic import BaseModel
+
+from eversports_scraper import config, scraper
+
+FETCHED_AT = "2125-01-01T00:00:00+01:00"
+
+
+class LegacySlot(BaseModel):
+    time: str
+    courts: List[str]
+    court_ids: List[int]
+    is_new: bool
+
+
+class LegacyDayAvailability(BaseModel):
+    date: str
+    slots: List[LegacySlot]
+    new_count: int
+    free_slots_map: Dict[str, List[int]]
+
+
+def legacy_build(date_str: str, free_slots_map: Dict[str, List[int]], history: Dict) -> LegacyDayAvailability:
+    """The per-slot work of `get_day_availability` before the dataclass models."""
+    prev_free_slots_map = history.get(date_str, {})
+    slots_data = []
+    new_slots_count = 0
+    for slot in sorted(free_slots_map.keys()):
+        free_court_ids = sorted(free_slots_map[slot])
+        free_court_names = [config.COURT_MAPPING.get(cid, f"Unknown({cid})") for cid in free_court_ids]
+        prev_free_courts = set(prev_free_slots_map.get(slot, []))
+        is_new = bool(set(free_court_ids) - prev_free_courts)
+        if is_new:
+            new_slots_count += 1
+        slots_data.append(LegacySlot(time=slot, courts=free_court_names, court_ids=free_court_ids, is_new=is_new))
+    return LegacyDayAvailability(
+        date=date_str, slots=slots_data, new_count=new_slots_count, free_slots_map=free_slots_map
+    )
+
+
+def legacy_grid() -> List[str]:
+    opening, closing = config.DEFAULT_OPENING_HOURS
+    duration = config.SLOT_DURATION_MINUTES
+    start, end = scraper._minutes(opening), scraper._minutes(closing)
+    return [scraper._hhmm(m) for m in range(start, end - duration + 1, duration)]
+
+
+def make_inputs(days: int, courts: int):
+    rng = random.Random(0)
+    court_ids = list(range(1, courts + 1))
+    dates = [(date(2125, 1, 1) + timedelta(days=i)).isoformat() for i in range(days)]
+    grid = scraper.get_all_slots()
+    free = {d: {s: sorted(rng.sample(court_ids, rng.randint(1, courts))) for s in grid} for d in dates}
+    history = {d: {s: sorted(rng.sample(court_ids, rng.randint(0, courts))) for s in grid} for d in dates}
+    return court_ids, dates, free, history
+
+
+def measure(build: Callable[[], list], repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        build()
+        best = min(best, time.perf_counter() - started)
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    retained, peak = tracemalloc.get_traced_memory()[0] - before, tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    del result
+    return best, retained, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--courts", type=int, default=12)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    court_ids, dates, free, history = make_inputs(args.days, args.courts)
+    config.COURT_IDS = court_ids
+    config.COURT_MAPPING = {cid: f"Court {cid}" for cid in court_ids}
+    config.REPORT_BLOCK_SLOTS = 10**6  # Leave out the blocks, which the legacy models did not have
+
+    def legacy():
+        days = []
+        for d in dates:
+            legacy_grid()  # Every day rebuilt its slot grid
+            days.append(legacy_build(d, free[d], history))
+        return days
+
+    def current():
+        return [
+            scraper.build_day_availability(d, free[d], scraper.get_all_slots(d), history, FETCHED_AT) for d in dates
+        ]
+
+    cells = sum(len(slots) for slots in free.values())
+    print(f"{args.days} days, {args.courts} courts, {cells} slots with free courts")
+    print(f"{'models':<12}{'time':>10}{'retained':>12}{'peak':>12}")
+    results = {}
+    for name, build in (("pydantic", legacy), ("dataclass", current)):
+        results[name] = measure(build, args.repeat)
+        seconds, retained, peak = results[name]
+        print(f"{name:<12}{seconds * 1000:>8.1f}ms{retained / 1024:>10.0f}KB{peak / 1024:>10.0f}KB")
+    (old_time, old_retained, _), (new_time, new_retained, _) = results["pydantic"], results["dataclass"]
+    print(f"{old_time / new_time:.1f}x faster, {old_retained / new_retained:.1f}x less memory retained")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from eversports_scraper import config, scraper
+from eversports_scraper.models import DayAvailability
+
+logger = logging.getLogger(__name__)
+
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+
+def free_counts_by_hour(day_availabilities: List[DayAvailability]) -> Dict[str, Dict[str, int]]:
+    """Counts free (slot, court) pairs per hour of the day for every date."""
+    counts: Dict[str, Dict[str, int]] = {}
+    for day in day_availabilities:
+        by_hour: Dict[str, int] = defaultdict(int)
+        for slot in day.slots:
+            by_hour[slot.time[:2]] += len(slot.court_ids)
+        counts[day.date] = dict(sorted(by_hour.items()))
+    return counts
+
+
+def occupancy_heatmap(day_availabilities: List[DayAvailability]) -> Dict:
+    """Computes the booked share of court capacity per weekday and hour of the day.
+
+    Each day is bucketed by its own slot grid, as opening hours can differ per weekday. Returns a
+    dict with `weekdays`, `hours` and a `values` matrix (weekday x hour) holding the occupancy as a
+    fraction between 0 and 1, or None where no data was scraped.
+    """
+    court_count = len(config.COURT_IDS)
+    grids = {day.date: scraper.get_all_slots(day.date) for day in day_availabilities}
+    hours = sorted({slot[:2] for grid in grids.values() for slot in grid})
+    booked = [[0] * len(hours) for _ in WEEKDAYS]
+    capacity = [[0] * len(hours) for _ in WEEKDAYS]
+    hour_index = {hour: i for i, hour in enumerate(hours)}
+
+    for day in day_availabilities:
+        weekday = datetime.strptime(day.date, "%Y-%m-%d").weekday()
+        for slot in grids[day.date]:
+            h = hour_index[slot[:2]]
+            free = len(day.free_slots_map.get(slot, []))
+            booked[weekday][h] += court_count - free
+            capacity[weekday][h] += court_count
+
+    values = [
+        [round(booked[w][h] / capacity[w][h], 2) if capacity[w][h] else None for h in range(len(hours))]
+        for w in range(len(WEEKDAYS))
+    ]
+    return {"weekdays": WEEKDAYS, "hours": hours, "values": values}
+
+
+def next_free_per_court(day_availabilities: List[DayAvailability], now: datetime) -> Dict[str, Optional[Dict]]:
+    """Finds the earliest free slot at or after `now` for each court."""
+    now_key = now.strftime("%Y-%m-%d %H:%M")
+    result: Dict[str, Optional[Dict]] = {name: None for name in config.COURT_MAPPING.values()}
+
+    for day in sorted(day_availabilities, key=lambda d: d.date):
+        for slot in sorted(day.slots, key=lambda s: s.time):
+            if f"{day.date} {slot.time}" < now_key:
+                continue
+            for court in slot.courts:
+                if result.get(court) is None:
+                    result[court] = {"date": day.date, "time": slot.time}
+        if all(v is not None for v in result.values()):
+            break
+
+    return result
+
+
+def build_aggregates(day_availabilities: List[DayAvailability]) -> Dict:
+    """Builds all dashboard aggregates for one run."""
+    return {
+        "free_by_hour": free_counts_by_hour(day_availabilities),
+        "occupancy_heatmap": occupancy_heatmap(day_availabilities),
+        "next_free": next_free_per_court(day_availabilities, datetime.now()),
+    }
@@ -0,0 +1,115 @@
+import os
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Tuple
+
+from eversports_scraper import bot, config, metrics, persist, response_cache, run, scraper, telegram_notifier
+from eversports_scraper.errors import ConfigurationError, FetchError
+from eversports_scraper.models import DayAvailability, HistoryState, ScrapeOutcome
+
+# The modules read the global config, so scrapes of different instances take turns
+_config_lock = threading.RLock()
+
+# Module state that every instance keeps its own copy of: module, attribute and empty value
+_INSTANCE_CACHES: Tuple[Tuple[object, str, Callable[[], object]], ...] = (
+    (response_cache, "_cache", lambda: None),
+    (metrics, "_counters", lambda: defaultdict(int)),
+    (telegram_notifier, "_notifiers", dict),
+    (scraper, "_court_names", dict),
+    (scraper, "_court_names_source", dict),
+    (bot, "_report_cache", dict),
+)
+
+
+def _settings() -> Dict[str, object]:
+    return {name: getattr(config, name) for name in dir(config) if name.isupper()}
+
+
+def _rebase(path: str, old_dir: str, new_dir: str | None) -> str | None:
+    """Moves a path below `old_dir` to `new_dir`, or returns None if it lies elsewhere."""
+    path, old_dir = os.path.normpath(path), os.path.normpath(old_dir)
+    if new_dir is None or not path.startswith(old_dir + os.sep):
+        return None
+    return os.path.join(new_dir, os.path.relpath(path, old_dir))
+
+
+class Scraper:
+    """Scrapes the facility from another program, with its own state and settings.
+
+    `state_dir` and `data_dir` replace STATE_DIR and DATA_DIR, and every file below them, e.g. the
+    history and outbox. `settings` override config constants by name, e.g. `COURT_IDS=[77394]`.
+    Nothing exits or prints: failures raise a `ScraperError`, and results are returned.
+
+    The modules read the global `config`, so a call applies the instance's settings to it for its
+    duration: calls of all instances in the process run one at a time, and code running beside a
+    call in another thread sees its settings. The response cache, run metrics, Telegram notifiers
+    and court names are kept per instance, and background refreshes of the response cache finish
+    before a call returns, as they read the settings too.
+    """
+
+    def __init__(self, state_dir: str | None = None, data_dir: str | None = None, **settings):
+        defaults = _settings()
+        unknown = sorted(name for name in settings if name not in defaults)
+        if unknown:
+            raise ConfigurationError(f"Unknown settings: {', '.join(unknown)}")
+
+        self.settings: Dict[str, object] = {}
+        for name, value in defaults.items():
+            if name in ("STATE_DIR", "DATA_DIR") or not isinstance(value, str):
+                continue
+            path = _rebase(value, config.STATE_DIR, state_dir) or _rebase(value, config.DATA_DIR, data_dir)
+            if path is not None:
+                self.settings[name] = path
+        if state_dir is not None:
+            self.settings["STATE_DIR"] = state_dir
+        if data_dir is not None:
+            self.settings["DATA_DIR"] = data_dir
+        self.settings.update(settings)
+        self._caches = [factory() for _, _, factory in _INSTANCE_CACHES]
+
+    @contextmanager
+    def _configured(self) -> Iterator[None]:
+        """Applies the instance's settings and caches for the duration of a call."""
+        with _config_lock:
+            saved = _settings()
+            saved_caches = [getattr(module, name) for module, name, _ in _INSTANCE_CACHES]
+            try:
+                for name, value in self.settings.items():
+                    setattr(config, name, value)
+                for (module, name, _), cache in zip(_INSTANCE_CACHES, self._caches):
+                    setattr(module, name, cache)
+                yield
+            finally:
+                # Revalidations would otherwise fetch and cache with whatever config applies when they run
+                response_cache.drain()
+                # Keeps caches created or replaced during the call, e.g. the response cache
+                self._caches = [getattr(module, name) for module, name, _ in _INSTANCE_CACHES]
+                # Also undoes changes made during the call, e.g. by the discovered catalog
+                for name, value in saved.items():
+                    setattr(config, name, value)
+                for (module, name, _), cache in zip(_INSTANCE_CACHES, saved_caches):
+                    setattr(module, name, cache)
+
+    def scrape(self, start_date: str | None = None, days: int = 3, deadline: float | None = None) -> ScrapeOutcome:
+        """Runs a scrape like the command line does: fetches, saves the state and queues notifications.
+
+        Raises `NoTargetDatesError` when there is nothing to scrape and `ConfigurationError` for
+        invalid arguments.
+        """
+        with self._configured():
+            return run.run(start_date=start_date, days=days, deadline=deadline)
+
+    def fetch_day(self, date_str: str) -> DayAvailability:
+        """Fetches the availability of a single date, compared with the history but without saving it."""
+        with self._configured():
+            run.apply_catalog()
+            day = scraper.get_day_availability(date_str, scraper.get_all_slots(date_str), persist.load_history())
+        if day is None:
+            raise FetchError(f"Could not fetch the availability of {date_str}")
+        return day
+
+    def history(self) -> HistoryState:
+        """Returns the free courts per slot of every date seen so far."""
+        with self._configured():
+            return persist.load_history()
@@ -0,0 +1,176 @@
+import calendar
+import itertools
+import json
+import logging
+import os
+import sys
+from array import array
+from datetime import date, datetime, timedelta
+from typing import Dict, List
+
+from eversports_scraper import config, persist, scraper
+from eversports_scraper.models import DayAvailability
+
+logger = logging.getLogger(__name__)
+
+EPOCH = date(1970, 1, 1)
+
+# One cell per poll, date, slot and court, stored as one little-endian file per column so the
+# stats can memory-map each column as a NumPy array. Times are local wall-clock time.
+COLUMNS = {
+    "poll_time": ("I", "<u4"),  # Minutes since 1970-01-01 00:00 when the poll ran
+    "date": ("i", "<i4"),  # Days since 1970-01-01 of the slot
+    "slot": ("H", "<u2"),  # Minutes after midnight when the slot starts
+    "court": ("I", "<u4"),  # Court ID
+    "free": ("B", "u1"),  # 1 if the court was free, 0 if booked
+}
+
+
+def column_path(name: str, archive_dir: str | None = None) -> str:
+    return os.path.join(archive_dir or config.ARCHIVE_DIR, f"{name}.bin")
+
+
+def _local_minutes(moment: datetime) -> int:
+    return calendar.timegm(moment.timetuple()) // 60
+
+
+def encode_cells(day_availabilities: List[DayAvailability], polled_at: datetime) -> Dict[str, array]:
+    """Encodes the occupancy of every court in every slot of the given days as column arrays."""
+    columns = {name: array(typecode) for name, (typecode, _) in COLUMNS.items()}
+    court_ids = sorted(config.COURT_IDS)
+    for day in day_availabilities:
+        poll_time = _local_minutes(datetime.fromisoformat(day.fetched_at)) if day.fetched_at else None
+        poll_time = poll_time or _local_minutes(polled_at)
+        day_number = (date.fromisoformat(day.date) - EPOCH).days
+        for slot_time in scraper.get_all_slots(day.date):
+            hours, minutes = slot_time.split(":")
+            free = set(day.free_slots_map.get(slot_time, []))
+            for court_id in court_ids:
+                columns["poll_time"].append(poll_time)
+                columns["date"].append(day_number)
+                columns["slot"].append(int(hours) * 60 + int(minutes))
+                columns["court"].append(court_id)
+                columns["free"].append(court_id in free)
+    return columns
+
+
+def lock_path(archive_dir: str | None = None) -> str:
+    """The path whose lock serializes writers of the archive, and readers against compaction."""
+    return os.path.join(archive_dir or config.ARCHIVE_DIR, "archive")
+
+
+def _fetch_times_path(archive_dir: str) -> str:
+    return os.path.join(archive_dir, "fetched.json")
+
+
+def _load_fetch_times(archive_dir: str) -> Dict[str, str]:
+    """Returns when the last archived response of each date was fetched."""
+    try:
+        with open(_fetch_times_path(archive_dir), "r") as f:
+            fetch_times: Dict[str, str] = json.load(f)
+        return fetch_times
+    except (FileNotFoundError, json.JSONDecodeError, IOError):
+        return {}
+
+
+def _align_columns(archive_dir: str):
+    """Truncates the columns to their common length, dropping the cells of an interrupted append.
+
+    Appending onto columns of different lengths would misalign every later cell across them.
+    """
+    sizes = {}
+    for name in COLUMNS:
+        path = column_path(name, archive_dir)
+        sizes[name] = os.path.getsize(path) if os.path.exists(path) else 0
+    common = min(size // array(COLUMNS[name][0]).itemsize for name, size in sizes.items())
+    for name, size in sizes.items():
+        aligned = common * array(COLUMNS[name][0]).itemsize
+        if size > aligned:
+            logger.warning(f"Dropping {size - aligned} bytes of an incomplete append from the {name} column")
+            os.truncate(column_path(name, archive_dir), aligned)
+
+
+def append(
+    day_availabilities: List[DayAvailability], polled_at: datetime | None = None, archive_dir: str | None = None
+):
+    """Appends one poll of the given days to the archive.
+
+    Days whose response was served from the cache with a fetch time already archived are
+    skipped, as they would repeat the earlier poll.
+    """
+    archive_dir = archive_dir or config.ARCHIVE_DIR
+    polled_at = polled_at or datetime.now()
+    try:
+        os.makedirs(archive_dir, exist_ok=True)
+        with persist.locked(lock_path(archive_dir)):
+            fetch_times = _load_fetch_times(archive_dir)
+            days = [d for d in day_availabilities if not d.fetched_at or fetch_times.get(d.date) != d.fetched_at]
+            columns = encode_cells(days, polled_at)
+            if not columns["free"]:
+                return
+            _align_columns(archive_dir)
+            for name, values in columns.items():
+                if sys.byteorder == "big":
+                    values.byteswap()
+                with open(column_path(name, archive_dir), "ab") as f:
+                    values.tofile(f)
+            meta = {name: dtype for name, (_, dtype) in COLUMNS.items()}
+            persist.write_json_atomic(os.path.join(archive_dir, "columns.json"), meta)
+            today = polled_at.date().isoformat()
+            fetch_times.update({d.date: d.fetched_at for d in days if d.fetched_at})
+            fetch_times = {date_str: at for date_str, at in fetch_times.items() if date_str >= today}
+            persist.write_json_atomic(_fetch_times_path(archive_dir), fetch_times, indent=None)
+            expire(archive_dir, polled_at)
+        logger.info(f"Archived {len(columns['free'])} cells of {len(days)} days")
+    except IOError as e:
+        logger.error(f"Failed to append to archive: {e}")
+
+
+def _read_column(name: str, archive_dir: str, count: int = -1) -> array:
+    values = array(COLUMNS[name][0])
+    with open(column_path(name, archive_dir), "rb") as f:
+        if count < 0:
+            values.frombytes(f.read())
+        else:
+            values.fromfile(f, count)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def expire(archive_dir: str, now: datetime, retention_days: int | None = None) -> int:
+    """Drops the polls older than ARCHIVE_RETENTION_DAYS and returns the number of cells dropped.
+
+    The columns are only rewritten once the oldest poll is a day past the retention window, so
+    a run usually just reads one value. Callers hold the archive lock.
+    """
+    retention_days = config.ARCHIVE_RETENTION_DAYS if retention_days is None else retention_days
+    if retention_days <= 0:
+        return 0
+    cutoff = _local_minutes(now - timedelta(days=retention_days))
+    try:
+        oldest = _read_column("poll_time", archive_dir, 1)[0]
+    except (EOFError, IndexError, OSError):
+        return 0
+    if oldest >= cutoff - 24 * 60:
+        return 0
+
+    keep = [poll_time >= cutoff for poll_time in _read_column("poll_time", archive_dir)]
+    # All columns are written before any is replaced, keeping the window where they disagree short
+    for name in COLUMNS:
+        values = array(COLUMNS[name][0], itertools.compress(_read_column(name, archive_dir), keep))
+        if sys.byteorder == "big":
+            values.byteswap()
+        with open(f"{column_path(name, archive_dir)}.tmp", "wb") as f:
+            values.tofile(f)
+    for name in COLUMNS:
+        os.replace(f"{column_path(name, archive_dir)}.tmp", column_path(name, archive_dir))
+    dropped: int = len(keep) - sum(keep)
+    logger.info(f"Dropped {dropped} archived cells polled more than {retention_days} days ago")
+    return dropped
+
+
+def load_meta(archive_dir: str | None = None) -> Dict[str, str]:
+    with open(os.path.join(archive_dir or config.ARCHIVE_DIR, "columns.json"), "r") as f:
+        meta: Dict[str, str] = json.load(f)
+    return meta
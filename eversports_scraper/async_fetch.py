@@ -0,0 +1,192 @@
+import asyncio
+import functools
+import logging
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Coroutine, Dict, Iterator, List, Mapping, Optional, TypeVar
+
+from eversports_scraper import config, metrics, persist, response_cache, scraper
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Found in the body of a Cloudflare challenge page
+CHALLENGE_MARKERS = ("challenge-platform", "cf-chl", "Just a moment")
+
+
+def _httpx():
+    try:
+        import httpx
+    except ImportError:
+        return None
+    return httpx
+
+
+def available() -> bool:
+    """Whether dates are fetched concurrently, i.e. ASYNC_FETCH is on and httpx is installed."""
+    return config.ASYNC_FETCH and _httpx() is not None
+
+
+def is_challenge(status_code: int, headers: Mapping[str, str], body_start: bytes) -> bool:
+    """Detects a Cloudflare challenge served instead of the slot API response."""
+    if headers.get("cf-mitigated") == "challenge":
+        return True
+    if status_code not in (403, 429, 503):
+        return False
+    text = body_start[:4096].decode("utf-8", "replace")
+    return any(marker in text for marker in CHALLENGE_MARKERS)
+
+
+def _client(transport=None):
+    httpx = _httpx()
+    concurrency = config.ASYNC_FETCH_CONCURRENCY
+    options = {
+        "headers": config.COMMON_HEADERS,
+        "cookies": persist.load_cookies(),
+        "limits": httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+        "timeout": 10,
+        "transport": transport,
+    }
+    if config.HTTP2:
+        try:
+            return httpx.AsyncClient(http2=True, **options)
+        except ImportError:
+            logger.info("The h2 package is not installed, fetching over HTTP/1.1")
+    return httpx.AsyncClient(**options)
+
+
+async def _fallback(client, fallback_lock: asyncio.Lock, date_str: str) -> Optional[Dict]:
+    """Fetches a date with cloudscraper, which solves the challenge and persists its clearance cookie.
+
+    Fallbacks run one at a time, and the client picks up the persisted cookies afterwards, so
+    once a challenge is solved the remaining dates usually go through the client again.
+    """
+    async with fallback_lock:
+        logger.info(f"Challenge served for {date_str}, falling back to cloudscraper")
+        metrics.increment("challenge_fallbacks")
+        data = await asyncio.to_thread(scraper.request_booked_slots, date_str)
+        client.cookies.update(persist.load_cookies())
+        return data
+
+
+def _queued_chunks(chunks: "queue.Queue[Optional[bytes]]") -> Iterator[bytes]:
+    while True:
+        chunk = chunks.get()
+        if chunk is None:
+            return
+        yield chunk
+
+
+async def _read_stream(first: bytes, body: AsyncIterator[bytes], date_str: str) -> Optional[Dict]:
+    """Parses a response body while it streams in.
+
+    The stream parser consumes chunks synchronously, so it runs in a thread that is handed each
+    chunk through a queue as it arrives; the body is never held in memory as a whole.
+    """
+    chunks: "queue.Queue[Optional[bytes]]" = queue.Queue()
+    chunks.put(first)
+    parsing = asyncio.ensure_future(asyncio.to_thread(scraper.read_bookings, _queued_chunks(chunks), date_str))
+    try:
+        async for chunk in body:
+            chunks.put(chunk)
+    except BaseException:
+        # The parser stops at the end of what arrived; its error adds nothing once the stream failed
+        chunks.put(None)
+        parsing.add_done_callback(lambda task: task.cancelled() or task.exception())
+        raise
+    chunks.put(None)
+    try:
+        return await parsing
+    except ValueError as e:
+        logger.error(f"Error parsing data for {date_str}: {e}")
+        return None
+
+
+async def _fetch_one(client, semaphore: asyncio.Semaphore, fallback_lock: asyncio.Lock, date_str: str):
+    url = scraper.build_url(date_str)
+    async with semaphore:
+        logger.info(f"Fetching data for {date_str} from {url}")
+        try:
+            async with client.stream("GET", url) as response:
+                body = response.aiter_bytes(scraper.STREAM_CHUNK_SIZE)
+                try:
+                    first = await body.__anext__()
+                except StopAsyncIteration:
+                    first = b""
+                if not is_challenge(response.status_code, response.headers, first):
+                    if response.status_code >= 400:
+                        logger.error(f"Error fetching data for {date_str}: HTTP {response.status_code}")
+                        return None
+                    return await _read_stream(first, body, date_str)
+        except Exception as e:
+            logger.error(f"Error fetching data for {date_str}: {e}")
+            return None
+
+    return await _fallback(client, fallback_lock, date_str)
+
+
+async def _fetch_all(date_strs: List[str], timeout: float | None, transport=None) -> Dict[str, Optional[Dict]]:
+    semaphore = asyncio.Semaphore(config.ASYNC_FETCH_CONCURRENCY)
+    fallback_lock = asyncio.Lock()
+    async with _client(transport) as client:
+        tasks = {d: asyncio.ensure_future(_fetch_one(client, semaphore, fallback_lock, d)) for d in date_strs}
+        done, pending = await asyncio.wait(tasks.values(), timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.warning(f"Time budget used up with {len(pending)} dates still being fetched")
+            await asyncio.wait(pending)
+        persist.save_cookies({cookie.name: cookie.value for cookie in client.cookies.jar if cookie.value})
+    return {d: task.result() for d, task in tasks.items() if task in done}
+
+
+def _run(coroutine: Coroutine[Any, Any, T]) -> T:
+    """Runs a coroutine to completion, in a thread of its own if this thread already runs an event loop.
+
+    That is the case when the scraper is embedded in an async application, where `asyncio.run`
+    would refuse to start. The caller blocks either way, as it does for cloudscraper fetches.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="async-fetch") as executor:
+        return executor.submit(asyncio.run, coroutine).result()
+
+
+def _refresh(date_str: str, transport=None) -> Optional[Dict]:
+    """Fetches one date like `fetch_all`, for revalidating a stale cache entry in the background."""
+    return asyncio.run(_fetch_all([date_str], None, transport)).get(date_str)
+
+
+def fetch_all(date_strs: List[str], deadline: float | None = None, transport=None) -> Dict[str, Optional[Dict]]:
+    """Fetches the booked slots of all dates concurrently, serving cached ones from the response cache.
+
+    As with `scraper.fetch_booked_slots`, a stale cached response is served while it is refreshed
+    in the background, also over httpx and with cloudscraper only after a challenge. Returns the
+    response of each date, None where the fetch failed. Dates still being fetched when `deadline`
+    (a `time.monotonic()` value) passes are left out.
+    """
+    cache = response_cache.get_cache()
+    results: Dict[str, Optional[Dict]] = {}
+    missing = []
+    for date_str in date_strs:
+        refresh = functools.partial(_refresh, date_str, transport)
+        data = cache.lookup(scraper.cache_key(date_str), date_str, refresh)
+        if data is None:
+            missing.append(date_str)
+        else:
+            results[date_str] = data
+    if not missing:
+        return results
+
+    timeout = max(deadline - time.monotonic(), 0) if deadline is not None else None
+    logger.info(f"Fetching {len(missing)} dates concurrently")
+    fetched = _run(_fetch_all(missing, timeout, transport))
+    for date_str, data in fetched.items():
+        if data is not None:
+            cache.put(scraper.cache_key(date_str), data)
+    results.update(fetched)
+    return results
@@ -0,0 +1,300 @@
+import json
+import logging
+import os
+import time
+from datetime import date, datetime, timedelta
+from typing import TYPE_CHECKING, Dict, Iterator, List, NamedTuple, Set, Tuple
+
+from pydantic import ValidationError
+
+from eversports_scraper import archive, config, run, scraper, stats
+from eversports_scraper.cooldown import NotificationIndex
+from eversports_scraper.errors import ConfigurationError
+from eversports_scraper.models import BacktestResult, DayAvailability, FreeSlotsMap, RuleSet, TargetInterval
+
+if TYPE_CHECKING:
+    import numpy
+
+logger = logging.getLogger(__name__)
+
+
+class Snapshot(NamedTuple):
+    poll_time: int  # Minutes since 1970-01-01 00:00, local time
+    date: str
+    free_slots_map: FreeSlotsMap
+    all_slots: List[str]
+    changed: bool  # False if the date looked the same at its previous poll
+
+
+def load_rule_sets(path: str | None = None) -> List[RuleSet]:
+    """Loads the rule sets to compare from a JSON list, or only the configured rules without a file."""
+    if not path:
+        return [RuleSet(name="current")]
+    try:
+        with open(path, "r") as f:
+            return [RuleSet.model_validate(item) for item in json.load(f)]
+    except (json.JSONDecodeError, ValidationError, TypeError, IOError) as e:
+        raise ConfigurationError(f"Invalid rule sets in {path}: {e}") from None
+
+
+# Polls compared cell by cell at a time, bounding the memory of the index arrays
+CHUNK_POLLS = 50_000
+
+
+def _changed_polls(
+    columns: Dict[str, "numpy.ndarray"], starts: "numpy.ndarray", sizes: "numpy.ndarray", previous: "numpy.ndarray"
+) -> "numpy.ndarray":
+    """Flags the polls where some court of the date changed state since the `previous` poll of the date.
+
+    Polls are contiguous runs of cells, given by their `starts` and `sizes`; `previous` is -1 at the
+    first poll of a date. Cells are compared with the same cell of the previous poll, which the
+    archive writes in the same slot and court order as long as the grid and courts stay the same.
+    """
+    np = stats._numpy()
+    comparable = previous >= 0
+    comparable[comparable] = sizes[comparable] == sizes[previous[comparable]]
+    changed = ~comparable
+    for first in range(0, len(starts), CHUNK_POLLS):
+        chunk = slice(first, first + CHUNK_POLLS)
+        begin, end = int(starts[chunk][0]), int(starts[chunk][-1] + sizes[chunk][-1])
+        offsets = np.where(comparable[chunk], starts[previous[chunk]] - starts[chunk], 0)
+        cells = np.arange(begin, end) + np.repeat(offsets, sizes[chunk])
+        differs = np.zeros(end - begin, dtype=bool)
+        for name in ("slot", "court", "free"):
+            values = columns[name]
+            differs |= values[begin:end] != values[cells]
+        changed[chunk] |= np.logical_or.reduceat(differs, starts[chunk] - begin)
+    return changed
+
+
+def iter_snapshots(columns: Dict[str, "numpy.ndarray"]) -> Iterator[Snapshot]:
+    """Yields every archived poll of every date in poll order.
+
+    Which polls differ from the previous poll of their date is found for all polls at once, and
+    the free courts are only decoded for those; unchanged polls repeat the previous snapshot.
+    """
+    np = stats._numpy()
+    poll_time, day, slot, court, free = (columns[name] for name in ("poll_time", "date", "slot", "court", "free"))
+    if len(free) == 0:
+        return
+    # Each run appends the cells of a date in one go, so a poll of a date is a contiguous run of cells
+    starts = np.concatenate(([0], np.flatnonzero((poll_time[1:] != poll_time[:-1]) | (day[1:] != day[:-1])) + 1))
+    sizes = np.diff(np.append(starts, len(free)))
+    poll_of, day_of = poll_time[starts].astype(np.int64), day[starts].astype(np.int64)
+    position = np.arange(len(starts))
+    by_date = np.lexsort((position, poll_of, day_of))
+    previous = np.full(len(starts), -1)
+    same_date = day_of[by_date[1:]] == day_of[by_date[:-1]]
+    previous[by_date[1:][same_date]] = by_date[:-1][same_date]
+    changed = _changed_polls(columns, starts, sizes, previous)
+
+    snapshots: Dict[int, Snapshot] = {}
+    grids: Dict[bytes, List[str]] = {}
+    times: Dict[int, str] = {}
+    order = np.lexsort((position, day_of, poll_of))
+    for start, size, day_number, poll, poll_changed in zip(
+        starts[order].tolist(),
+        sizes[order].tolist(),
+        day_of[order].tolist(),
+        poll_of[order].tolist(),
+        changed[order].tolist(),
+    ):
+        if not poll_changed:
+            yield snapshots[day_number]._replace(poll_time=poll, changed=False)
+            continue
+
+        end = start + size
+        slots = slot[start:end]
+        grid_key = slots.tobytes()
+        if grid_key not in grids:
+            minutes = sorted(set(slots.tolist()))
+            times.update((m, scraper._hhmm(m)) for m in minutes)
+            grids[grid_key] = [times[m] for m in minutes]
+        free_slots_map: FreeSlotsMap = {}
+        is_free = free[start:end] == 1
+        for slot_start, court_id in zip(slots[is_free].tolist(), court[start:end][is_free].tolist()):
+            free_slots_map.setdefault(times[slot_start], []).append(court_id)
+        date_str = (archive.EPOCH + timedelta(days=day_number)).isoformat()
+        snapshots[day_number] = Snapshot(poll, date_str, free_slots_map, grids[grid_key], True)
+        yield snapshots[day_number]
+
+
+class Replay:
+    """Replays polls through the notification rules of one rule set and scores its alerts.
+
+    An opportunity is a court in the rule set's window that was booked at one poll and free at the
+    next, before its slot started. It is detected if the court is notified before it is booked
+    again, after as many minutes as it took the rules to fire.
+    """
+
+    def __init__(self, rule_set: RuleSet):
+        self.rule_set = rule_set
+        self.index = NotificationIndex(
+            cooldown_minutes=rule_set.cooldown_minutes, min_free_polls=rule_set.min_free_polls
+        )
+        self.result = BacktestResult(rule_set=rule_set.name)
+        # Dates where every free court is past its streak, so an unchanged poll changes nothing
+        self.settled: Set[str] = set()
+        # date -> (slot, court) -> [poll time first seen free, poll time notified or None]
+        self.open: Dict[str, Dict[Tuple[str, int], List]] = {}
+        self.in_window: Dict[str, bool] = {}
+
+    def needs(self, snapshot: Snapshot) -> bool:
+        return snapshot.changed or snapshot.date not in self.settled
+
+    def _wanted(self, slot_time: str, court_id: int) -> bool:
+        courts = self.rule_set.courts
+        if courts is not None and court_id not in courts:
+            return False
+        if slot_time not in self.in_window:
+            target = TargetInterval(date="", start_time=self.rule_set.start_time, end_time=self.rule_set.end_time)
+            self.in_window[slot_time] = run.has_time_overlap(slot_time, target)
+        return self.in_window[slot_time]
+
+    def feed(
+        self,
+        snapshot: Snapshot,
+        day: DayAvailability,
+        prev_free_slots_map: FreeSlotsMap | None,
+        freed: List[Tuple[str, int]],
+    ):
+        """Processes one poll of a date.
+
+        `prev_free_slots_map` is None at the first poll of a date, and `freed` lists the courts
+        booked at the previous poll and free at this one.
+        """
+        date_str, poll_time = snapshot.date, snapshot.poll_time
+        now = datetime(1970, 1, 1) + timedelta(minutes=poll_time)
+        if prev_free_slots_map is None:
+            # The archive doesn't tell how long the courts have been free, so they count as long-standing
+            self.index.observe(day, snapshot.free_slots_map, now)
+        else:
+            target = TargetInterval(date=date_str, start_time=self.rule_set.start_time, end_time=self.rule_set.end_time)
+            if snapshot.changed:
+                self._track_opportunities(snapshot, freed)
+            new_slots = run.select_new_slots(
+                day,
+                target,
+                prev_free_slots_map,
+                snapshot.all_slots,
+                self.index,
+                now,
+                self.rule_set.min_block_slots,
+                self.rule_set.block_same_court,
+            )
+            self._score(date_str, poll_time, new_slots)
+
+        cap = self.index.min_free_polls + 1
+        if all(streak == cap for streak in self.index.streaks.get(date_str, {}).values()):
+            self.settled.add(date_str)
+        else:
+            self.settled.discard(date_str)
+
+    def _track_opportunities(self, snapshot: Snapshot, freed: List[Tuple[str, int]]):
+        open_runs = self.open.setdefault(snapshot.date, {})
+        for key in [k for k in open_runs if k[1] not in snapshot.free_slots_map.get(k[0], ())]:
+            del open_runs[key]  # Booked again
+        for slot_time, court_id in freed:
+            if self._wanted(slot_time, court_id):
+                open_runs[(slot_time, court_id)] = [snapshot.poll_time, None]
+                self.result.opportunities += 1
+
+    def _score(self, date_str: str, poll_time: int, new_slots):
+        courts = self.rule_set.courts
+        open_runs = self.open.get(date_str, {})
+        alerts = 0
+        for slot in new_slots:
+            for court_id in slot.court_ids:
+                if courts is not None and court_id not in courts:
+                    continue
+                alerts += 1
+                opportunity = open_runs.get((slot.time, court_id))
+                if opportunity is not None and opportunity[1] is None:
+                    opportunity[1] = poll_time
+                    self.result.detected += 1
+                    self.result.delays.append(poll_time - opportunity[0])
+        self.result.alerts += alerts
+        self.result.messages += alerts > 0
+
+
+def freed_courts(snapshot: Snapshot, prev_free_slots_map: FreeSlotsMap) -> List[Tuple[str, int]]:
+    """Returns the courts booked at the previous poll and free at this one, in slots yet to start."""
+    day_start = (date.fromisoformat(snapshot.date) - archive.EPOCH).days * 1440
+    freed: List[Tuple[str, int]] = []
+    for slot_time, court_ids in snapshot.free_slots_map.items():
+        if day_start + scraper._minutes(slot_time) <= snapshot.poll_time:
+            continue
+        was_free = prev_free_slots_map.get(slot_time, ())
+        freed.extend((slot_time, court_id) for court_id in court_ids if court_id not in was_free)
+    return freed
+
+
+def backtest(columns: Dict[str, "numpy.ndarray"], rule_sets: List[RuleSet]) -> List[BacktestResult]:
+    """Replays the archived polls through each rule set at once."""
+    replays = [Replay(rule_set) for rule_set in rule_sets]
+    history: Dict[str, FreeSlotsMap] = {}
+    # The day of a date as seen again at an unchanged poll, without new slots
+    repeated: Dict[str, DayAvailability] = {}
+    for snapshot in iter_snapshots(columns):
+        waiting = [replay for replay in replays if replay.needs(snapshot)]
+        if not waiting:
+            continue
+        # Every rule set sees the same days, as the history only depends on the previous poll
+        prev_free_slots_map = history.get(snapshot.date)
+        if snapshot.changed or snapshot.date not in repeated:
+            day = scraper.build_day_availability(
+                snapshot.date,
+                snapshot.free_slots_map,
+                snapshot.all_slots,
+                # Nothing is new at the first poll of a date
+                {snapshot.date: snapshot.free_slots_map if prev_free_slots_map is None else prev_free_slots_map},
+                fetched_at="",
+                block_slots=0,
+            )
+            if not snapshot.changed:
+                repeated[snapshot.date] = day
+            elif snapshot.date in repeated:
+                del repeated[snapshot.date]
+        else:
+            day = repeated[snapshot.date]
+        freed = (
+            freed_courts(snapshot, prev_free_slots_map) if snapshot.changed and prev_free_slots_map is not None else []
+        )
+        for replay in waiting:
+            replay.feed(snapshot, day, prev_free_slots_map, freed)
+        history[snapshot.date] = snapshot.free_slots_map
+    return [replay.result for replay in replays]
+
+
+def _percentile(values: List[int], share: float) -> str:
+    if not values:
+        return "-"
+    ordered = sorted(values)
+    return f"{ordered[min(int(len(ordered) * share), len(ordered) - 1)]}m"
+
+
+def print_results(results: List[BacktestResult]):
+    print(
+        f"{'rule set':<16}{'alerts':>8}{'messages':>10}{'chances':>9}{'detected':>10}{'missed':>8}{'p50':>7}{'p90':>7}"
+    )
+    for r in results:
+        print(
+            f"{r.rule_set:<16}{r.alerts:>8}{r.messages:>10}{r.opportunities:>9}{r.detected:>10}"
+            f"{r.opportunities - r.detected:>8}{_percentile(r.delays, 0.5):>7}{_percentile(r.delays, 0.9):>7}"
+        )
+
+
+def main(rules_path: str | None = None, archive_dir: str | None = None) -> List[BacktestResult]:
+    """Compares the alerts the rule sets would have sent for the archived polls."""
+    archive_dir = archive_dir or config.ARCHIVE_DIR
+    rule_sets = load_rule_sets(rules_path)
+    if not os.path.exists(os.path.join(archive_dir, "columns.json")):
+        print(f"No archive found in {archive_dir}.")
+        return []
+    started = time.monotonic()
+    columns = stats.load_columns(archive_dir)
+    results = backtest(columns, rule_sets)
+    logger.info(f"Replayed {len(columns['free'])} cells through {len(rule_sets)} rule sets")
+    print(f"Replayed {len(columns['free'])} archived cells in {time.monotonic() - started:.1f}s\n")
+    print_results(results)
+    return results
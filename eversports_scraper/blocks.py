@@ -0,0 +1,132 @@
+import dataclasses
+import logging
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+from eversports_scraper import config
+from eversports_scraper.models import Block, FreeSlotsMap, Slot
+
+logger = logging.getLogger(__name__)
+
+# Pseudo court ID for the union of all courts, i.e. blocks that may switch courts between slots
+ANY_COURT = -1
+
+
+@lru_cache(maxsize=8)
+def _slot_positions(all_slots: Tuple[str, ...]) -> Dict[str, int]:
+    return {slot: i for i, slot in enumerate(all_slots)}
+
+
+def court_masks(free_slots_map: FreeSlotsMap, all_slots: List[str]) -> Dict[int, int]:
+    """Encodes the free slots of each court as a bitmask, bit i standing for `all_slots[i]`.
+
+    The union of all courts is included under `ANY_COURT`.
+    """
+    positions = _slot_positions(tuple(all_slots))
+    masks: Dict[int, int] = {}
+    for slot_time, court_ids in free_slots_map.items():
+        position = positions.get(slot_time)
+        if position is None:
+            continue
+        bit = 1 << position
+        for court_id in court_ids:
+            masks[court_id] = masks.get(court_id, 0) | bit
+    any_court = 0
+    for mask in masks.values():
+        any_court |= mask
+    masks[ANY_COURT] = any_court
+    return masks
+
+
+def run_starts(mask: int, k: int) -> int:
+    """Returns a mask of the positions where a run of at least `k` set bits starts.
+
+    Shift-and-and with doubling step sizes needs O(log k) big-integer operations.
+    """
+    span = 1
+    while span < k and mask:
+        step = min(span, k - span)
+        mask &= mask >> step
+        span += step
+    return mask
+
+
+def run_cover(mask: int, k: int) -> int:
+    """Returns a mask of the positions that are part of some run of at least `k` set bits."""
+    starts = run_starts(mask, k)
+    covered, span = starts, 1
+    while span < k and covered:
+        step = min(span, k - span)
+        covered |= covered << step
+        span += step
+    return covered
+
+
+def maximal_runs(mask: int) -> List[Tuple[int, int]]:
+    """Splits a mask into its maximal runs of set bits as (first position, length)."""
+    runs = []
+    while mask:
+        start = (mask & -mask).bit_length() - 1
+        shifted = mask >> start
+        length = ((shifted + 1) & ~shifted).bit_length() - 1
+        runs.append((start, length))
+        mask &= ~(((1 << length) - 1) << start)
+    return runs
+
+
+def _end_time(slot_time: str) -> str:
+    end = datetime.strptime(slot_time, "%H:%M") + timedelta(minutes=config.SLOT_DURATION_MINUTES)
+    return end.strftime("%H:%M")
+
+
+def find_blocks(free_slots_map: FreeSlotsMap, all_slots: List[str], k: int, same_court: bool = True) -> List[Block]:
+    """Finds maximal runs of at least `k` consecutive free slots.
+
+    With `same_court`, each block stays on one court; otherwise a block only needs some court
+    to be free in every slot.
+    """
+    masks = court_masks(free_slots_map, all_slots)
+    courts = sorted(c for c in masks if c != ANY_COURT) if same_court else [ANY_COURT]
+    blocks = []
+    for court_id in courts:
+        for start, length in maximal_runs(masks[court_id]):
+            if length < k:
+                continue
+            blocks.append(
+                Block(
+                    start=all_slots[start],
+                    end=_end_time(all_slots[start + length - 1]),
+                    slots=length,
+                    court_id=None if court_id == ANY_COURT else court_id,
+                    court=None if court_id == ANY_COURT else config.COURT_MAPPING.get(court_id, f"Unknown({court_id})"),
+                )
+            )
+    return sorted(blocks, key=lambda b: (b.start, b.court_id or 0))
+
+
+def filter_slots_in_blocks(
+    slots: List[Slot], free_slots_map: FreeSlotsMap, all_slots: List[str], k: int, same_court: bool = True
+) -> List[Slot]:
+    """Keeps only the slots and courts that are part of a block of at least `k` consecutive free slots."""
+    if k <= 1:
+        return slots
+    masks = court_masks(free_slots_map, all_slots)
+    positions = _slot_positions(tuple(all_slots))
+    covered = {court_id: run_cover(mask, k) for court_id, mask in masks.items()}
+
+    result = []
+    for slot in slots:
+        position = positions.get(slot.time)
+        if position is None:
+            continue
+        bit = 1 << position
+        if same_court:
+            kept = [(cid, name) for cid, name in zip(slot.court_ids, slot.courts) if covered.get(cid, 0) & bit]
+        else:
+            kept = list(zip(slot.court_ids, slot.courts)) if covered[ANY_COURT] & bit else []
+        if kept:
+            result.append(
+                dataclasses.replace(slot, court_ids=[cid for cid, _ in kept], courts=[name for _, name in kept])
+            )
+    return result
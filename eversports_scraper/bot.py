@@ -0,0 +1,275 @@
+import json
+import logging
+import os
+import re
+import threading
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Set, Tuple
+
+import requests
+
+from eversports_scraper import config, persist, run, scraper, subscriptions
+from eversports_scraper.models import DayAvailability, Subscription, TargetInterval
+from eversports_scraper.recurrence import WEEKDAY_NAMES
+from eversports_scraper.telegram_notifier import split_message
+
+logger = logging.getLogger(__name__)
+
+Snapshot = Callable[[], List[DayAvailability]]
+
+WINDOW_PATTERN = re.compile(r"^(\d{1,2})(?::(\d{2}))?-(\d{1,2})(?::(\d{2}))?$")
+# Characters with a meaning in Telegram's Markdown parse mode
+MARKDOWN_SPECIAL = re.compile(r"([_*`\[])")
+
+HELP_TEXT = (
+    "Commands:\n"
+    "/free [date] [18-21]: free slots, e.g. `/free tomorrow 18-21`\n"
+    "/next [court 2]: the next free slot, optionally on one court\n"
+    "/watch <date> <19:00-21:00>: get notified about new slots in that window"
+)
+
+_report_cache: Dict[str, object] = {}
+
+
+def report_snapshot() -> List[DayAvailability]:
+    """Returns the days of the last published report, re-reading the file only when it changed."""
+    try:
+        mtime = os.path.getmtime(config.REPORT_FILE)
+    except OSError:
+        return []
+    if _report_cache.get("mtime") != mtime:
+        try:
+            with open(config.REPORT_FILE, "r") as f:
+                data = json.load(f)
+            _report_cache["days"] = persist.load_days(data["days"])
+            _report_cache["mtime"] = mtime
+        except (json.JSONDecodeError, KeyError, TypeError, ValueError, IOError) as e:
+            logger.error(f"Failed to read report for bot snapshot: {e}")
+            return []
+    days: List[DayAvailability] = _report_cache["days"]  # type: ignore[assignment]
+    return days
+
+
+def parse_date(token: str, today: date) -> str | None:
+    """Parses `today`, `tomorrow`, a weekday name, YYYY-MM-DD, DD.MM.YYYY or DD.MM."""
+    token = token.lower().rstrip(".,")
+    if token in ("today", "heute"):
+        return today.isoformat()
+    if token in ("tomorrow", "morgen"):
+        return (today + timedelta(days=1)).isoformat()
+    if token in WEEKDAY_NAMES:
+        return (today + timedelta(days=(WEEKDAY_NAMES[token] - today.weekday()) % 7)).isoformat()
+    for fmt in ("%Y-%m-%d", "%d.%m.%Y"):
+        try:
+            return datetime.strptime(token, fmt).date().isoformat()
+        except ValueError:
+            pass
+    try:
+        parsed = datetime.strptime(f"{token}.{today.year}", "%d.%m.%Y").date()
+    except ValueError:
+        return None
+    # A day and month without year means the next occurrence
+    return (parsed if parsed >= today else parsed.replace(year=today.year + 1)).isoformat()
+
+
+def parse_window(token: str) -> Tuple[str, str] | None:
+    """Parses `18-21` or `19:00-21:30` into start and end times."""
+    match = WINDOW_PATTERN.match(token)
+    if not match:
+        return None
+    start_h, start_m, end_h, end_m = match.groups()
+    start, end = (int(start_h), int(start_m or 0)), (int(end_h), int(end_m or 0))
+    if not (start < end <= (24, 0)) or start[1] > 59 or end[1] > 59:
+        return None
+    return f"{start[0]:02d}:{start[1]:02d}", f"{end[0]:02d}:{end[1]:02d}"
+
+
+def escape_markdown(text: str) -> str:
+    """Escapes user input echoed in a Markdown reply, which Telegram would otherwise reject."""
+    return MARKDOWN_SPECIAL.sub(r"\\\1", text)
+
+
+def allowed_chats(subscription_list: List[Subscription]) -> Set[str]:
+    """Chats that may add watched dates: the configured ones and those of the subscriber registry."""
+    chats = set(config.BOT_ALLOWED_CHAT_IDS) | {s.chat_id for s in subscription_list if s.chat_id}
+    if config.TELEGRAM_CHAT_ID:
+        chats.add(config.TELEGRAM_CHAT_ID)
+    return chats
+
+
+def _format_days(days: List[Tuple[str, List[str]]]) -> str:
+    return "\n".join(f"*{date_str}*:\n" + "\n".join(f"  - {line}" for line in lines) for date_str, lines in days)
+
+
+class CommandBot:
+    """Answers bot commands from the latest availability snapshot via Telegram long polling.
+
+    Replies never trigger a scrape: `snapshot` returns what the scraper last saw, so a burst of
+    queries costs nothing beyond reading memory or a cached report.
+    """
+
+    def __init__(
+        self,
+        token: str,
+        snapshot: Snapshot = report_snapshot,
+        api_base: str | None = None,
+        poll_timeout: int | None = None,
+    ):
+        self.snapshot = snapshot
+        self.base_url = f"{(api_base or config.TELEGRAM_API_BASE).rstrip('/')}/bot{token}"
+        self.poll_timeout = config.TELEGRAM_POLL_TIMEOUT_SECONDS if poll_timeout is None else poll_timeout
+        self.session = requests.Session()
+        self.offset: int | None = None
+
+    # --- Commands ---
+
+    def handle(self, text: str, chat_id: str, now: datetime | None = None) -> str | None:
+        """Returns the reply to a message, or None if it is not a command."""
+        now = now or datetime.now()
+        parts = text.strip().split()
+        if not parts or not parts[0].startswith("/"):
+            return None
+        # Commands in groups look like /free@MyBot
+        command, args = parts[0][1:].split("@")[0].lower(), parts[1:]
+        handlers = {"free": self.free, "next": self.next, "watch": self.watch}
+        if command in handlers:
+            return handlers[command](args, chat_id, now)
+        return HELP_TEXT
+
+    def free(self, args: List[str], chat_id: str, now: datetime) -> str:
+        date_str, window = None, None
+        for arg in args:
+            if window is None and (parsed_window := parse_window(arg)):
+                window = parsed_window
+            elif date_str is None and (parsed_date := parse_date(arg, now.date())):
+                date_str = parsed_date
+            else:
+                return f"Could not understand '{escape_markdown(arg)}'.\n\n{HELP_TEXT}"
+
+        start, end = window or (None, None)
+        interval = TargetInterval(date=date_str or "", start_time=start, end_time=end)
+        today = now.date().isoformat()
+        days = [d for d in self.snapshot() if (d.date == date_str if date_str else d.date >= today)]
+        if date_str and not days:
+            return f"{date_str} is not monitored. Use /watch to add it."
+
+        result = []
+        for day in sorted(days, key=lambda d: d.date):
+            lines = [f"{s.time} ({', '.join(s.courts)})" for s in day.slots if run.has_time_overlap(s.time, interval)]
+            if lines:
+                result.append((day.date, lines))
+        if not result:
+            on_date = f" on {date_str}" if date_str else ""
+            between = f" between {start} and {end}" if window else ""
+            return f"No free slots{on_date}{between}."
+        return _format_days(result)
+
+    def next(self, args: List[str], chat_id: str, now: datetime) -> str:
+        court = None
+        if args:
+            value = " ".join(args[1:] if args[0].lower() in ("court", "platz") else args)
+            court = scraper.resolve_court(value)
+            if court is None:
+                return f"Unknown court '{escape_markdown(value)}'."
+
+        now_key = now.strftime("%Y-%m-%d %H:%M")
+        for day in sorted(self.snapshot(), key=lambda d: d.date):
+            for slot in sorted(day.slots, key=lambda s: s.time):
+                if f"{day.date} {slot.time}" < now_key or (court is not None and court not in slot.court_ids):
+                    continue
+                courts = [config.COURT_MAPPING.get(court, str(court))] if court is not None else slot.courts
+                return f"Next free slot: *{day.date}* {slot.time} ({', '.join(courts)})"
+        return "No free slot among the monitored dates."
+
+    def watch(self, args: List[str], chat_id: str, now: datetime) -> str:
+        # Concurrent commands would otherwise overwrite each other's changes to the registry
+        with persist.locked(config.SUBSCRIPTIONS_FILE):
+            return self._watch(args, chat_id, now)
+
+    def _watch(self, args: List[str], chat_id: str, now: datetime) -> str:
+        registered = subscriptions.registered_subscriptions()
+        subscription_list = subscriptions.with_default(registered)
+        # Every watched date is scraped on each run, so only known chats may add them
+        if chat_id not in allowed_chats(subscription_list):
+            logger.warning(f"Rejected /watch from chat {chat_id}, which is not allowed")
+            return "This chat may not watch dates. Ask the operator to add it to BOT_ALLOWED_CHAT_IDS."
+        if len(args) != 2:
+            return f"Usage: /watch <date> <19:00-21:00>\n\n{HELP_TEXT}"
+        date_str, window = parse_date(args[0], now.date()), parse_window(args[1])
+        if date_str is None or window is None:
+            return f"Could not understand '{escape_markdown(' '.join(args))}'.\n\n{HELP_TEXT}"
+        today = now.date().isoformat()
+        if date_str < today:
+            return f"{date_str} is in the past."
+        horizon = (now.date() + timedelta(days=config.TARGET_HORIZON_DAYS)).isoformat()
+        if date_str > horizon:
+            return f"{date_str} is too far ahead. Dates up to {horizon} can be watched."
+
+        target = TargetInterval(date=date_str, start_time=window[0], end_time=window[1])
+        current = next((s for s in subscription_list if s.chat_id == chat_id), None)
+        name = current.name if current else f"chat-{chat_id}"
+        subscription = next((s for s in registered if s.name == name), None)
+        if subscription is None:
+            # Only the watched dates are stored for the default subscriber; its sheet and chat stay in the environment
+            subscription = Subscription(
+                name=name, chat_id=None if name == subscriptions.DEFAULT_SUBSCRIBER else chat_id
+            )
+            registered.append(subscription)
+        subscription.targets = [t for t in subscription.targets if t.date >= today]
+        if target not in subscription.targets:
+            if len(subscription.targets) >= config.BOT_MAX_WATCHES_PER_CHAT:
+                return f"This chat already watches {len(subscription.targets)} windows, the most allowed."
+            subscription.targets.append(target)
+        subscriptions.save_subscriptions(registered)
+        logger.info(f"Subscriber {subscription.name} now watches {date_str} {window[0]}-{window[1]}")
+        return f"Watching *{date_str}* {window[0]}-{window[1]}. You'll be notified about new free slots."
+
+    # --- Long polling ---
+
+    def _call(self, method: str, params: Dict, timeout: float) -> Dict:
+        response = self.session.post(f"{self.base_url}/{method}", json=params, timeout=timeout)
+        response.raise_for_status()
+        data: Dict = response.json()
+        return data
+
+    def reply(self, chat_id: str, text: str):
+        for chunk in split_message(text):
+            try:
+                params = {"chat_id": chat_id, "text": chunk, "parse_mode": "Markdown"}
+                self._call("sendMessage", params, config.TELEGRAM_TIMEOUT_SECONDS)
+            except requests.exceptions.RequestException as e:
+                logger.error(f"Failed to reply to chat {chat_id}: {e}")
+
+    def poll_once(self) -> int:
+        """Fetches one batch of updates and answers them. Returns the number of updates handled."""
+        params: Dict = {"timeout": self.poll_timeout, "allowed_updates": ["message"]}
+        if self.offset is not None:
+            params["offset"] = self.offset
+        updates = self._call("getUpdates", params, self.poll_timeout + config.TELEGRAM_TIMEOUT_SECONDS)
+        for update in updates.get("result", []):
+            # Confirms the update, so Telegram won't send it again
+            self.offset = update["update_id"] + 1
+            message = update.get("message") or {}
+            text, chat_id = message.get("text"), str(message.get("chat", {}).get("id", ""))
+            if not text or not chat_id:
+                continue
+            try:
+                answer = self.handle(text, chat_id)
+            except Exception:
+                # The update is confirmed already, so a failing command is not retried forever
+                logger.exception(f"Failed to handle {text!r} from chat {chat_id}")
+                continue
+            if answer:
+                self.reply(chat_id, answer)
+        return len(updates.get("result", []))
+
+    def run_forever(self, stop: threading.Event | None = None):
+        """Polls until `stop` is set, backing off after errors."""
+        stop = stop or threading.Event()
+        logger.info("Listening for bot commands")
+        while not stop.is_set():
+            try:
+                self.poll_once()
+            except (requests.exceptions.RequestException, ValueError) as e:
+                logger.error(f"Polling bot updates failed: {e}")
+                stop.wait(5)
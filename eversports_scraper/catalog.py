@@ -0,0 +1,213 @@
+import json
+import logging
+import os
+import re
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import cloudscraper
+from pydantic import BaseModel
+
+from eversports_scraper import config, persist
+from eversports_scraper.recurrence import WEEKDAY_NAMES
+
+logger = logging.getLogger(__name__)
+
+# Embedded state of the widget page, e.g. <script id="__NEXT_DATA__" type="application/json">{...}</script>
+SCRIPT_JSON_PATTERN = re.compile(r"<script[^>]*type=\"application/(?:ld\+)?json\"[^>]*>(.*?)</script>", re.DOTALL)
+STATE_ASSIGNMENT_PATTERN = re.compile(r"window\.__[A-Z_]+__\s*=\s*(\{.*?\})\s*;?\s*</script>", re.DOTALL)
+
+COURT_LIST_KEYS = ("courts", "units", "resources")
+OPENING_HOURS_KEYS = ("openingHours", "openingTimes", "businessHours")
+
+
+class Catalog(BaseModel):
+    facility_id: int
+    fetched_at: str  # When these courts and opening hours were discovered
+    checked_at: str  # Last discovery attempt, successful or not
+    courts: Dict[int, str]  # Court ID -> name
+    opening_hours: Dict[int, Tuple[str, str]] = {}  # 0 = Monday -> (opening, closing)
+
+
+def _catalog_path(facility_id: int) -> str:
+    return os.path.join(config.CATALOG_DIR, f"{facility_id}.json")
+
+
+def _walk(node) -> Iterator[Tuple[str, object]]:
+    if isinstance(node, dict):
+        for key, value in node.items():
+            yield key, value
+            yield from _walk(value)
+    elif isinstance(node, list):
+        for item in node:
+            yield from _walk(item)
+
+
+def _embedded_documents(html: str) -> List[object]:
+    documents = []
+    for match in list(SCRIPT_JSON_PATTERN.finditer(html)) + list(STATE_ASSIGNMENT_PATTERN.finditer(html)):
+        try:
+            documents.append(json.loads(match.group(1)))
+        except json.JSONDecodeError:
+            continue
+    return documents
+
+
+def _sport_matches(court: Dict) -> bool:
+    sport = court.get("sport")
+    if isinstance(sport, dict):
+        sport = sport.get("slug") or sport.get("name")
+    return sport is None or str(sport).lower() == config.SPORT.lower()
+
+
+def _parse_time(value) -> Optional[str]:
+    digits = re.sub(r"\D", "", str(value))[:4]
+    if len(digits) == 3:
+        digits = f"0{digits}"
+    if len(digits) != 4 or int(digits[:2]) > 24 or int(digits[2:]) > 59:
+        return None
+    return f"{digits[:2]}:{digits[2:]}"
+
+
+def _parse_weekday(value) -> Optional[int]:
+    if isinstance(value, int) and 1 <= value <= 7:
+        return value - 1  # ISO weekday
+    return WEEKDAY_NAMES.get(str(value).lower())
+
+
+def parse_widget(html: str, facility_id: int, now: datetime | None = None) -> Optional[Catalog]:
+    """Extracts the courts and opening hours from the JSON state embedded in the widget page.
+
+    The widget's state is not a documented API, so courts are recognised structurally: lists
+    under `courts`/`units`/`resources` whose items have an integer `id` and a `name`, limited to
+    the configured sport when the items name one. Returns None if no court was found.
+    """
+    courts: Dict[int, str] = {}
+    opening_hours: Dict[int, Tuple[str, str]] = {}
+    for document in _embedded_documents(html):
+        for key, value in _walk(document):
+            if key in COURT_LIST_KEYS and isinstance(value, list):
+                for item in value:
+                    if (
+                        isinstance(item, dict)
+                        and isinstance(item.get("id"), int)
+                        and isinstance(item.get("name"), str)
+                        and _sport_matches(item)
+                    ):
+                        courts[item["id"]] = item["name"].strip()
+            elif key in OPENING_HOURS_KEYS and isinstance(value, list):
+                for item in value:
+                    if not isinstance(item, dict):
+                        continue
+                    weekday = _parse_weekday(item.get("day", item.get("weekday", item.get("dayOfWeek"))))
+                    opening = _parse_time(item.get("open", item.get("start", item.get("from"))))
+                    closing = _parse_time(item.get("close", item.get("end", item.get("to"))))
+                    if weekday is not None and opening and closing and opening < closing:
+                        opening_hours[weekday] = (opening, closing)
+
+    if not courts:
+        return None
+    now = now or datetime.now().astimezone()
+    return Catalog(
+        facility_id=facility_id,
+        fetched_at=now.isoformat(),
+        checked_at=now.isoformat(),
+        courts=courts,
+        opening_hours=opening_hours,
+    )
+
+
+def fetch_catalog(facility_id: int, now: datetime | None = None) -> Optional[Catalog]:
+    """Downloads the facility's widget page and discovers the facility's catalog from it."""
+    url = config.WIDGET_URLS.get(facility_id)
+    if url is None:
+        logger.error(f"No widget page configured for facility {facility_id}. Add it to WIDGET_URLS.")
+        return None
+    try:
+        scraper = cloudscraper.create_scraper()
+        response = scraper.get(url, headers=config.COMMON_HEADERS, timeout=10)
+        response.raise_for_status()
+    except Exception as e:
+        logger.error(f"Failed to fetch widget page for catalog discovery: {e}")
+        return None
+    catalog = parse_widget(response.text, facility_id, now)
+    if catalog is None:
+        logger.warning("No courts found on the widget page. Keeping the configured courts.")
+    return catalog
+
+
+def load_cached_catalog(facility_id: int) -> Optional[Catalog]:
+    path = _catalog_path(facility_id)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r") as f:
+            return Catalog(**json.load(f))
+    except Exception as e:
+        logger.warning(f"Failed to load cached catalog from {path}: {e}")
+        return None
+
+
+def save_catalog(catalog: Catalog):
+    try:
+        persist.write_json_atomic(_catalog_path(catalog.facility_id), catalog.model_dump(mode="json"))
+    except IOError as e:
+        logger.error(f"Failed to save catalog: {e}")
+
+
+def describe_changes(old: Catalog, new: Catalog) -> List[str]:
+    changes = []
+    for court_id in sorted(set(new.courts) - set(old.courts)):
+        changes.append(f"court {court_id} ({new.courts[court_id]}) added")
+    for court_id in sorted(set(old.courts) - set(new.courts)):
+        changes.append(f"court {court_id} ({old.courts[court_id]}) removed")
+    for court_id in sorted(set(old.courts) & set(new.courts)):
+        if old.courts[court_id] != new.courts[court_id]:
+            changes.append(f"court {court_id} renamed from {old.courts[court_id]} to {new.courts[court_id]}")
+    for weekday in sorted(set(old.opening_hours) | set(new.opening_hours)):
+        if old.opening_hours.get(weekday) != new.opening_hours.get(weekday):
+            changes.append(
+                f"opening hours on weekday {weekday} changed from {old.opening_hours.get(weekday)} "
+                f"to {new.opening_hours.get(weekday)}"
+            )
+    return changes
+
+
+def get_catalog(facility_id: int | None = None, now: datetime | None = None) -> Optional[Catalog]:
+    """Returns the facility's catalog, rediscovering it at most once per refresh interval.
+
+    A failed discovery keeps the cached copy, or None if there is none, until the next interval,
+    so an unreachable widget page doesn't cost a request on every run.
+    """
+    facility_id = facility_id or config.FACILITY_ID
+    now = now or datetime.now().astimezone()
+    cached = load_cached_catalog(facility_id)
+    if cached is not None and now - datetime.fromisoformat(cached.checked_at) < timedelta(
+        hours=config.CATALOG_REFRESH_HOURS
+    ):
+        logger.debug(f"Using cached catalog for facility {facility_id}, discovered {cached.fetched_at}")
+        return cached if cached.courts else None
+
+    discovered = fetch_catalog(facility_id, now)
+    if discovered is None:
+        fallback = cached or Catalog(facility_id=facility_id, fetched_at=now.isoformat(), checked_at="", courts={})
+        fallback.checked_at = now.isoformat()
+        save_catalog(fallback)
+        return fallback if fallback.courts else None
+
+    if cached is not None and cached.courts:
+        changes = describe_changes(cached, discovered)
+        if changes:
+            logger.warning(f"Catalog of facility {facility_id} changed: {'; '.join(changes)}")
+    save_catalog(discovered)
+    return discovered
+
+
+def apply(catalog: Catalog):
+    """Replaces the configured courts and opening hours with the discovered ones."""
+    if set(catalog.courts) != set(config.COURT_IDS):
+        logger.warning(f"Using discovered courts {sorted(catalog.courts)} instead of {sorted(config.COURT_IDS)}")
+    config.COURT_IDS = sorted(catalog.courts)
+    config.COURT_MAPPING = dict(sorted(catalog.courts.items()))
+    if catalog.opening_hours:
+        config.OPENING_HOURS = dict(catalog.opening_hours)
@@ -2,7 +2,8 @@ import argparse
 import logging
 import sys
 
-from eversports_scraper import run
+from eversports_scraper import backtest, bot, config, latency, run, server, shards, stats
+from eversports_scraper.errors import NoTargetDatesError, ScraperError
 
 # --- Logging Setup ---
 
@@ -33,11 +34,96 @@ def parse_arguments():
     parser = argparse.ArgumentParser(description="Scrape Eversports for free badminton courts.")
     parser.add_argument("--start-date", type=str, help="Start date in YYYY-MM-DD format. Defaults to today.")
     parser.add_argument("--days", type=int, default=3, help="Number of days to check. Defaults to 3.")
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        help="Seconds the run may take. Dates not fetched in time are fetched first by the next run. "
+        "Defaults to RUN_DEADLINE_SECONDS (no limit).",
+    )
     parser.add_argument("-v", "--verbose", action="store_true", help="Enable verbose logging.")
+
+    subparsers = parser.add_subparsers(dest="command", metavar="command")
+    serve_parser = subparsers.add_parser(
+        "serve", help="Scrape in the background and serve the results over a local HTTP API."
+    )
+    serve_parser.add_argument("--host", type=str, help="Interface to bind to. Defaults to SERVE_HOST (127.0.0.1).")
+    serve_parser.add_argument("--port", type=int, help="Port to listen on. Defaults to SERVE_PORT (8080).")
+    serve_parser.add_argument(
+        "--interval", type=float, help="Seconds between scrapes. Defaults to SERVE_INTERVAL_SECONDS (300)."
+    )
+    serve_parser.add_argument(
+        "--bot", action="store_true", help="Also answer Telegram bot commands from the in-memory index."
+    )
+    subparsers.add_parser("bot", help="Answer Telegram bot commands from the last published report.")
+    shard_parser = subparsers.add_parser(
+        "shard", help="Fetch the target dates no other worker has claimed and save them as partial snapshots."
+    )
+    shard_parser.add_argument("--worker", type=str, help="Worker name in the lease store. Defaults to host and PID.")
+    subparsers.add_parser(
+        "merge", help="Build the history, report and notifications from the workers' partial snapshots."
+    )
+    stats_parser = subparsers.add_parser(
+        "stats", help="Show occupancy, cancellation and lead time statistics of the archive. Needs NumPy."
+    )
+    stats_parser.add_argument("--csv", type=str, metavar="DIR", help="Also export the statistics as CSV files.")
+    backtest_parser = subparsers.add_parser(
+        "backtest",
+        help="Replay the archive through notification rule sets and compare their alerts and delays. Needs NumPy.",
+    )
+    backtest_parser.add_argument(
+        "--rules", type=str, metavar="FILE", help="JSON list of rule sets to compare. Defaults to the configured rules."
+    )
+    subparsers.add_parser(
+        "latency",
+        help="Show how long after being freed courts were detected and notified, per day and against the SLO.",
+    )
     return parser.parse_args()
 
 
 def main():
     args = parse_arguments()
     setup_logging(args.verbose)
-    run.run(start_date=args.start_date, days=args.days)
+    try:
+        dispatch(args)
+    except NoTargetDatesError as e:
+        # Nothing to scrape is not a failure, e.g. for a scheduled run after the last booked date
+        logger.info(f"{e}, nothing to scrape.")
+    except ScraperError as e:
+        logger.error(str(e))
+        sys.exit(1)
+
+
+def dispatch(args: argparse.Namespace):
+    """Runs the selected command."""
+    if args.command == "serve":
+        server.serve(
+            host=args.host,
+            port=args.port,
+            interval=args.interval,
+            start_date=args.start_date,
+            days=args.days,
+            with_bot=args.bot,
+        )
+        return
+    if args.command == "bot":
+        if not config.TELEGRAM_BOT_TOKEN:
+            logger.error("TELEGRAM_BOT_TOKEN is not set.")
+            sys.exit(1)
+        bot.CommandBot(config.TELEGRAM_BOT_TOKEN).run_forever()
+        return
+    if args.command == "shard":
+        shards.work(worker=args.worker, start_date=args.start_date, days=args.days, deadline=args.deadline)
+        return
+    if args.command == "merge":
+        run.print_outcome(shards.merge(start_date=args.start_date, days=args.days))
+        return
+    if args.command == "stats":
+        stats.main(csv_dir=args.csv)
+        return
+    if args.command == "latency":
+        latency.main()
+        return
+    if args.command == "backtest":
+        backtest.main(rules_path=args.rules)
+        return
+    run.print_outcome(run.run(start_date=args.start_date, days=args.days, deadline=args.deadline))
@@ -1,6 +1,6 @@
 import logging
 import os
-from typing import Dict, List
+from typing import Dict, List, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -8,9 +8,103 @@ logger = logging.getLogger(__name__)
 DATA_DIR = "public/data"
 HISTORY_FILE = os.path.join(DATA_DIR, "availability.json")
 REPORT_FILE = os.path.join(DATA_DIR, "report.json")
+MANIFEST_FILE = os.path.join(DATA_DIR, "manifest.json")
+DAYS_DIR = os.path.join(DATA_DIR, "days")
+AGGREGATES_FILE = os.path.join(DATA_DIR, "aggregates.json")
+
+# Internal state that must survive between runs but is not published with the dashboard
+STATE_DIR = os.environ.get("SCRAPER_STATE_DIR", ".state")
+OUTBOX_FILE = os.path.join(STATE_DIR, "outbox.json")
+# Last good copy of each target dates sheet, for conditional requests and as a fallback
+SHEET_CACHE_DIR = os.path.join(STATE_DIR, "sheets")
+# Delivered outbox entries are kept this long so a re-detected slot is not posted twice
+OUTBOX_RETENTION_MINUTES = int(os.environ.get("OUTBOX_RETENTION_MINUTES", "60"))
+
+# Slot API responses, shared between overlapping runs. Near dates expire after the near TTL, and
+# the TTL grows linearly up to the far TTL at RESPONSE_CACHE_FAR_DAYS ahead. Expired entries are
+# still served for RESPONSE_CACHE_STALE_SECONDS while they are refreshed in the background.
+RESPONSE_CACHE_DIR = os.path.join(STATE_DIR, "responses")
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", "256"))  # 0 disables the cache
+RESPONSE_CACHE_TTL_NEAR_SECONDS = float(os.environ.get("RESPONSE_CACHE_TTL_NEAR_SECONDS", "60"))
+RESPONSE_CACHE_TTL_FAR_SECONDS = float(os.environ.get("RESPONSE_CACHE_TTL_FAR_SECONDS", "900"))
+RESPONSE_CACHE_FAR_DAYS = int(os.environ.get("RESPONSE_CACHE_FAR_DAYS", "14"))
+RESPONSE_CACHE_STALE_SECONDS = float(os.environ.get("RESPONSE_CACHE_STALE_SECONDS", "120"))
+# Counters of the last run, e.g. response cache hits and misses
+METRICS_FILE = os.path.join(STATE_DIR, "metrics.json")
+
+# Opt-in: occupancy of every polled court and slot, appended each run for the stats command
+ARCHIVE_ENABLED = os.environ.get("ARCHIVE_ENABLED", "false").lower() in ("1", "true", "yes")
+ARCHIVE_DIR = os.environ.get("ARCHIVE_DIR", os.path.join(STATE_DIR, "archive"))
+# Polls older than this are dropped from the archive, about once a day
+ARCHIVE_RETENTION_DAYS = int(os.environ.get("ARCHIVE_RETENTION_DAYS", "90"))
+
+# --- Run time budget ---
+# Seconds a run may take before it stops fetching (0 = no limit), overridden by --deadline
+RUN_DEADLINE_SECONDS = float(os.environ.get("RUN_DEADLINE_SECONDS", "0"))
+# Part of the budget kept for the last fetch to finish and for saving and notifying. Notifying gets
+# whatever of it is left, so a run never overruns its budget waiting for NOTIFY_DEADLINE_SECONDS.
+DEADLINE_RESERVE_SECONDS = float(os.environ.get("DEADLINE_RESERVE_SECONDS", "15"))
+# Dates skipped when the budget ran out, fetched first by the next run
+CHECKPOINT_FILE = os.path.join(STATE_DIR, "checkpoint.json")
+
+# --- Async fetching ---
+# Fetch the dates of a run concurrently over one pooled httpx client (pip install -e .[async]).
+# cloudscraper is only used for a date whose response is a challenge. Without httpx, dates are
+# fetched one by one with cloudscraper.
+ASYNC_FETCH = os.environ.get("ASYNC_FETCH", "true").lower() in ("1", "true", "yes")
+ASYNC_FETCH_CONCURRENCY = int(os.environ.get("ASYNC_FETCH_CONCURRENCY", "16"))
+# HTTP/2 needs the h2 package, otherwise HTTP/1.1 with keep-alive is used
+HTTP2 = os.environ.get("HTTP2", "true").lower() in ("1", "true", "yes")
+# Cookies shared by both fetch paths and kept between runs, e.g. the clearance of a solved challenge
+COOKIE_FILE = os.path.join(STATE_DIR, "cookies.json")
+
+# Registry of subscribers, each with their own target sheet, chat and court preferences.
+# Without it, TARGET_DATES_CSV_URL and TELEGRAM_CHAT_ID act as a single default subscriber.
+SUBSCRIPTIONS_FILE = os.environ.get("SUBSCRIPTIONS_FILE", os.path.join(STATE_DIR, "subscriptions.json"))
+
+# --- Notification throttling ---
+NOTIFY_INDEX_FILE = os.path.join(STATE_DIR, "notify_index.json")
+# A court notified within this many minutes is not notified again, even if it was rebooked in between
+NOTIFY_COOLDOWN_MINUTES = int(os.environ.get("NOTIFY_COOLDOWN_MINUTES", "60"))
+# Number of consecutive polls a court must be free before it is notified
+NOTIFY_MIN_FREE_POLLS = int(os.environ.get("NOTIFY_MIN_FREE_POLLS", "1"))
+
+# --- Detection latency ---
+# When each freed court was last seen booked, first seen free and notified, for the latency SLO
+LATENCY_FILE = os.path.join(STATE_DIR, "latency.json")
+LATENCY_RETENTION_DAYS = int(os.environ.get("LATENCY_RETENTION_DAYS", "30"))
+# Target for the time from the last poll that saw a court booked to the delivered notification
+LATENCY_SLO_SECONDS = float(os.environ.get("LATENCY_SLO_SECONDS", "600"))
+
+# --- Sharded scraping ---
+# Workers claim dates through leases in a shared SQLite file and write one partial snapshot per date
+SHARD_LEASE_DB = os.environ.get("SHARD_LEASE_DB", os.path.join(STATE_DIR, "leases.sqlite"))
+SHARD_DIR = os.environ.get("SHARD_DIR", os.path.join(STATE_DIR, "shards"))
+# A lease not completed within this time is considered abandoned and can be claimed by another worker
+SHARD_LEASE_SECONDS = float(os.environ.get("SHARD_LEASE_SECONDS", "60"))
+# A date fetched by any worker within this time is not fetched again, i.e. one round of polling
+SHARD_ROUND_SECONDS = float(os.environ.get("SHARD_ROUND_SECONDS", "120"))
+# Partial snapshots older than this are not merged, as their worker has stopped polling the date
+SHARD_PARTIAL_MAX_AGE_SECONDS = float(os.environ.get("SHARD_PARTIAL_MAX_AGE_SECONDS", "600"))
+
+# --- Court and schedule catalog ---
+# Opt-in: courts and opening hours are discovered from the widget page and override the constants below
+CATALOG_DISCOVERY = os.environ.get("CATALOG_DISCOVERY", "false").lower() in ("1", "true", "yes")
+CATALOG_DIR = os.path.join(STATE_DIR, "catalog")
+CATALOG_REFRESH_HOURS = float(os.environ.get("CATALOG_REFRESH_HOURS", "24"))
+
+# --- Multi-slot blocks ---
+# Only alert on new slots that are part of this many consecutive free slots (1 = every slot)
+NOTIFY_MIN_BLOCK_SLOTS = int(os.environ.get("NOTIFY_MIN_BLOCK_SLOTS", "1"))
+# Whether a block must stay on one court, or may switch courts between slots
+BLOCK_SAME_COURT = os.environ.get("BLOCK_SAME_COURT", "true").lower() in ("1", "true", "yes")
+# The report lists runs of at least this many consecutive free slots
+REPORT_BLOCK_SLOTS = int(os.environ.get("REPORT_BLOCK_SLOTS", "2"))
 
 # --- URLs & API ---
 TARGET_DATES_CSV_URL = os.environ.get("TARGET_DATES_CSV_URL")
+# Recurring rules in the target sheet are expanded this many days ahead
+TARGET_HORIZON_DAYS = int(os.environ.get("TARGET_HORIZON_DAYS", "28"))
 
 # --- Scraper configuration ---
 # Kept deliberately simple: just constants and direct env lookups.
@@ -19,7 +113,18 @@ COURT_IDS: List[int] = [77394, 77395, 77396]
 COURT_MAPPING: Dict[int, str] = {77394: "Court 1", 77395: "Court 2", 77396: "Court 3"}
 
 SPORT = os.environ.get("SPORT", "badminton")
+SLOT_DURATION_MINUTES = 45
+# Opening and closing time; slots of SLOT_DURATION_MINUTES start at opening and end by closing.
+# Days missing from OPENING_HOURS (0 = Monday) use the default.
+DEFAULT_OPENING_HOURS: Tuple[str, str] = ("10:15", "23:00")
+OPENING_HOURS: Dict[int, Tuple[str, str]] = {}
 WIDGET_URL = "https://www.eversports.de/widget/w/c7o9ft"
+# Widget pages of other facilities for catalog discovery, as comma-separated `facility_id=url` pairs
+WIDGET_URLS: Dict[int, str] = {
+    int(facility.strip()): url.strip()
+    for facility, _, url in (p.partition("=") for p in os.environ.get("WIDGET_URLS", "").split(",") if "=" in p)
+}
+WIDGET_URLS.setdefault(FACILITY_ID, WIDGET_URL)
 API_BASE = "https://www.eversports.de/widget/api/slot"
 
 # Headers to mimic a browser
@@ -43,8 +148,49 @@ COMMON_HEADERS: Dict[str, str] = {
     "X-Requested-With": "XMLHttpRequest",
 }
 
+# --- Local HTTP API (`serve` subcommand) ---
+SERVE_HOST = os.environ.get("SERVE_HOST", "127.0.0.1")
+SERVE_PORT = int(os.environ.get("SERVE_PORT", "8080"))
+SERVE_INTERVAL_SECONDS = float(os.environ.get("SERVE_INTERVAL_SECONDS", "300"))
+# Newly free courts stay queryable through /new-since for this long
+SERVE_EVENT_RETENTION_MINUTES = int(os.environ.get("SERVE_EVENT_RETENTION_MINUTES", "1440"))
+
 # --- Telegram ---
 TELEGRAM_BOT_TOKEN = os.environ.get("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHAT_ID = os.environ.get("TELEGRAM_CHAT_ID")
+TELEGRAM_API_BASE = os.environ.get("TELEGRAM_API_BASE", "https://api.telegram.org")
+# Messages queued within this window are merged into one; Telegram allows ~1 message/second per chat
+TELEGRAM_MERGE_WINDOW_SECONDS = float(os.environ.get("TELEGRAM_MERGE_WINDOW_SECONDS", "2"))
+TELEGRAM_MIN_INTERVAL_SECONDS = float(os.environ.get("TELEGRAM_MIN_INTERVAL_SECONDS", "1"))
+TELEGRAM_TIMEOUT_SECONDS = float(os.environ.get("TELEGRAM_TIMEOUT_SECONDS", "10"))
+# Long polling timeout of the bot command loop
+TELEGRAM_POLL_TIMEOUT_SECONDS = int(os.environ.get("TELEGRAM_POLL_TIMEOUT_SECONDS", "30"))
+# Comma-separated chats that may add dates with /watch, besides TELEGRAM_CHAT_ID and the registry's chats
+BOT_ALLOWED_CHAT_IDS: List[str] = [
+    c.strip() for c in os.environ.get("BOT_ALLOWED_CHAT_IDS", "").split(",") if c.strip()
+]
+# Most windows one chat can watch at a time
+BOT_MAX_WATCHES_PER_CHAT = int(os.environ.get("BOT_MAX_WATCHES_PER_CHAT", "10"))
 if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
     logger.warning("Telegram configuration incomplete. Skipping notifications.")
+
+# --- Notifier backends ---
+# Comma-separated list of backends to deliver to: telegram, webhook, email, file
+NOTIFIERS: List[str] = [n.strip() for n in os.environ.get("NOTIFIERS", "telegram").split(",") if n.strip()]
+# Upper bound on how long a run waits for all backends to finish delivering, within the run deadline
+NOTIFY_DEADLINE_SECONDS = float(os.environ.get("NOTIFY_DEADLINE_SECONDS", "60"))
+
+WEBHOOK_URL = os.environ.get("WEBHOOK_URL")
+WEBHOOK_TIMEOUT_SECONDS = float(os.environ.get("WEBHOOK_TIMEOUT_SECONDS", "10"))
+
+SMTP_HOST = os.environ.get("SMTP_HOST")
+SMTP_PORT = int(os.environ.get("SMTP_PORT", "25"))
+SMTP_USER = os.environ.get("SMTP_USER")
+SMTP_PASSWORD = os.environ.get("SMTP_PASSWORD")
+SMTP_STARTTLS = os.environ.get("SMTP_STARTTLS", "").lower() in ("1", "true", "yes")
+SMTP_FROM = os.environ.get("SMTP_FROM")
+SMTP_TO: List[str] = [a.strip() for a in os.environ.get("SMTP_TO", "").split(",") if a.strip()]
+SMTP_TIMEOUT_SECONDS = float(os.environ.get("SMTP_TIMEOUT_SECONDS", "10"))
+
+# Path for the file backend; "-" writes to stdout
+NOTIFY_FILE = os.environ.get("NOTIFY_FILE", "-")
@@ -0,0 +1,111 @@
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List
+
+from eversports_scraper import config, persist
+from eversports_scraper.models import DayAvailability, FreeSlotsMap
+from eversports_scraper.outbox import slot_key
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationIndex:
+    """Tracks how long courts have been free and when they were last notified.
+
+    A court becomes eligible for a notification once it has been free for `min_free_polls`
+    consecutive polls, unless it was already notified within the last `cooldown_minutes`. This
+    suppresses flapping courts that are cancelled and rebooked repeatedly.
+    """
+
+    def __init__(
+        self,
+        streaks: Dict[str, Dict[str, int]] | None = None,
+        notified: Dict[str, str] | None = None,
+        cooldown_minutes: int | None = None,
+        min_free_polls: int | None = None,
+    ):
+        # date -> "HH:MM|court_id" -> number of consecutive polls the court was seen free
+        self.streaks: Dict[str, Dict[str, int]] = streaks or {}
+        # slot key -> ISO timestamp of the last notification
+        self.notified: Dict[str, str] = notified or {}
+        self.cooldown = timedelta(
+            minutes=config.NOTIFY_COOLDOWN_MINUTES if cooldown_minutes is None else cooldown_minutes
+        )
+        self.min_free_polls = max(1, config.NOTIFY_MIN_FREE_POLLS if min_free_polls is None else min_free_polls)
+
+    @classmethod
+    def load(cls) -> "NotificationIndex":
+        """Loads the index from disk, starting empty if it is missing or unreadable."""
+        if not os.path.exists(config.NOTIFY_INDEX_FILE):
+            return cls()
+        try:
+            with open(config.NOTIFY_INDEX_FILE, "r") as f:
+                data = json.load(f)
+            return cls(streaks=data["streaks"], notified=data["notified"])
+        except (json.JSONDecodeError, KeyError, IOError):
+            logger.warning("Failed to load notification index. Starting fresh.")
+            return cls()
+
+    def save(self, now: datetime):
+        """Evicts expired entries and persists the index."""
+        self.evict(now)
+        try:
+            persist.write_json_atomic(
+                config.NOTIFY_INDEX_FILE, {"streaks": self.streaks, "notified": self.notified}, indent=None
+            )
+        except IOError as e:
+            logger.error(f"Failed to save notification index: {e}")
+
+    def evict(self, now: datetime):
+        """Drops streaks for past dates and notifications older than the cooldown."""
+        today = now.strftime("%Y-%m-%d")
+        cutoff = (now - self.cooldown).isoformat()
+        self.streaks = {d: s for d, s in self.streaks.items() if d >= today}
+        self.notified = {k: ts for k, ts in self.notified.items() if ts >= cutoff and k[:10] >= today}
+
+    def in_cooldown(self, key: str, now: datetime) -> bool:
+        last = self.notified.get(key)
+        return last is not None and last >= (now - self.cooldown).isoformat()
+
+    def observe(self, day: DayAvailability, prev_free_slots_map: FreeSlotsMap, now: datetime) -> Dict[str, List[int]]:
+        """Records one poll of a date and returns the courts eligible for notification by slot.
+
+        Courts unknown to the index (for example on the first run after upgrading) only start a
+        new streak if the scrape flagged them as newly free; otherwise they count as long-standing.
+        """
+        date_str = day.date
+        previous = self.streaks.get(date_str, {})
+        current: Dict[str, int] = {}
+        eligible: Dict[str, List[int]] = {}
+        new_times = {s.time for s in day.slots if s.is_new}
+        cap = self.min_free_polls + 1
+
+        for slot_time, court_ids in day.free_slots_map.items():
+            prev_free = set(prev_free_slots_map.get(slot_time, []))
+            for court_id in court_ids:
+                streak_key = f"{slot_time}|{court_id}"
+                if streak_key in previous:
+                    streak = previous[streak_key] + 1
+                elif court_id in prev_free or slot_time not in new_times:
+                    streak = cap
+                else:
+                    streak = 1
+                # Cap the counter; only reaching the threshold matters
+                current[streak_key] = streak if streak < cap else cap
+
+                if streak == self.min_free_polls:
+                    if self.in_cooldown(slot_key(date_str, slot_time, court_id), now):
+                        logger.debug(f"Suppressing {date_str} {slot_time} court {court_id}: notified recently")
+                        continue
+                    eligible.setdefault(slot_time, []).append(court_id)
+
+        # Courts missing from this poll are booked again, which resets their streak
+        self.streaks[date_str] = current
+        return eligible
+
+    def mark_notified(self, keys: Iterable[str], now: datetime):
+        timestamp = now.isoformat()
+        for key in keys:
+            self.notified[key] = timestamp
@@ -0,0 +1,14 @@
+class ScraperError(Exception):
+    """Base class of the errors raised to callers of the scraper instead of exiting."""
+
+
+class NoTargetDatesError(ScraperError):
+    """There is nothing to scrape, e.g. the target sheet only lists past dates. Not a failure."""
+
+
+class ConfigurationError(ScraperError, ValueError):
+    """A setting or argument is invalid, e.g. a start date not in YYYY-MM-DD format."""
+
+
+class FetchError(ScraperError):
+    """The bookings of a date could not be fetched or parsed."""
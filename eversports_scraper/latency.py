@@ -0,0 +1,214 @@
+import json
+import logging
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from eversports_scraper import config, metrics, persist
+from eversports_scraper.models import DayAvailability, HistoryState
+from eversports_scraper.outbox import DELIVERED, OutboxEntries, slot_key
+
+logger = logging.getLogger(__name__)
+
+# Latencies of a freed court, each in seconds between two of its timestamps
+LATENCIES = {
+    "detection": ("booked_at", "detected_at"),  # Upper bound: the court became free after the poll that saw it booked
+    "delivery": ("detected_at", "delivered_at"),
+    "end_to_end": ("booked_at", "delivered_at"),
+}
+
+
+def _seconds(earlier: str, later: str) -> float:
+    return (datetime.fromisoformat(later) - datetime.fromisoformat(earlier)).total_seconds()
+
+
+def latencies(events: List[Dict], name: str) -> List[float]:
+    """Returns one latency of every event that has both of its timestamps."""
+    start, end = LATENCIES[name]
+    return [_seconds(e[start], e[end]) for e in events if start in e and end in e]
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    """Returns the count, median, 90th percentile and maximum of a latency distribution."""
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+
+    def percentile(share: float) -> float:
+        return ordered[min(int(len(ordered) * share), len(ordered) - 1)]
+
+    return {"count": len(ordered), "p50": percentile(0.5), "p90": percentile(0.9), "max": ordered[-1]}
+
+
+def load() -> Dict[str, List[Dict]]:
+    """Loads the freed courts and the run summaries, starting empty if the file is missing or unreadable."""
+    if not os.path.exists(config.LATENCY_FILE):
+        return {"events": [], "runs": []}
+    try:
+        with open(config.LATENCY_FILE, "r") as f:
+            data = json.load(f)
+        return {"events": list(data["events"]), "runs": list(data["runs"])}
+    except (json.JSONDecodeError, KeyError, IOError):
+        logger.warning("Failed to load latency file. Starting fresh.")
+        return {"events": [], "runs": []}
+
+
+def freed_courts(days: List[DayAvailability], history: HistoryState, fetch_times: Dict[str, str]) -> List[Dict]:
+    """Returns an event for every court that is free in a poll but was booked in the previous poll of its date.
+
+    The court became free between the two polls, so the previous fetch time bounds the detection
+    latency. Dates without an earlier poll are left out, as all their courts would count as freed.
+    """
+    events = []
+    for day in days:
+        prev_free_slots_map, booked_at = history.get(day.date), fetch_times.get(day.date)
+        if prev_free_slots_map is None or not booked_at or not day.fetched_at:
+            continue
+        if _seconds(booked_at, day.fetched_at) <= 0:
+            continue
+        for slot_time, court_ids in day.free_slots_map.items():
+            if slot_time not in prev_free_slots_map:
+                continue
+            prev_free = set(prev_free_slots_map[slot_time])
+            for court_id in court_ids:
+                if court_id not in prev_free:
+                    events.append(
+                        {
+                            "date": day.date,
+                            "time": slot_time,
+                            "court_id": court_id,
+                            "booked_at": booked_at,
+                            "detected_at": day.fetched_at,
+                        }
+                    )
+    return events
+
+
+def record_deliveries(events: List[Dict], entries: OutboxEntries) -> List[Dict]:
+    """Stamps events with the first delivery of their court's notification and returns the stamped events.
+
+    A delivery belongs to the latest event of its court detected before it, so a court that is
+    freed again after being booked starts a new event instead of reusing the old notification.
+    """
+    latest: Dict[str, Dict] = {}
+    for freed in events:
+        latest[slot_key(freed["date"], freed["time"], freed["court_id"])] = freed
+
+    stamped: Dict[str, Dict] = {}
+    for entry in entries.values():
+        if entry["status"] != DELIVERED:
+            continue
+        key = slot_key(entry["date"], entry["time"], entry["court_id"])
+        event = latest.get(key)
+        if event is None or _seconds(event["detected_at"], entry["delivered_at"]) < 0:
+            continue
+        # Stamped earlier, or by another subscriber's earlier delivery in this call
+        if "delivered_at" in event and (key not in stamped or event["delivered_at"] <= entry["delivered_at"]):
+            continue
+        event["delivered_at"] = entry["delivered_at"]
+        stamped[key] = event
+    return list(stamped.values())
+
+
+def record_run(
+    days: List[DayAvailability],
+    history: HistoryState,
+    fetch_times: Dict[str, str],
+    entries: OutboxEntries,
+    now: datetime | None = None,
+) -> Dict:
+    """Records the courts this run found freed and the notifications delivered for them.
+
+    `history` and `fetch_times` are the previous polls as loaded at the start of the run, and
+    `entries` the outbox after delivery. Returns the run's summary: the detection latency of the
+    freed courts and the delivery and end-to-end latency of the delivered ones.
+    """
+    now = now or datetime.now().astimezone()
+    cutoff = (now - timedelta(days=config.LATENCY_RETENTION_DAYS)).isoformat()
+    freed = freed_courts(days, history, fetch_times)
+    try:
+        with persist.locked(config.LATENCY_FILE):
+            data = load()
+            events = [e for e in data["events"] if e["detected_at"] >= cutoff] + freed
+            delivered = record_deliveries(events, entries)
+            summary: Dict[str, Any] = {
+                "at": now.isoformat(),
+                "detection": summarize(latencies(freed, "detection")),
+                "delivery": summarize(latencies(delivered, "delivery")),
+                "end_to_end": summarize(latencies(delivered, "end_to_end")),
+            }
+            runs = [r for r in data["runs"] if r["at"] >= cutoff] + [summary]
+            persist.write_json_atomic(config.LATENCY_FILE, {"events": events, "runs": runs}, indent=None)
+    except IOError as e:
+        logger.error(f"Failed to save latency records: {e}")
+        return {}
+
+    metrics.increment("freed_courts", len(freed))
+    metrics.increment("freed_courts_delivered", len(delivered))
+    logger.info(
+        f"Freed courts: {len(freed)} detected within {format_seconds(summary['detection'].get('p90'))} (p90), "
+        f"{len(delivered)} delivered within {format_seconds(summary['end_to_end'].get('p90'))} (p90)"
+    )
+    return summary
+
+
+def format_seconds(seconds: float | None) -> str:
+    if seconds is None:
+        return "-"
+    if seconds < 120:
+        return f"{seconds:.0f}s"
+    if seconds < 7200:
+        return f"{seconds / 60:.0f}m"
+    return f"{seconds / 3600:.1f}h"
+
+
+def slo_share(events: List[Dict], slo_seconds: float | None = None) -> float | None:
+    """Returns the share of delivered events whose end-to-end latency bound meets the SLO, None without any."""
+    slo_seconds = config.LATENCY_SLO_SECONDS if slo_seconds is None else slo_seconds
+    values = latencies(events, "end_to_end")
+    if not values:
+        return None
+    return sum(1 for value in values if value <= slo_seconds) / len(values)
+
+
+def daily(events: List[Dict]) -> Dict[str, List[Dict]]:
+    """Groups events by the day they were detected, oldest first."""
+    by_day: Dict[str, List[Dict]] = defaultdict(list)
+    for event in events:
+        by_day[event["detected_at"][:10]].append(event)
+    return dict(sorted(by_day.items()))
+
+
+def print_report(events: List[Dict]):
+    header = f"{'day':<12}{'freed':>7}{'detect p50':>12}{'p90':>7}{'notified':>10}{'deliver p50':>13}{'p90':>7}"
+    print(header + f"{'end-to-end p90':>16}{'in SLO':>8}")
+    rows = list(daily(events).items()) + [("all", events)]
+    for label, day_events in rows:
+        detection = summarize(latencies(day_events, "detection"))
+        delivery = summarize(latencies(day_events, "delivery"))
+        end_to_end = summarize(latencies(day_events, "end_to_end"))
+        share = slo_share(day_events)
+        print(
+            f"{label:<12}{detection['count']:>7}{format_seconds(detection.get('p50')):>12}"
+            f"{format_seconds(detection.get('p90')):>7}{delivery['count']:>10}{format_seconds(delivery.get('p50')):>13}"
+            f"{format_seconds(delivery.get('p90')):>7}{format_seconds(end_to_end.get('p90')):>16}"
+            f"{'-' if share is None else f'{share:.0%}':>8}"
+        )
+
+
+def main():
+    """Prints the detection and delivery latency of freed courts per day and against the SLO."""
+    data = load()
+    if not data["events"]:
+        print(f"No freed courts recorded in {config.LATENCY_FILE}.")
+        return
+    slo = format_seconds(config.LATENCY_SLO_SECONDS)
+    print(f"SLO: notified within {slo} of the last poll that saw the court booked\n")
+    print_report(data["events"])
+    if data["runs"]:
+        last = data["runs"][-1]
+        print(
+            f"\nLast run ({last['at']}): {last['detection']['count']} freed, "
+            f"{last['delivery']['count']} delivered, end-to-end p90 {format_seconds(last['end_to_end'].get('p90'))}"
+        )
@@ -0,0 +1,40 @@
+import logging
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict
+
+from eversports_scraper import config, persist
+
+logger = logging.getLogger(__name__)
+
+_counters: Dict[str, int] = defaultdict(int)
+_lock = threading.Lock()
+
+
+def increment(name: str, value: int = 1):
+    """Adds `value` to a named counter of the current run."""
+    with _lock:
+        _counters[name] += value
+
+
+def snapshot() -> Dict[str, int]:
+    with _lock:
+        return dict(sorted(_counters.items()))
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+
+
+def save():
+    """Logs the counters of the current run and writes them to the metrics file."""
+    counters = snapshot()
+    logger.info(f"Run metrics: {', '.join(f'{k}={v}' for k, v in counters.items()) or 'none'}")
+    try:
+        persist.write_json_atomic(
+            config.METRICS_FILE, {"last_updated": datetime.now().astimezone().isoformat(), "counters": counters}
+        )
+    except IOError as e:
+        logger.error(f"Failed to save metrics: {e}")
@@ -1,20 +1,38 @@
+from dataclasses import dataclass, field
 from typing import Dict, List, Tuple
 
 from pydantic import BaseModel
 
+# Slots, blocks and days are built per slot per day on every run, so they are plain slotted
+# dataclasses. They are validated and serialized with pydantic only where they are read from or
+# written to disk, see `persist.dump_day` and `persist.load_days`.
 
-class Slot(BaseModel):
+
+@dataclass(slots=True)
+class Slot:
     time: str
-    courts: List[str]
+    courts: List[str]  # May be shared between slots, never modify in place
     court_ids: List[int]
     is_new: bool
 
 
-class DayAvailability(BaseModel):
+@dataclass(slots=True)
+class Block:
+    start: str  # HH:MM start of the first slot
+    end: str  # HH:MM end of the last slot
+    slots: int  # Number of consecutive slots
+    court_id: int | None = None  # None if the block switches courts between slots
+    court: str | None = None
+
+
+@dataclass(slots=True)
+class DayAvailability:
     date: str
     slots: List[Slot]
     new_count: int
     free_slots_map: Dict[str, List[int]]
+    blocks: List[Block] = field(default_factory=list)  # Runs of consecutive free slots, see REPORT_BLOCK_SLOTS
+    fetched_at: str | None = None  # When the bookings were fetched, local time
 
 
 class TargetInterval(BaseModel):
@@ -23,12 +41,56 @@ class TargetInterval(BaseModel):
     end_time: str | None = None  # HH:MM format, local time
 
 
+class RecurrenceRule(BaseModel):
+    weekdays: List[int]  # 0 = Monday ... 6 = Sunday
+    start_time: str | None = None  # HH:MM format, local time
+    end_time: str | None = None  # HH:MM format, local time
+    valid_from: str | None = None  # ISO format YYYY-MM-DD, inclusive
+    valid_until: str | None = None  # ISO format YYYY-MM-DD, inclusive
+    exclusions: List[str] = []  # ISO dates to skip
+
+
+class Subscription(BaseModel):
+    name: str
+    sheet_url: str | None = None  # Published Google Sheet CSV with the subscriber's target dates
+    chat_id: str | None = None  # Telegram chat to notify
+    courts: List[int] | None = None  # Preferred court IDs; None means any court
+    targets: List[TargetInterval] = []  # Dates added through the bot's /watch command
+
+
+class RuleSet(BaseModel):
+    name: str
+    # Unset rules default to the configured NOTIFY_COOLDOWN_MINUTES, NOTIFY_MIN_FREE_POLLS,
+    # NOTIFY_MIN_BLOCK_SLOTS and BLOCK_SAME_COURT
+    cooldown_minutes: int | None = None
+    min_free_polls: int | None = None
+    min_block_slots: int | None = None
+    block_same_court: bool | None = None
+    start_time: str | None = None  # HH:MM window of every date, like a target interval
+    end_time: str | None = None  # HH:MM format
+    courts: List[int] | None = None  # Preferred court IDs; None means any court
+
+
 FreeSlotsMap = Dict[str, List[int]]
 HistoryState = Dict[str, FreeSlotsMap]
 NewSlotsData = List[Tuple[str, List[Slot]]]
 
 
-class ScrapeOutcome(BaseModel):
+@dataclass(slots=True)
+class ScrapeOutcome:
     state_snapshot: HistoryState
     day_availabilities: List[DayAvailability]
     new_slots_data: NewSlotsData
+    skipped_dates: List[str] = field(default_factory=list)  # Not fetched because the run's time budget ran out
+    failed_dates: List[str] = field(default_factory=list)  # Fetched without a usable response, keeping their history
+    latency: Dict = field(default_factory=dict)  # Latency distributions of the courts freed and delivered this run
+
+
+@dataclass(slots=True)
+class BacktestResult:
+    rule_set: str
+    alerts: int = 0  # Courts notified
+    messages: int = 0  # Polls of a date that notified at least one court
+    opportunities: int = 0  # Courts found free again before their slot started, within the rule set's window
+    detected: int = 0  # Opportunities notified before the court was booked again
+    delays: List[int] = field(default_factory=list)  # Minutes from first seen free to notified, per detection
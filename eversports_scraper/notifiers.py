@@ -0,0 +1,306 @@
+import abc
+import json
+import logging
+import smtplib
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from email.message import EmailMessage
+from typing import Callable, Dict, List, Mapping, Optional
+
+import requests
+
+from eversports_scraper import config, telegram_notifier
+from eversports_scraper.models import NewSlotsData, Subscription
+from eversports_scraper.subscriptions import ALL_SUBSCRIBERS
+
+logger = logging.getLogger(__name__)
+
+
+def _total(new_slots_data: NewSlotsData) -> int:
+    return sum(len(slots) for _, slots in new_slots_data)
+
+
+def format_plain(new_slots_data: NewSlotsData) -> str:
+    """Formats new slots as plain text."""
+    lines = [f"New Badminton Slots Found! ({_total(new_slots_data)})", ""]
+    for date_str, slots in new_slots_data:
+        lines.append(f"{date_str}:")
+        for s in slots:
+            lines.append(f"  - {s.time} ({', '.join(s.courts)})")
+    lines.append("")
+    lines.append(f"Book now: {config.WIDGET_URL}")
+    return "\n".join(lines)
+
+
+def format_markdown(new_slots_data: NewSlotsData) -> str:
+    """Formats new slots as a Telegram Markdown message."""
+    msg_lines = []
+    for date_str, slots in new_slots_data:
+        msg_lines.append(f"*{date_str}*:")
+        for s in slots:
+            msg_lines.append(f"  - {s.time} ({', '.join(s.courts)})")
+
+    formatted_slots_msg = "\n".join(msg_lines)
+
+    message = f"🏸 *New Badminton Slots Found!* ({_total(new_slots_data)})\n\n{formatted_slots_msg}"
+    message += f"\n\n[Book Now]({config.WIDGET_URL})"
+    return message
+
+
+def format_json(new_slots_data: NewSlotsData) -> Dict:
+    """Formats new slots as a JSON-serializable payload."""
+    return {
+        "total": _total(new_slots_data),
+        "booking_url": config.WIDGET_URL,
+        "days": [
+            {"date": date_str, "slots": [{"time": s.time, "courts": s.courts, "court_ids": s.court_ids} for s in slots]}
+            for date_str, slots in new_slots_data
+        ],
+    }
+
+
+class Notifier(abc.ABC):
+    """A notification channel. Subclasses implement formatting and delivery.
+
+    `send` returns True only when the message was delivered; it must not raise. It gives up by
+    `deadline`, a `time.monotonic()` value, when one is given.
+    """
+
+    name = "notifier"
+    # Longest message the channel accepts, or None for no limit. Used to pack outbox entries.
+    max_length: Optional[int] = None
+
+    def __init__(self, timeout: float = 10):
+        self.timeout = timeout
+
+    def format(self, new_slots_data: NewSlotsData) -> str:
+        return format_plain(new_slots_data)
+
+    def timeout_until(self, deadline: float | None) -> float:
+        """The request timeout, shortened to end by `deadline`."""
+        if deadline is None:
+            return self.timeout
+        return max(min(self.timeout, deadline - time.monotonic()), 0.1)
+
+    @abc.abstractmethod
+    def send(self, new_slots_data: NewSlotsData, deadline: float | None = None) -> bool:
+        """Delivers the new slots, returning True on success."""
+
+
+class TelegramBackend(Notifier):
+    name = "telegram"
+    max_length = telegram_notifier.MAX_MESSAGE_LENGTH
+
+    def __init__(self, chat_id: Optional[str] = None, timeout: float = 10):
+        super().__init__(timeout)
+        self.chat_id = chat_id
+
+    def format(self, new_slots_data: NewSlotsData) -> str:
+        return format_markdown(new_slots_data)
+
+    def send(self, new_slots_data: NewSlotsData, deadline: float | None = None) -> bool:
+        return telegram_notifier.send_telegram_message(
+            self.format(new_slots_data), chat_id=self.chat_id, deadline=deadline
+        )
+
+
+class WebhookBackend(Notifier):
+    """POSTs a JSON payload to a URL."""
+
+    name = "webhook"
+
+    def __init__(self, url: str, timeout: float = 10):
+        super().__init__(timeout)
+        self.url = url
+        self.session = requests.Session()
+
+    def format(self, new_slots_data: NewSlotsData) -> str:
+        return json.dumps(format_json(new_slots_data))
+
+    def send(self, new_slots_data: NewSlotsData, deadline: float | None = None) -> bool:
+        try:
+            response = self.session.post(
+                self.url, json=format_json(new_slots_data), timeout=self.timeout_until(deadline)
+            )
+            response.raise_for_status()
+            logger.info(f"Webhook notification sent to {self.url}")
+            return True
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Failed to send webhook notification: {e}")
+            return False
+
+
+class EmailBackend(Notifier):
+    """Sends a plain text email over SMTP."""
+
+    name = "email"
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        sender: str,
+        recipients: List[str],
+        user: Optional[str] = None,
+        password: Optional[str] = None,
+        starttls: bool = False,
+        timeout: float = 10,
+    ):
+        super().__init__(timeout)
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.recipients = recipients
+        self.user = user
+        self.password = password
+        self.starttls = starttls
+
+    def send(self, new_slots_data: NewSlotsData, deadline: float | None = None) -> bool:
+        msg = EmailMessage()
+        msg["Subject"] = f"New badminton slots found ({_total(new_slots_data)})"
+        msg["From"] = self.sender
+        msg["To"] = ", ".join(self.recipients)
+        msg.set_content(self.format(new_slots_data))
+
+        try:
+            with smtplib.SMTP(self.host, self.port, timeout=self.timeout_until(deadline)) as smtp:
+                if self.starttls:
+                    smtp.starttls()
+                if self.user and self.password:
+                    smtp.login(self.user, self.password)
+                smtp.send_message(msg)
+            logger.info(f"Email notification sent to {len(self.recipients)} recipients")
+            return True
+        except (smtplib.SMTPException, OSError) as e:
+            logger.error(f"Failed to send email notification: {e}")
+            return False
+
+
+class FileBackend(Notifier):
+    """Appends plain text notifications to a file, or writes them to stdout for `-`."""
+
+    name = "file"
+
+    def __init__(self, path: str = "-", timeout: float = 10):
+        super().__init__(timeout)
+        self.path = path
+
+    def send(self, new_slots_data: NewSlotsData, deadline: float | None = None) -> bool:
+        text = self.format(new_slots_data) + "\n"
+        try:
+            if self.path == "-":
+                sys.stdout.write(text)
+                sys.stdout.flush()
+            else:
+                with open(self.path, "a") as f:
+                    f.write(text)
+            return True
+        except IOError as e:
+            logger.error(f"Failed to write notification to {self.path}: {e}")
+            return False
+
+
+def _build_telegram() -> Optional[Notifier]:
+    if not config.TELEGRAM_BOT_TOKEN:
+        logger.warning("TELEGRAM_BOT_TOKEN not set. Skipping Telegram notifications.")
+        return None
+    return TelegramBackend(timeout=config.TELEGRAM_TIMEOUT_SECONDS)
+
+
+def _build_webhook() -> Optional[Notifier]:
+    if not config.WEBHOOK_URL:
+        logger.warning("WEBHOOK_URL not set. Skipping webhook notifications.")
+        return None
+    return WebhookBackend(config.WEBHOOK_URL, timeout=config.WEBHOOK_TIMEOUT_SECONDS)
+
+
+def _build_email() -> Optional[Notifier]:
+    if not config.SMTP_HOST or not config.SMTP_FROM or not config.SMTP_TO:
+        logger.warning("SMTP configuration incomplete. Skipping email notifications.")
+        return None
+    return EmailBackend(
+        host=config.SMTP_HOST,
+        port=config.SMTP_PORT,
+        sender=config.SMTP_FROM,
+        recipients=config.SMTP_TO,
+        user=config.SMTP_USER,
+        password=config.SMTP_PASSWORD,
+        starttls=config.SMTP_STARTTLS,
+        timeout=config.SMTP_TIMEOUT_SECONDS,
+    )
+
+
+def _build_file() -> Optional[Notifier]:
+    return FileBackend(config.NOTIFY_FILE)
+
+
+BACKEND_BUILDERS: Dict[str, Callable[[], Optional[Notifier]]] = {
+    "telegram": _build_telegram,
+    "webhook": _build_webhook,
+    "email": _build_email,
+    "file": _build_file,
+}
+
+
+def configured_notifiers() -> List[Notifier]:
+    """Builds the notifier backends listed in `config.NOTIFIERS`."""
+    notifiers = []
+    for name in config.NOTIFIERS:
+        builder = BACKEND_BUILDERS.get(name)
+        if builder is None:
+            logger.warning(f"Unknown notifier backend '{name}'. Skipping.")
+            continue
+        notifier = builder()
+        if notifier is not None:
+            notifiers.append(notifier)
+    return notifiers
+
+
+def subscriber_routes(subscriptions: List[Subscription]) -> Dict[str, List[Notifier]]:
+    """Maps each outbox route to its backends.
+
+    Telegram goes to every subscriber's own chat, and subscribers without a chat get no Telegram
+    backend rather than the default chat. The other backends are shared, so they are routed once
+    under ALL_SUBSCRIBERS instead of receiving a copy per subscriber.
+    """
+    routes: Dict[str, List[Notifier]] = {}
+    shared = []
+    for notifier in configured_notifiers():
+        if not isinstance(notifier, TelegramBackend):
+            shared.append(notifier)
+            continue
+        for subscription in subscriptions:
+            if subscription.chat_id:
+                routes[subscription.name] = [TelegramBackend(subscription.chat_id, timeout=notifier.timeout)]
+    if shared:
+        routes[ALL_SUBSCRIBERS] = shared
+    return routes
+
+
+def dispatch(jobs: Mapping[str, Callable[[], object]], deadline: float) -> Dict[str, object]:
+    """Runs one job per backend concurrently and returns their results by backend name.
+
+    A job that doesn't finish within `deadline` seconds is reported as None and no longer waited
+    for, so a slow channel never holds up the others or the rest of the run. Its thread still runs
+    to completion, and the interpreter waits for it at exit, so jobs must not act on shared state
+    after the caller has moved on.
+    """
+    if not jobs:
+        return {}
+    executor = ThreadPoolExecutor(max_workers=len(jobs), thread_name_prefix="notifier")
+    futures = {name: executor.submit(job) for name, job in jobs.items()}
+    wait(futures.values(), timeout=deadline)
+
+    results: Dict[str, object] = {}
+    for name, future in futures.items():
+        if not future.done():
+            logger.error(f"Notifier '{name}' did not finish within {deadline}s")
+            results[name] = None
+        elif future.exception() is not None:
+            logger.error(f"Notifier '{name}' failed: {future.exception()}")
+            results[name] = None
+        else:
+            results[name] = future.result()
+    executor.shutdown(wait=False)
+    return results
@@ -0,0 +1,238 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+from eversports_scraper import config, notifiers, persist
+from eversports_scraper.models import NewSlotsData, Slot
+from eversports_scraper.subscriptions import DEFAULT_SUBSCRIBER
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+DELIVERED = "delivered"
+
+OutboxEntries = Dict[str, Dict]
+
+
+def slot_key(date_str: str, slot_time: str, court_id: int) -> str:
+    """Builds the dedup key for a single court in a single slot."""
+    return f"{date_str}|{slot_time}|{court_id}"
+
+
+def entry_key(subscriber: str, date_str: str, slot_time: str, court_id: int) -> str:
+    """Builds the outbox key; each subscriber gets their own entry per court."""
+    return f"{subscriber}|{slot_key(date_str, slot_time, court_id)}"
+
+
+def load_outbox() -> OutboxEntries:
+    """Loads outbox entries keyed by their dedup key."""
+    if not os.path.exists(config.OUTBOX_FILE):
+        return {}
+    try:
+        with open(config.OUTBOX_FILE, "r") as f:
+            return dict(json.load(f)["entries"])
+    except (json.JSONDecodeError, KeyError, IOError):
+        logger.warning("Failed to load outbox file. Starting with an empty outbox.")
+        return {}
+
+
+def save_outbox(entries: OutboxEntries):
+    """Persists the outbox atomically."""
+    try:
+        persist.write_json_atomic(config.OUTBOX_FILE, {"entries": entries})
+    except IOError as e:
+        logger.error(f"Failed to save outbox: {e}")
+
+
+def prune(entries: OutboxEntries, now: datetime) -> OutboxEntries:
+    """Drops entries for past dates and delivered entries older than the retention period."""
+    today = now.strftime("%Y-%m-%d")
+    retention_cutoff = (now - timedelta(minutes=config.OUTBOX_RETENTION_MINUTES)).isoformat()
+    kept = {}
+    for key, entry in entries.items():
+        if entry["date"] < today:
+            continue
+        if entry["status"] == DELIVERED and entry["delivered_at"] < retention_cutoff:
+            continue
+        kept[key] = entry
+    return kept
+
+
+def enqueue(new_slots_data: NewSlotsData, now: datetime | None = None, subscriber: str = DEFAULT_SUBSCRIBER) -> int:
+    """Writes new slots for a subscriber to the outbox. Returns the number of entries added.
+
+    Keys that are already pending or were delivered recently are skipped.
+    """
+    now = now or datetime.now().astimezone()
+    with persist.locked(config.OUTBOX_FILE):
+        entries = prune(load_outbox(), now)
+        added = 0
+
+        for date_str, slots in new_slots_data:
+            for slot in slots:
+                names = dict(zip(sorted(slot.court_ids), slot.courts))
+                for court_id in sorted(slot.court_ids):
+                    key = entry_key(subscriber, date_str, slot.time, court_id)
+                    if key in entries:
+                        continue
+                    entries[key] = {
+                        "subscriber": subscriber,
+                        "date": date_str,
+                        "time": slot.time,
+                        "court_id": court_id,
+                        "court": names.get(court_id, f"Unknown({court_id})"),
+                        "status": PENDING,
+                        "attempts": 0,
+                        "created_at": now.isoformat(),
+                    }
+                    added += 1
+
+        save_outbox(entries)
+    if added:
+        logger.info(f"Queued {added} notification entries in the outbox")
+    return added
+
+
+def _group_by_date(keys: List[str], entries: OutboxEntries) -> Dict[str, NewSlotsData]:
+    """Groups entries into per-date slot lists, as used for message formatting."""
+    by_date: Dict[str, Dict[str, List[Dict]]] = defaultdict(lambda: defaultdict(list))
+    for key in keys:
+        entry = entries[key]
+        by_date[entry["date"]][entry["time"]].append(entry)
+
+    grouped: Dict[str, NewSlotsData] = {}
+    for date_str in sorted(by_date):
+        slots = []
+        for slot_time in sorted(by_date[date_str]):
+            courts = sorted(by_date[date_str][slot_time], key=lambda e: e["court_id"])
+            slots.append(
+                Slot(
+                    time=slot_time,
+                    courts=[c["court"] for c in courts],
+                    court_ids=[c["court_id"] for c in courts],
+                    is_new=True,
+                )
+            )
+        grouped[date_str] = [(date_str, slots)]
+    return grouped
+
+
+def _pack_batches(keys: List[str], entries: OutboxEntries, notifier: notifiers.Notifier) -> List[Tuple]:
+    """Packs entries into batches of whole dates whose formatted message fits the backend's limit.
+
+    Returns (new_slots_data, keys) pairs, so each batch's entries can be marked on their own.
+    """
+    keys_by_date: Dict[str, List[str]] = defaultdict(list)
+    for key in keys:
+        keys_by_date[entries[key]["date"]].append(key)
+    grouped = _group_by_date(keys, entries)
+
+    batches = []
+    batch: NewSlotsData = []
+    batch_keys: List[str] = []
+    for date_str in sorted(grouped):
+        candidate = batch + grouped[date_str]
+        if batch and notifier.max_length is not None and len(notifier.format(candidate)) > notifier.max_length:
+            batches.append((batch, batch_keys))
+            batch, batch_keys = [], []
+            candidate = grouped[date_str]
+        batch = candidate
+        batch_keys = batch_keys + keys_by_date[date_str]
+    if batch:
+        batches.append((batch, batch_keys))
+    return batches
+
+
+def deliver_pending(
+    routes: Dict[str, List[notifiers.Notifier]], now: datetime | None = None, deadline: float | None = None
+) -> int:
+    """Sends pending entries through each subscriber's backends concurrently.
+
+    `routes` maps subscriber names to their notifier backends. An entry is done once all of its
+    subscriber's backends have delivered it. Returns the number of entries completed by this
+    call; the rest stay pending and are retried on the next call.
+
+    Delivery gives up after NOTIFY_DEADLINE_SECONDS, or earlier at `deadline`, a `time.monotonic()`
+    value such as the end of the run's time budget. The outbox stays locked until delivery is done,
+    so overlapping runs never send the same entry.
+    """
+    timeout = config.NOTIFY_DEADLINE_SECONDS
+    if deadline is not None:
+        timeout = min(timeout, max(deadline - time.monotonic(), 0))
+    with persist.locked(config.OUTBOX_FILE):
+        return _deliver(routes, now or datetime.now().astimezone(), timeout)
+
+
+def _deliver(routes: Dict[str, List[notifiers.Notifier]], now: datetime, timeout: float) -> int:
+    entries = prune(load_outbox(), now)
+    lock = threading.Lock()
+    # Set once dispatch gave up waiting; a job still running after that must not record or save,
+    # as the outbox may have been unlocked and rewritten by then. Its entries are retried next run.
+    closed = threading.Event()
+    started = time.monotonic()
+
+    def deliver_to(subscriber: str, backend: notifiers.Notifier) -> int:
+        names = [b.name for b in routes[subscriber]]
+        with lock:
+            keys = [
+                key
+                for key, entry in entries.items()
+                if entry["status"] == PENDING
+                and entry.get("subscriber", DEFAULT_SUBSCRIBER) == subscriber
+                and backend.name not in entry.get("delivered_to", [])
+            ]
+        sent_count = 0
+        for batch, batch_keys in _pack_batches(keys, entries, backend):
+            if time.monotonic() >= started + timeout:
+                break
+            sent = backend.send(batch, deadline=started + timeout)
+            # When the send completed, on the clock of `now`
+            sent_at = (now + timedelta(seconds=time.monotonic() - started)).isoformat()
+            with lock:
+                if closed.is_set():
+                    logger.warning(f"Notifier '{backend.name}' finished after the deadline. Not recording its result.")
+                    break
+                for key in batch_keys:
+                    entry = entries[key]
+                    entry["attempts"] += 1
+                    if not sent:
+                        continue
+                    entry.setdefault("delivered_to", []).append(backend.name)
+                    if all(name in entry["delivered_to"] for name in names):
+                        entry["status"] = DELIVERED
+                        entry["delivered_at"] = sent_at
+                # Persist after every batch so a crash mid-delivery can't cause a double post
+                save_outbox(entries)
+            if sent:
+                sent_count += len(batch_keys)
+        return sent_count
+
+    pending = {entry.get("subscriber", DEFAULT_SUBSCRIBER) for entry in entries.values() if entry["status"] == PENDING}
+    pending_before = sum(1 for entry in entries.values() if entry["status"] == PENDING)
+    unrouted = sorted(subscriber for subscriber in pending if not routes.get(subscriber))
+    if unrouted:
+        logger.warning(f"No notifier backends for subscribers {', '.join(unrouted)}. Their entries stay pending.")
+
+    jobs = {
+        f"{subscriber}/{backend.name}": (lambda s=subscriber, b=backend: deliver_to(s, b))
+        for subscriber in pending
+        for backend in routes.get(subscriber, [])
+    }
+    if not jobs:
+        save_outbox(entries)
+        return 0
+
+    notifiers.dispatch(jobs, timeout)
+
+    with lock:
+        closed.set()
+        save_outbox(entries)
+        pending_after = sum(1 for entry in entries.values() if entry["status"] == PENDING)
+    if pending_after:
+        logger.warning(f"{pending_after} notification entries remain pending and will be retried")
+    return pending_before - pending_after
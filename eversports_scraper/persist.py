@@ -1,14 +1,42 @@
+import hashlib
 import json
 import logging
 import os
+import threading
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, Iterator, List, Tuple, TypeVar
+
+from pydantic import TypeAdapter
 
 from eversports_scraper import config
-from eversports_scraper.models import HistoryState
+from eversports_scraper.models import DayAvailability, HistoryState
+
+try:
+    import fcntl
+except ImportError:  # Windows, where overlapping runs are not locked against each other
+    fcntl = None  # type: ignore[assignment]
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+_day_adapter = TypeAdapter(DayAvailability)
+_days_adapter = TypeAdapter(List[DayAvailability])
+
+
+def dump_day(day) -> Dict:
+    """Serializes a day for the JSON files. Dicts are passed through unchanged."""
+    if isinstance(day, dict):
+        return day
+    data: Dict = _day_adapter.dump_python(day, mode="json")
+    return data
+
+
+def load_days(data: List[Dict]) -> List[DayAvailability]:
+    """Validates days read from a JSON file."""
+    return _days_adapter.validate_python(data)
+
 
 def ensure_data_dir():
     """Ensures the data directory exists."""
@@ -16,6 +44,80 @@ def ensure_data_dir():
         os.makedirs(config.DATA_DIR)
 
 
+def write_json_atomic(path: str, data, indent: int | None = 2):
+    """Writes JSON to a temporary file and moves it into place, so readers never see partial files."""
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    # Unique per writer, so overlapping runs never interleave in the same temporary file
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=indent)
+    os.replace(tmp_path, path)
+
+
+@contextmanager
+def locked(path: str) -> Iterator[None]:
+    """Holds an exclusive lock for `path` across processes, e.g. for a read-merge-write cycle.
+
+    The lock file lives in STATE_DIR, so nothing extra gets published with the data files.
+    """
+    lock_dir = os.path.join(config.STATE_DIR, "locks")
+    os.makedirs(lock_dir, exist_ok=True)
+    with open(os.path.join(lock_dir, f"{os.path.basename(path)}.lock"), "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def _read_json(path: str) -> Dict:
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r") as f:
+            data: Dict = json.load(f)
+        return data
+    except (json.JSONDecodeError, IOError):
+        logger.warning(f"Failed to read {path} for merging. Overwriting it.")
+        return {}
+
+
+def _supersedes(ours: str | None, theirs: str | None) -> bool:
+    # A snapshot without fetch time predates fetch times being recorded, so it only wins against another one
+    if ours is None or theirs is None:
+        return theirs is None
+    return datetime.fromisoformat(ours) >= datetime.fromisoformat(theirs)
+
+
+def merge_by_fetch_time(
+    ours: Dict[str, T], our_times: Dict[str, str], theirs: Dict[str, T], their_times: Dict[str, str]
+) -> Tuple[Dict[str, T], Dict[str, str]]:
+    """Merges two per-date snapshots, keeping whichever copy of each date was fetched last.
+
+    Dates only in `theirs` are kept unless they are past, so a run that checked fewer dates
+    doesn't drop the others.
+    """
+    today = datetime.now().date().isoformat()
+    merged: Dict[str, T] = {}
+    times: Dict[str, str] = {}
+    for date_str in sorted(set(ours) | set(theirs)):
+        if date_str in ours and (
+            date_str not in theirs or _supersedes(our_times.get(date_str), their_times.get(date_str))
+        ):
+            merged[date_str], fetched_at = ours[date_str], our_times.get(date_str)
+        elif date_str >= today:
+            merged[date_str], fetched_at = theirs[date_str], their_times.get(date_str)
+        else:
+            continue
+        if fetched_at:
+            times[date_str] = fetched_at
+    return merged, times
+
+
 def load_history() -> HistoryState:
     """Loads the previous availability state from a JSON file with timestamp metadata."""
     if not os.path.exists(config.HISTORY_FILE):
@@ -33,28 +135,172 @@ def load_history() -> HistoryState:
         return {}
 
 
-def save_history(history: HistoryState):
-    """Saves the current availability state to a JSON file with timestamp (local time)."""
+def load_fetch_times() -> Dict[str, str]:
+    """Returns when each date in the history was last fetched, i.e. the poll its free courts are from."""
+    return dict(_read_json(config.HISTORY_FILE).get("fetched_at", {}))
+
+
+def save_history(history: HistoryState, fetched_at: Dict[str, str] | None = None):
+    """Saves the current availability state to a JSON file with timestamp (local time).
+
+    Overlapping runs are merged per date by `fetched_at`, the fetch time of each date this run
+    fetched, instead of the last run to finish overwriting the others.
+    """
     ensure_data_dir()
     try:
-        # Wrap history with metadata using local time
-        data = {"last_updated": datetime.now().astimezone().isoformat(), "availability": history}
-        with open(config.HISTORY_FILE, "w") as f:
-            json.dump(data, f, indent=2)
+        with locked(config.HISTORY_FILE):
+            current = _read_json(config.HISTORY_FILE)
+            availability, times = merge_by_fetch_time(
+                history, fetched_at or {}, current.get("availability", {}), current.get("fetched_at", {})
+            )
+            # Wrap history with metadata using local time
+            data = {
+                "last_updated": datetime.now().astimezone().isoformat(),
+                "availability": availability,
+                "fetched_at": times,
+            }
+            write_json_atomic(config.HISTORY_FILE, data)
         logger.info(f"Saved history to {config.HISTORY_FILE} on {data['last_updated']}")
     except IOError as e:
         logger.error(f"Failed to save history: {e}")
 
 
-def save_report(results: List):
-    """Saves the availability report to a JSON file with local time."""
+def load_checkpoint() -> List[str]:
+    """Loads the dates the previous run skipped when its time budget ran out."""
+    if not os.path.exists(config.CHECKPOINT_FILE):
+        return []
+    try:
+        with open(config.CHECKPOINT_FILE, "r") as f:
+            return list(json.load(f)["skipped_dates"])
+    except (json.JSONDecodeError, KeyError, TypeError, IOError):
+        logger.warning("Failed to load checkpoint. Fetching dates in the default order.")
+        return []
+
+
+def save_checkpoint(skipped_dates: List[str]):
+    """Records the dates this run skipped, or clears the checkpoint if it fetched every date."""
+    try:
+        data = {"last_updated": datetime.now().astimezone().isoformat(), "skipped_dates": skipped_dates}
+        write_json_atomic(config.CHECKPOINT_FILE, data)
+    except IOError as e:
+        logger.error(f"Failed to save checkpoint: {e}")
+
+
+def load_cookies() -> Dict[str, str]:
+    """Loads the cookies of earlier sessions, e.g. a Cloudflare clearance."""
+    if not os.path.exists(config.COOKIE_FILE):
+        return {}
+    try:
+        with open(config.COOKIE_FILE, "r") as f:
+            return {str(name): str(value) for name, value in json.load(f)["cookies"].items()}
+    except (json.JSONDecodeError, KeyError, TypeError, AttributeError, IOError):
+        logger.warning("Failed to load cookies. Starting without them.")
+        return {}
+
+
+def save_cookies(cookies: Dict[str, str]):
+    """Adds cookies to the persisted ones, replacing cookies of the same name."""
+    if not cookies:
+        return
+    try:
+        with locked(config.COOKIE_FILE):
+            merged = {**load_cookies(), **cookies}
+            write_json_atomic(
+                config.COOKIE_FILE, {"last_updated": datetime.now().astimezone().isoformat(), "cookies": merged}
+            )
+    except IOError as e:
+        logger.error(f"Failed to save cookies: {e}")
+
+
+def save_report(results: List[DayAvailability]) -> List[DayAvailability]:
+    """Saves the availability report to a JSON file with local time.
+
+    Days in the file from overlapping runs are merged by fetch time like the history. Returns
+    the days of the merged report; only those taken from the file are validated, the given
+    days are returned as they are.
+    """
     ensure_data_dir()
+    ours = {day.date: day for day in results}
+    serialized = {date_str: dump_day(day) for date_str, day in ours.items()}
     try:
-        # Convert Pydantic models to dicts if necessary
-        serialized_results = [r.model_dump() if hasattr(r, "model_dump") else r for r in results]
-        data = {"last_updated": datetime.now().astimezone().isoformat(), "days": serialized_results}
-        with open(config.REPORT_FILE, "w") as f:
-            json.dump(data, f, indent=2)
+        with locked(config.REPORT_FILE):
+            theirs = {day["date"]: day for day in _read_json(config.REPORT_FILE).get("days", [])}
+            merged, _ = merge_by_fetch_time(
+                serialized,
+                {d: day["fetched_at"] for d, day in serialized.items() if day.get("fetched_at")},
+                theirs,
+                {d: day["fetched_at"] for d, day in theirs.items() if day.get("fetched_at")},
+            )
+            data = {"last_updated": datetime.now().astimezone().isoformat(), "days": list(merged.values())}
+            write_json_atomic(config.REPORT_FILE, data)
         logger.info(f"Saved report to {config.REPORT_FILE}")
     except IOError as e:
         logger.error(f"Failed to save report: {e}")
+        return list(results)
+    other_runs = iter(load_days([day for d, day in merged.items() if day is not serialized.get(d)]))
+    return [ours[d] if day is serialized.get(d) else next(other_runs) for d, day in merged.items()]
+
+
+def save_aggregates(aggregates: Dict):
+    """Saves the precomputed dashboard aggregates to a JSON file with local time."""
+    ensure_data_dir()
+    try:
+        data = {"last_updated": datetime.now().astimezone().isoformat(), **aggregates}
+        # The dashboard files share the manifest's lock, so overlapping runs publish them one at a time
+        with locked(config.MANIFEST_FILE):
+            write_json_atomic(config.AGGREGATES_FILE, data, indent=None)
+        logger.info(f"Saved aggregates to {config.AGGREGATES_FILE}")
+    except IOError as e:
+        logger.error(f"Failed to save aggregates: {e}")
+
+
+def _content_hash(payload: Dict) -> str:
+    """Returns a short, stable hash of a JSON-serializable payload."""
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:12]
+
+
+def save_day_shards(results: List):
+    """Saves one content-addressed JSON file per day plus a manifest for the dashboard.
+
+    Day files are named `<date>.<hash>.json`, so a day whose content did not change keeps
+    its file untouched; the fetch time changes on every poll, so it is kept in the manifest
+    instead. Files no longer referenced are removed only once the new manifest is in place, so
+    a reader never follows the manifest to a missing file.
+    """
+    ensure_data_dir()
+    try:
+        with locked(config.MANIFEST_FILE):
+            entries = []
+            written = 0
+            for r in results:
+                dumped = dump_day(r)
+                day = {key: value for key, value in dumped.items() if key != "fetched_at"}
+                digest = _content_hash(day)
+                filename = f"{day['date']}.{digest}.json"
+                path = os.path.join(config.DAYS_DIR, filename)
+                if not os.path.exists(path):
+                    write_json_atomic(path, day)
+                    written += 1
+                entries.append(
+                    {
+                        "date": day["date"],
+                        "slot_count": len(day["slots"]),
+                        "new_count": day["new_count"],
+                        "hash": digest,
+                        "file": f"{os.path.basename(config.DAYS_DIR)}/{filename}",
+                        "fetched_at": dumped.get("fetched_at"),
+                    }
+                )
+
+            data = {"last_updated": datetime.now().astimezone().isoformat(), "days": entries}
+            write_json_atomic(config.MANIFEST_FILE, data)
+
+            referenced = {os.path.basename(e["file"]) for e in entries}
+            if os.path.exists(config.DAYS_DIR):
+                for stale in set(os.listdir(config.DAYS_DIR)) - referenced:
+                    if stale.endswith(".json"):
+                        os.remove(os.path.join(config.DAYS_DIR, stale))
+        logger.info(f"Saved manifest to {config.MANIFEST_FILE} ({written} of {len(entries)} day files rewritten)")
+    except (IOError, OSError) as e:
+        logger.error(f"Failed to save day shards: {e}")
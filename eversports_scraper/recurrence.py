@@ -0,0 +1,89 @@
+import logging
+import re
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List
+
+from eversports_scraper.models import RecurrenceRule, TargetInterval
+
+logger = logging.getLogger(__name__)
+
+# Markers in column A that turn a row into a recurrence rule, e.g. "every Tue Thu"
+RULE_PREFIXES = ("every", "jeden", "jede")
+
+WEEKDAY_NAMES: Dict[str, int] = {
+    "mon": 0, "monday": 0, "mo": 0, "montag": 0,
+    "tue": 1, "tuesday": 1, "di": 1, "dienstag": 1,
+    "wed": 2, "wednesday": 2, "mi": 2, "mittwoch": 2,
+    "thu": 3, "thursday": 3, "do": 3, "donnerstag": 3,
+    "fri": 4, "friday": 4, "fr": 4, "freitag": 4,
+    "sat": 5, "saturday": 5, "sa": 5, "samstag": 5,
+    "sun": 6, "sunday": 6, "so": 6, "sonntag": 6,
+}  # fmt: skip
+
+
+def is_rule_row(row: List[str]) -> bool:
+    return bool(row) and row[0].strip().lower().startswith(RULE_PREFIXES)
+
+
+def _parse_date(value: str) -> str:
+    return datetime.strptime(value.strip(), "%d.%m.%Y").strftime("%Y-%m-%d")
+
+
+def _parse_time(value: str) -> str | None:
+    value = value.strip()
+    if not value:
+        return None
+    datetime.strptime(value, "%H:%M")
+    return value
+
+
+def parse_rule_row(row: List[str]) -> RecurrenceRule | None:
+    """Parses a recurrence row of the target sheet.
+
+    Columns: A `every <weekdays>` (e.g. `every Tue Thu`), B start time, C end time, D first date,
+    E last date (both DD.MM.YYYY, optional), F dates to skip separated by spaces or semicolons.
+    """
+    cells = [c.strip() for c in row] + [""] * (6 - len(row))
+    tokens = [t for t in re.split(r"[\s,;/+]+", cells[0].lower()) if t][1:]
+
+    try:
+        weekdays = sorted({WEEKDAY_NAMES[t.rstrip(".")] for t in tokens})
+        if not weekdays:
+            raise KeyError("no weekdays")
+        return RecurrenceRule(
+            weekdays=weekdays,
+            start_time=_parse_time(cells[1]),
+            end_time=_parse_time(cells[2]),
+            valid_from=_parse_date(cells[3]) if cells[3] else None,
+            valid_until=_parse_date(cells[4]) if cells[4] else None,
+            exclusions=[_parse_date(d) for d in re.split(r"[\s;]+", cells[5]) if d],
+        )
+    except (KeyError, ValueError) as e:
+        logger.warning(f"Skipping invalid recurrence rule {row}: {e}")
+        return None
+
+
+class CalendarIndex:
+    """Indexes recurrence rules by weekday so each day of the horizon only visits matching rules."""
+
+    def __init__(self, rules: List[RecurrenceRule]):
+        self.by_weekday: Dict[int, List[RecurrenceRule]] = defaultdict(list)
+        self.exclusions = {id(rule): set(rule.exclusions) for rule in rules}
+        for rule in rules:
+            for weekday in rule.weekdays:
+                self.by_weekday[weekday].append(rule)
+
+    def expand(self, start: date, days: int) -> Iterator[TargetInterval]:
+        """Yields the target intervals of all rules for `days` days from `start`, in date order."""
+        for offset in range(days):
+            day = start + timedelta(days=offset)
+            iso = day.isoformat()
+            for rule in self.by_weekday.get(day.weekday(), []):
+                if rule.valid_from and iso < rule.valid_from:
+                    continue
+                if rule.valid_until and iso > rule.valid_until:
+                    continue
+                if iso in self.exclusions[id(rule)]:
+                    continue
+                yield TargetInterval(date=iso, start_time=rule.start_time, end_time=rule.end_time)
@@ -0,0 +1,181 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from datetime import date
+from typing import Callable, Dict, Optional
+
+from eversports_scraper import config, metrics, persist
+
+logger = logging.getLogger(__name__)
+
+Fetch = Callable[[], Optional[Dict]]
+
+
+class ResponseCache:
+    """On-disk LRU cache of slot API responses with a per-date TTL and stale-while-revalidate.
+
+    Every response lives in its own file, so overlapping runs share fresh data without a global
+    lock. A fresh entry is served directly; an entry less than `stale_seconds` past its TTL is
+    served as well while a background refresh replaces it; anything older is fetched inline.
+    """
+
+    def __init__(
+        self,
+        directory: str | None = None,
+        max_entries: int | None = None,
+        ttl_near: float | None = None,
+        ttl_far: float | None = None,
+        far_days: int | None = None,
+        stale_seconds: float | None = None,
+    ):
+        self.directory = directory or config.RESPONSE_CACHE_DIR
+        self.max_entries = config.RESPONSE_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self.ttl_near = config.RESPONSE_CACHE_TTL_NEAR_SECONDS if ttl_near is None else ttl_near
+        self.ttl_far = config.RESPONSE_CACHE_TTL_FAR_SECONDS if ttl_far is None else ttl_far
+        self.far_days = config.RESPONSE_CACHE_FAR_DAYS if far_days is None else far_days
+        self.stale_seconds = config.RESPONSE_CACHE_STALE_SECONDS if stale_seconds is None else stale_seconds
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="revalidate")
+        self._lock = threading.Lock()
+        self._refreshing: Dict[str, Future] = {}
+
+    def ttl_for(self, date_str: str, today: date | None = None) -> float:
+        """Near dates change quickly and expire first; the TTL grows linearly up to `far_days` ahead."""
+        days_ahead = (date.fromisoformat(date_str) - (today or date.today())).days
+        share = min(max(days_ahead, 0), self.far_days) / self.far_days if self.far_days > 0 else 1.0
+        return self.ttl_near + (self.ttl_far - self.ttl_near) * share
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{hashlib.sha256(key.encode()).hexdigest()[:16]}.json")
+
+    def _read(self, key: str) -> Optional[Dict]:
+        path = self._path(key)
+        try:
+            with open(path, "r") as f:
+                entry: Dict = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError, IOError):
+            return None
+        # Guard against hash collisions
+        return entry if entry.get("key") == key else None
+
+    def _write(self, key: str, data: Dict):
+        try:
+            persist.write_json_atomic(self._path(key), {"key": key, "fetched_at": time.time(), "data": data}, None)
+        except IOError as e:
+            logger.warning(f"Failed to write response cache entry: {e}")
+            return
+        self._evict()
+
+    def _evict(self):
+        """Drops the least recently used entries beyond `max_entries`. Hits refresh an entry's mtime."""
+        try:
+            names = [n for n in os.listdir(self.directory) if n.endswith(".json")]
+            if len(names) <= self.max_entries:
+                return
+            paths = sorted((os.path.join(self.directory, n) for n in names), key=os.path.getmtime)
+            for path in paths[: len(paths) - self.max_entries]:
+                os.remove(path)
+                metrics.increment("response_cache.evicted")
+        except OSError as e:
+            # Another run may be evicting at the same time
+            logger.debug(f"Response cache eviction skipped: {e}")
+
+    def _touch(self, key: str):
+        try:
+            os.utime(self._path(key))
+        except OSError:
+            pass
+
+    def _fetch_and_store(self, key: str, fetch: Fetch) -> Optional[Dict]:
+        data = fetch()
+        if data is not None:
+            self._write(key, data)
+        return data
+
+    def _revalidate(self, key: str, fetch: Fetch):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            future = self._executor.submit(self._fetch_and_store, key, fetch)
+            self._refreshing[key] = future
+        future.add_done_callback(lambda _: self._done(key))
+
+    def _done(self, key: str):
+        with self._lock:
+            self._refreshing.pop(key, None)
+
+    def _cached(self, key: str, date_str: str, revalidate: Fetch | None) -> Optional[Dict]:
+        """Returns a fresh entry, or a stale one while `revalidate` refreshes it in the background."""
+        entry = self._read(key)
+        if entry is None:
+            return None
+        data: Dict = entry["data"]
+        age = time.time() - entry["fetched_at"]
+        ttl = self.ttl_for(date_str)
+        if age < ttl:
+            logger.info(f"Response cache hit for {date_str} (age {age:.0f}s, ttl {ttl:.0f}s)")
+            metrics.increment("response_cache.hit")
+            self._touch(key)
+            return data
+        if revalidate is not None and age < ttl + self.stale_seconds:
+            logger.info(f"Response cache stale hit for {date_str} (age {age:.0f}s); revalidating")
+            metrics.increment("response_cache.stale")
+            self._touch(key)
+            self._revalidate(key, revalidate)
+            return data
+        return None
+
+    def get(self, key: str, date_str: str, fetch: Fetch) -> Optional[Dict]:
+        """Returns the cached response for `key`, calling `fetch` when it is missing or expired."""
+        if self.max_entries <= 0:
+            return fetch()
+
+        data = self._cached(key, date_str, fetch)
+        if data is not None:
+            return data
+        logger.info(f"Response cache miss for {date_str}")
+        metrics.increment("response_cache.miss")
+        return self._fetch_and_store(key, fetch)
+
+    def lookup(self, key: str, date_str: str, revalidate: Fetch | None = None) -> Optional[Dict]:
+        """Returns the cached response for `key` without fetching, for callers that fetch misses themselves.
+
+        Only fresh entries are returned, unless `revalidate` is given: then a stale entry is served
+        as well while `revalidate` refreshes it in the background, as `get` does.
+        """
+        if self.max_entries <= 0:
+            return None
+        data = self._cached(key, date_str, revalidate)
+        if data is None:
+            metrics.increment("response_cache.miss")
+        return data
+
+    def put(self, key: str, data: Dict):
+        if self.max_entries > 0:
+            self._write(key, data)
+
+    def drain(self, timeout: float | None = None):
+        """Waits for background revalidations, so their results are on disk for the next run."""
+        with self._lock:
+            pending = list(self._refreshing.values())
+        if pending:
+            logger.debug(f"Waiting for {len(pending)} response cache revalidations")
+            wait(pending, timeout=timeout)
+
+
+_cache: ResponseCache | None = None
+
+
+def get_cache() -> ResponseCache:
+    global _cache
+    if _cache is None:
+        _cache = ResponseCache()
+    return _cache
+
+
+def drain(timeout: float | None = None):
+    if _cache is not None:
+        _cache.drain(timeout)
@@ -1,24 +1,51 @@
 import csv
+import hashlib
 import io
+import json
 import logging
-import sys
+import os
+import time
 from datetime import datetime, timedelta
-from typing import List, Tuple
+from typing import Callable, Dict, List, Tuple
 
 import requests
 
-from eversports_scraper import config, persist, scraper, telegram_notifier
+from eversports_scraper import (
+    aggregates,
+    archive,
+    async_fetch,
+    blocks,
+    catalog,
+    config,
+    latency,
+    metrics,
+    notifiers,
+    outbox,
+    persist,
+    recurrence,
+    response_cache,
+    scraper,
+    subscriptions,
+)
+from eversports_scraper.cooldown import NotificationIndex
+from eversports_scraper.errors import ConfigurationError, NoTargetDatesError
 from eversports_scraper.models import (
     DayAvailability,
+    FreeSlotsMap,
     HistoryState,
     NewSlotsData,
+    RecurrenceRule,
     ScrapeOutcome,
     Slot,
+    Subscription,
     TargetInterval,
 )
 
 logger = logging.getLogger(__name__)
 
+# Returns the availability of a date given its slot grid and the history, or None if it is unavailable
+DaySource = Callable[[str, List[str], HistoryState], DayAvailability | None]
+
 
 def _parse_target_date_row(row: List[str]) -> TargetInterval | None:
     """Parses a single CSV row into a TargetInterval object."""
@@ -66,6 +93,70 @@ def _parse_target_date_row(row: List[str]) -> TargetInterval | None:
         return None
 
 
+def _parse_target_csv(text: str) -> Tuple[List[TargetInterval], List[RecurrenceRule]]:
+    """Parses the target dates CSV into one-off TargetInterval objects and recurrence rules."""
+    reader = csv.reader(io.StringIO(text))
+    target_dates = []
+    rules = []
+
+    for row in reader:
+        if recurrence.is_rule_row(row):
+            rule = recurrence.parse_rule_row(row)
+            if rule:
+                rules.append(rule)
+            continue
+        target_date = _parse_target_date_row(row)
+        if target_date:
+            target_dates.append(target_date)
+
+    return target_dates, rules
+
+
+def _expand_targets(target_dates: List[TargetInterval], rules: List[RecurrenceRule]) -> List[TargetInterval]:
+    """Combines one-off targets with the recurrence rules expanded over the active horizon."""
+    if not rules:
+        return list(target_dates)
+    expanded = recurrence.CalendarIndex(rules).expand(datetime.now().date(), config.TARGET_HORIZON_DAYS)
+    return list(target_dates) + list(expanded)
+
+
+def _sheet_cache_path(url: str) -> str:
+    return os.path.join(config.SHEET_CACHE_DIR, f"{hashlib.sha256(url.encode('utf-8')).hexdigest()[:16]}.json")
+
+
+def _load_sheet_cache(url: str) -> Dict | None:
+    """Loads the cached CSV metadata and parsed intervals for a sheet URL."""
+    path = _sheet_cache_path(url)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r") as f:
+            cache: Dict = json.load(f)
+        cache["intervals"] = [TargetInterval(**i) for i in cache["intervals"]]
+        cache["rules"] = [RecurrenceRule(**r) for r in cache.get("rules", [])]
+        return cache
+    except (json.JSONDecodeError, KeyError, TypeError, IOError):
+        logger.warning("Failed to load cached target dates. Fetching fresh copy.")
+        return None
+
+
+def _save_sheet_cache(url: str, cache: Dict):
+    data = {
+        **cache,
+        "intervals": [i.model_dump() for i in cache["intervals"]],
+        "rules": [r.model_dump() for r in cache["rules"]],
+    }
+    try:
+        persist.write_json_atomic(_sheet_cache_path(url), data)
+    except IOError as e:
+        logger.error(f"Failed to cache target dates: {e}")
+
+
+def _header(response, name: str) -> str | None:
+    value = response.headers.get(name)
+    return value if isinstance(value, str) else None
+
+
 def fetch_target_dates(url: str) -> List[TargetInterval]:
     """Fetches target dates with optional time intervals from a Google Sheet CSV.
 
@@ -73,24 +164,52 @@ def fetch_target_dates(url: str) -> List[TargetInterval]:
     Column A: Date in DD.MM.YYYY format
     Column B: Start time in HH:MM format (optional)
     Column C: End time in HH:MM format (optional)
+
+    Rows starting with `every` describe recurring targets instead (see `recurrence.parse_rule_row`),
+    which are expanded over the next `TARGET_HORIZON_DAYS` days.
+
+    The CSV is revalidated with ETag/If-Modified-Since against a local cache and only re-parsed
+    when its content changed. If the fetch fails, the last good copy is used.
     """
+    cache = _load_sheet_cache(url)
+    headers = {}
+    if cache:
+        if cache.get("etag"):
+            headers["If-None-Match"] = cache["etag"]
+        if cache.get("last_modified"):
+            headers["If-Modified-Since"] = cache["last_modified"]
+
     try:
-        response = requests.get(url, timeout=10)
+        response = requests.get(url, headers=headers, timeout=10)
+        if cache and response.status_code == 304:
+            logger.info("Target dates unchanged (HTTP 304), using cached copy.")
+            return _expand_targets(cache["intervals"], cache["rules"])
         response.raise_for_status()
 
-        # Parse CSV
-        f = io.StringIO(response.text)
-        reader = csv.reader(f)
-        target_dates = []
-
-        for row in reader:
-            target_date = _parse_target_date_row(row)
-            if target_date:
-                target_dates.append(target_date)
-
-        return target_dates
+        content_hash = hashlib.sha256(response.text.encode("utf-8")).hexdigest()
+        if cache and cache.get("content_hash") == content_hash:
+            logger.info("Target dates content unchanged, skipping parse.")
+            target_dates, rules = cache["intervals"], cache["rules"]
+        else:
+            target_dates, rules = _parse_target_csv(response.text)
+
+        _save_sheet_cache(
+            url,
+            {
+                "etag": _header(response, "ETag"),
+                "last_modified": _header(response, "Last-Modified"),
+                "content_hash": content_hash,
+                "fetched_at": datetime.now().astimezone().isoformat(),
+                "intervals": target_dates,
+                "rules": rules,
+            },
+        )
+        return _expand_targets(target_dates, rules)
     except Exception as e:
         logger.error(f"Failed to fetch target dates: {e}")
+        if cache:
+            logger.warning(f"Using last good copy of target dates from {cache.get('fetched_at')}")
+            return _expand_targets(cache["intervals"], cache["rules"])
         return []
 
 
@@ -127,18 +246,22 @@ def print_availability_report(day_data):
         prefix = "[NEW]      " if slot.is_new else "[AVAILABLE]"
         print(f"{prefix} {slot.time}: {', '.join(slot.courts)}")
 
+    for block in day_data.blocks:
+        print(f"[BLOCK]     {block.start}-{block.end}: {block.court or 'any court'} ({block.slots} slots)")
+
     if slots:
         print(f"Summary: Found {len(slots)} available time slots for {date_str}!")
     else:
         print(f"Summary: No courts available for {date_str}.")
 
 
-def has_time_overlap(slot_time: str, target_date: TargetInterval) -> bool:
+def has_time_overlap(slot_time: str, target_date: TargetInterval, duration: int | None = None) -> bool:
     """Checks if a slot overlaps with the target date's time interval.
 
     Args:
         slot_time: Start time of the slot in HH:MM format (e.g., "10:15")
         target_date: TargetInterval with optional start_time and end_time
+        duration: Slot length in minutes, defaults to SLOT_DURATION_MINUTES
 
     Returns:
         True if the slot overlaps with the interval or no interval is specified
@@ -148,9 +271,9 @@ def has_time_overlap(slot_time: str, target_date: TargetInterval) -> bool:
         return True
 
     # Parse times to compare
-    # Slot is 45 minutes long
+    duration = config.SLOT_DURATION_MINUTES if duration is None else duration
     slot_start = datetime.strptime(slot_time, "%H:%M").time()
-    slot_end = (datetime.strptime(slot_time, "%H:%M") + timedelta(minutes=45)).time()
+    slot_end = (datetime.strptime(slot_time, "%H:%M") + timedelta(minutes=duration)).time()
 
     interval_start = datetime.strptime(target_date.start_time, "%H:%M").time()
     interval_end = datetime.strptime(target_date.end_time, "%H:%M").time()
@@ -161,7 +284,11 @@ def has_time_overlap(slot_time: str, target_date: TargetInterval) -> bool:
 
 
 def get_target_intervals_list(start_date_arg: str | None, days_arg: int) -> List[TargetInterval]:
-    """Determines the list of target dates to scrape."""
+    """Determines the list of target dates to scrape.
+
+    Raises NoTargetDatesError if the sheet only lists past dates, and ConfigurationError for a
+    malformed start date.
+    """
     logger.info("Fetching target dates from CSV...")
     target_dates = []
     if config.TARGET_DATES_CSV_URL:
@@ -170,8 +297,7 @@ def get_target_intervals_list(start_date_arg: str | None, days_arg: int) -> List
         if target_dates:
             target_dates = filter_future_dates(target_dates)
             if not target_dates:
-                logger.info("No future dates found in Google Sheet. Exiting gracefully.")
-                sys.exit(0)
+                raise NoTargetDatesError("No future dates found in Google Sheet")
 
     if not target_dates:
         logger.warning("No target dates found in google sheet")
@@ -179,8 +305,7 @@ def get_target_intervals_list(start_date_arg: str | None, days_arg: int) -> List
             try:
                 start_date = datetime.strptime(start_date_arg, "%Y-%m-%d")
             except ValueError:
-                logger.error("Error: Start date must be in YYYY-MM-DD format.")
-                sys.exit(1)
+                raise ConfigurationError(f"Start date must be in YYYY-MM-DD format, got {start_date_arg!r}") from None
         else:
             start_date = datetime.now()
 
@@ -189,69 +314,205 @@ def get_target_intervals_list(start_date_arg: str | None, days_arg: int) -> List
             target_dates.append(TargetInterval(date=current_date.strftime("%Y-%m-%d"), start_time=None, end_time=None))
 
     if not target_dates:
-        logger.error("No target dates found. Exiting.")
-        sys.exit(1)
+        raise ConfigurationError(f"No target dates found for {days_arg} days")
 
     return target_dates
 
 
-def send_notification(total_new_slots: int, new_slots_data: List[Tuple[str, List[Slot]]]):
-    """Sends a Telegram notification about new slots."""
-    print(f"\n*** Total NEW slots found: {total_new_slots} ***")
+def get_subscriber_targets(
+    subscription_list: List[Subscription], start_date_arg: str | None, days_arg: int
+) -> Dict[str, List[TargetInterval]]:
+    """Resolves the target intervals of every subscriber, fetching each sheet only once.
 
-    # Format the message
-    msg_lines = []
-    for date_str, slots in new_slots_data:
-        msg_lines.append(f"*{date_str}*:")
-        for s in slots:
-            msg_lines.append(f"  - {s.time} ({', '.join(s.courts)})")
-
-    formatted_slots_msg = "\n".join(msg_lines)
+    The default subscriber keeps the CLI fallback of `get_target_intervals_list`. Dates watched
+    through the bot are added to each subscriber's sheet targets.
+    """
+    targets: Dict[str, List[TargetInterval]] = {}
+    sheets: Dict[str, List[TargetInterval]] = {}
+
+    for subscription in subscription_list:
+        watched = filter_future_dates(subscription.targets)
+        if subscription.name == subscriptions.DEFAULT_SUBSCRIBER:
+            targets[subscription.name] = get_target_intervals_list(start_date_arg, days_arg) + watched
+            continue
+        if not subscription.sheet_url and not watched:
+            logger.warning(f"Subscriber {subscription.name} has no target sheet or watched dates. Skipping.")
+            continue
+        if subscription.sheet_url and subscription.sheet_url not in sheets:
+            sheets[subscription.sheet_url] = filter_future_dates(fetch_target_dates(subscription.sheet_url))
+        targets[subscription.name] = (sheets[subscription.sheet_url] if subscription.sheet_url else []) + watched
+
+    if not any(targets.values()):
+        raise NoTargetDatesError("No future target dates for any subscriber")
+
+    return targets
+
+
+def send_notification(
+    total_new_slots: int,
+    new_slots_data: List[Tuple[str, List[Slot]]],
+    subscription_list: List[Subscription] | None = None,
+    deadline: float | None = None,
+):
+    """Delivers pending notifications from the outbox to each subscriber's notifier backends,
+    giving up at `deadline`, a `time.monotonic()` value.
+    """
+    if total_new_slots:
+        logger.info(f"Total new slots found: {total_new_slots}")
+    subscription_list = subscription_list or [subscriptions.default_subscription()]
+    routes = notifiers.subscriber_routes(subscription_list)
+    delivered = outbox.deliver_pending(routes, deadline=deadline)
+    logger.info(f"Delivered {delivered} outbox entries")
 
-    # Send Telegram notification
-    message = f"🏸 *New Badminton Slots Found!* ({total_new_slots})\n\n{formatted_slots_msg}"
-    message += "\n\n[Book Now](https://www.eversports.de/widget/w/c7o9ft)"
-    telegram_notifier.send_telegram_message(message)
 
+def _filter_new_slots(
+    day_data: DayAvailability, target_interval: TargetInterval, eligible: Dict[str, List[int]] | None = None
+) -> List[Slot]:
+    """Filters new slots based on the target interval.
 
-def _filter_new_slots(day_data: DayAvailability, target_interval: TargetInterval) -> List[Slot]:
-    """Filters new slots based on the target interval."""
-    # Collect new slots for notification, filtered by time interval
-    new_slots = [s for s in day_data.slots if s.is_new]
+    If `eligible` is given, only the courts it lists per slot are considered new.
+    """
+    if eligible is None:
+        # Collect new slots for notification, filtered by time interval
+        new_slots = [s for s in day_data.slots if s.is_new]
+    else:
+        new_slots = []
+        for s in day_data.slots:
+            court_ids = sorted(eligible.get(s.time, []))
+            if court_ids:
+                courts = [config.COURT_MAPPING.get(cid, f"Unknown({cid})") for cid in court_ids]
+                new_slots.append(Slot(time=s.time, courts=courts, court_ids=court_ids, is_new=True))
 
     # Filter slots based on time interval
     return [s for s in new_slots if has_time_overlap(s.time, target_interval)]
 
 
+def select_new_slots(
+    day_availability: DayAvailability,
+    target_interval: TargetInterval,
+    prev_free_slots_map: FreeSlotsMap,
+    day_slots: List[str],
+    notify_index: NotificationIndex | None,
+    now: datetime,
+    min_block_slots: int | None = None,
+    same_court: bool | None = None,
+) -> List[Slot]:
+    """Applies the notification rules to one poll of a date and returns the new slots to notify.
+
+    The block rules default to NOTIFY_MIN_BLOCK_SLOTS and BLOCK_SAME_COURT. Notified courts are
+    recorded in the notification index, if one is given.
+    """
+    eligible = None
+    if notify_index is not None:
+        eligible = notify_index.observe(day_availability, prev_free_slots_map, now)
+
+    new_slots = _filter_new_slots(day_availability, target_interval, eligible)
+    new_slots = blocks.filter_slots_in_blocks(
+        new_slots,
+        day_availability.free_slots_map,
+        day_slots,
+        config.NOTIFY_MIN_BLOCK_SLOTS if min_block_slots is None else min_block_slots,
+        config.BLOCK_SAME_COURT if same_court is None else same_court,
+    )
+    if new_slots and notify_index is not None:
+        date_str = day_availability.date
+        notify_index.mark_notified(
+            (outbox.slot_key(date_str, s.time, cid) for s in new_slots for cid in s.court_ids), now
+        )
+    return new_slots
+
+
+def prioritize_targets(target_intervals: List[TargetInterval], skipped_dates: List[str]) -> List[TargetInterval]:
+    """Orders targets so the most wanted dates are fetched before a time budget runs out.
+
+    Dates the previous run skipped come first, then targets with a time window, as those were
+    asked for explicitly, each soonest first.
+    """
+    skipped = set(skipped_dates)
+    return sorted(target_intervals, key=lambda t: (t.date not in skipped, t.start_time is None, t.date))
+
+
+def prefetch_days(target_intervals: List[TargetInterval], deadline: float | None = None) -> DaySource:
+    """Fetches all target dates concurrently and returns a day source serving the responses.
+
+    Dates left out because `deadline` passed are fetched one by one, which `collect_availability`
+    skips as the deadline has passed.
+    """
+    responses = async_fetch.fetch_all([t.date for t in target_intervals], deadline)
+
+    def get_day(date_str: str, all_slots: List[str], history: HistoryState) -> DayAvailability | None:
+        if date_str not in responses:
+            return scraper.get_day_availability(date_str, all_slots, history)
+        data = responses[date_str]
+        free_slots_map = scraper.free_slots_from(data, date_str, all_slots)
+        if free_slots_map is None:
+            return None
+        return scraper.build_day_availability(
+            date_str, free_slots_map, all_slots, history, fetched_at=scraper.fetched_at_of(data)
+        )
+
+    return get_day
+
+
 def collect_availability(
     target_intervals: List[TargetInterval],
-    all_slots: List[str],
     history: HistoryState,
+    notify_index: NotificationIndex | None = None,
+    deadline: float | None = None,
+    get_day: DaySource | None = None,
 ) -> ScrapeOutcome:
-    """Processes target intervals and returns structured scrape outcome."""
+    """Processes target intervals and returns structured scrape outcome.
+
+    Each date is mapped onto the facility's slot grid for that day. With a notification index,
+    new slots are limited to courts that passed the minimum free polls and cooldown rules, and
+    notified courts are recorded in the index. With NOTIFY_MIN_BLOCK_SLOTS above 1, only new
+    slots inside long enough blocks are kept.
+
+    Once `deadline` (a `time.monotonic()` value) has passed, the remaining dates are skipped and
+    keep their history. Days are fetched with `get_day`, by default `scraper.get_day_availability`.
+    """
+    get_day = get_day or scraper.get_day_availability
     state_snapshot: HistoryState = {}
     day_availabilities: List[DayAvailability] = []
     new_slots_data: NewSlotsData = []
+    skipped_dates: List[str] = []
+    failed_dates: List[str] = []
+    now = datetime.now().astimezone()
 
-    for target_interval in target_intervals:
+    for position, target_interval in enumerate(target_intervals):
         date_str = target_interval.date
-        day_availability = scraper.get_day_availability(date_str, all_slots, history)
+        if deadline is not None and time.monotonic() >= deadline:
+            skipped_dates = [t.date for t in target_intervals[position:]]
+            logger.warning(f"Time budget used up, skipping {len(skipped_dates)} dates: {', '.join(skipped_dates)}")
+            for skipped_date in skipped_dates:
+                if skipped_date in history:
+                    state_snapshot[skipped_date] = history[skipped_date]
+            break
+
+        day_slots = scraper.get_all_slots(date_str)
+        day_availability = get_day(date_str, day_slots, history)
 
         if day_availability:
             state_snapshot[date_str] = day_availability.free_slots_map
             day_availabilities.append(day_availability)
 
-            filtered_new_slots = _filter_new_slots(day_availability, target_interval)
+            filtered_new_slots = select_new_slots(
+                day_availability, target_interval, history.get(date_str, {}), day_slots, notify_index, now
+            )
             if filtered_new_slots:
                 new_slots_data.append((date_str, filtered_new_slots))
-        elif date_str in history:
-            # Preserve history if fetch failed
-            state_snapshot[date_str] = history[date_str]
+        else:
+            failed_dates.append(date_str)
+            if date_str in history:
+                # Preserve history if fetch failed
+                state_snapshot[date_str] = history[date_str]
 
     return ScrapeOutcome(
         state_snapshot=state_snapshot,
         day_availabilities=day_availabilities,
         new_slots_data=new_slots_data,
+        skipped_dates=skipped_dates,
+        failed_dates=failed_dates,
     )
 
 
@@ -261,25 +522,98 @@ def print_availability_reports(day_availabilities: List[DayAvailability]):
         print_availability_report(day_data)
 
 
-def run(start_date: str | None = None, days: int = 3):
+def print_outcome(outcome: ScrapeOutcome):
+    """Outputs the availability reports and a summary of the new slots to stdout."""
+    print_availability_reports(outcome.day_availabilities)
+    total_new_slots = sum(len(slots) for _, slots in outcome.new_slots_data)
+    if total_new_slots:
+        print(f"\n*** Total NEW slots found: {total_new_slots} ***")
+    else:
+        print(f"\nNo new slots found across {len(outcome.day_availabilities)} days.")
+    end_to_end = outcome.latency.get("end_to_end", {})
+    if end_to_end.get("count"):
+        p50, p90 = latency.format_seconds(end_to_end["p50"]), latency.format_seconds(end_to_end["p90"])
+        print(f"Freed courts notified: {end_to_end['count']}, {p50} (median) and {p90} (p90) after last seen booked.")
+
+
+def apply_catalog():
+    """Replaces the configured courts and opening hours with the discovered catalog, if enabled."""
+    if config.CATALOG_DISCOVERY:
+        discovered = catalog.get_catalog()
+        if discovered is not None:
+            catalog.apply(discovered)
+
+
+def scrape_targets(start_date: str | None, days: int) -> Tuple[List[Subscription], subscriptions.MatchingEngine]:
+    """Loads the subscribers and matches them to their target dates."""
+    subscription_list = subscriptions.load_subscriptions()
+    engine = subscriptions.MatchingEngine(
+        subscription_list, get_subscriber_targets(subscription_list, start_date, days), has_time_overlap
+    )
+    return subscription_list, engine
+
+
+def run(
+    start_date: str | None = None, days: int = 3, deadline: float | None = None, get_day: DaySource | None = None
+) -> ScrapeOutcome:
     """Core orchestration logic. Loops through target dates, checks for availability, and
-    sends notifications when new slots are found."""
+    sends notifications when new slots are found. Returns the outcome of the scrape, which
+    `print_outcome` reports on the command line.
+
+    With a `deadline` in seconds (default RUN_DEADLINE_SECONDS, 0 = none), fetching stops early
+    enough to save and notify within it. Skipped dates are checkpointed and fetched first next run.
+    Dates are fetched concurrently when `async_fetch` is available. `get_day` replaces fetching,
+    e.g. to merge the snapshots of shard workers.
+    """
+    started = time.monotonic()
+    deadline = config.RUN_DEADLINE_SECONDS if deadline is None else deadline
+    fetch_deadline = started + max(deadline - config.DEADLINE_RESERVE_SECONDS, 0) if deadline > 0 else None
+
+    metrics.reset()
+    apply_catalog()
 
-    target_intervals = get_target_intervals_list(start_date, days)
+    subscription_list, engine = scrape_targets(start_date, days)
+    # One target per unique date, however many subscribers watch it
+    target_intervals = prioritize_targets(engine.scrape_targets(), persist.load_checkpoint())
     date_strs = [td.date for td in target_intervals]
     logger.info(f"Checking availability for {len(target_intervals)} days: {', '.join(date_strs)}")
 
-    all_slots = scraper.get_all_slots()
     history: HistoryState = persist.load_history()
-
-    outcome = collect_availability(target_intervals, all_slots, history)
-    print_availability_reports(outcome.day_availabilities)
-
-    persist.save_history(outcome.state_snapshot)
-    persist.save_report(outcome.day_availabilities)
+    fetch_times = persist.load_fetch_times()
+    notify_index = NotificationIndex.load()
+
+    if get_day is None and async_fetch.available():
+        get_day = prefetch_days(target_intervals, fetch_deadline)
+    outcome = collect_availability(target_intervals, history, notify_index, fetch_deadline, get_day)
+    metrics.increment("dates_skipped", len(outcome.skipped_dates))
+
+    # Queue notifications before recording the slots as seen, so a failed send is retried next run
+    matched = engine.match(outcome.new_slots_data)
+    routed = notifiers.subscriber_routes(subscription_list)
+    for subscriber, subscriber_slots in matched.items():
+        if subscriber in routed:
+            outbox.enqueue(subscriber_slots, subscriber=subscriber)
+    if subscriptions.ALL_SUBSCRIBERS in routed and matched:
+        outbox.enqueue(subscriptions.merge_matches(matched), subscriber=subscriptions.ALL_SUBSCRIBERS)
+    notify_index.save(datetime.now().astimezone())
+
+    fetched_at = {d.date: d.fetched_at for d in outcome.day_availabilities if d.fetched_at}
+    persist.save_history(outcome.state_snapshot, fetched_at)
+    persist.save_checkpoint(outcome.skipped_dates)
+    if config.ARCHIVE_ENABLED:
+        archive.append(outcome.day_availabilities)
+    # The report may include dates that overlapping runs fetched, and the dashboard files follow it
+    report_days = persist.save_report(outcome.day_availabilities)
+    persist.save_day_shards(report_days)
+    persist.save_aggregates(aggregates.build_aggregates(report_days))
 
     total_filtered_new_slots = sum(len(slots) for _, slots in outcome.new_slots_data)
-    if total_filtered_new_slots > 0:
-        send_notification(total_filtered_new_slots, outcome.new_slots_data)
-    else:
-        print(f"\nNo new slots found across {len(target_intervals)} days.")
+    # Notifying gets what is left of the reserve, up to the end of the budget
+    run_deadline = started + deadline if deadline > 0 else None
+    send_notification(total_filtered_new_slots, outcome.new_slots_data, subscription_list, run_deadline)
+    outcome.latency = latency.record_run(outcome.day_availabilities, history, fetch_times, outbox.load_outbox())
+
+    # Background revalidations only warm the cache, so they don't get to overrun the budget
+    response_cache.drain(max(started + deadline - time.monotonic(), 0) if deadline > 0 else None)
+    metrics.save()
+    return outcome
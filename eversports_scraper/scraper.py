@@ -1,36 +1,85 @@
+import bisect
+import codecs
+import json
 import logging
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Set
+import re
+import sys
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
 from urllib.parse import urlencode
 
 import cloudscraper
 
-from eversports_scraper import config
-from eversports_scraper.models import DayAvailability, Slot
+from eversports_scraper import blocks, config, metrics, persist, response_cache
+from eversports_scraper.models import DayAvailability, FreeSlotsMap, Slot
 
 logger = logging.getLogger(__name__)
 
+STREAM_CHUNK_SIZE = 16 * 1024
+_json_decoder = json.JSONDecoder()
 
-def get_all_slots() -> List[str]:
-    """Generates a list of all possible slot start times based on the facility's schedule."""
-    start_hour = 10
-    start_minute = 15
-    end_hour = 22
-    end_minute = 15
-    slot_duration_minutes = 45
 
-    slots = []
-    current_time = datetime.now().replace(hour=start_hour, minute=start_minute, second=0, microsecond=0)
-    end_time = datetime.now().replace(hour=end_hour, minute=end_minute, second=0, microsecond=0)
+def _minutes(hhmm: str) -> int:
+    return int(hhmm[:2]) * 60 + int(hhmm[-2:])
 
-    while current_time <= end_time:
-        slots.append(current_time.strftime("%H:%M"))
-        current_time += timedelta(minutes=slot_duration_minutes)
 
+def _hhmm(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+@lru_cache(maxsize=32)
+def _slot_grid(opening: str, closing: str, duration: int) -> List[str]:
+    # Every slot must end by closing time
+    slots = [sys.intern(_hhmm(m)) for m in range(_minutes(opening), _minutes(closing) - duration + 1, duration)]
     logger.debug(f"Generated {len(slots)} slots: {slots}")
     return slots
 
 
+def get_all_slots(date_str: str | None = None) -> List[str]:
+    """Returns the slot start times of the facility's schedule, for a specific day if given.
+
+    Days with the same opening hours share one grid, so callers must not modify it.
+    """
+    opening, closing = config.DEFAULT_OPENING_HOURS
+    if date_str:
+        weekday = date.fromisoformat(date_str).weekday()
+        opening, closing = config.OPENING_HOURS.get(weekday, (opening, closing))
+    return _slot_grid(opening, closing, config.SLOT_DURATION_MINUTES)
+
+
+_court_names: Dict[Tuple[int, ...], List[str]] = {}
+_court_names_source: Dict[int, str] = {}
+
+
+def court_names(court_ids: Tuple[int, ...]) -> List[str]:
+    """Returns the names of a set of courts, shared by every slot with the same free courts.
+
+    The names are interned and the cache is rebuilt when COURT_MAPPING is replaced, e.g. by the
+    catalog. Callers must not modify the returned list.
+    """
+    global _court_names_source
+    if config.COURT_MAPPING is not _court_names_source:
+        _court_names.clear()
+        _court_names_source = config.COURT_MAPPING
+    names = _court_names.get(court_ids)
+    if names is None:
+        names = [sys.intern(config.COURT_MAPPING.get(cid, f"Unknown({cid})")) for cid in court_ids]
+        _court_names[court_ids] = names
+    return names
+
+
+def resolve_court(value: str) -> Optional[int]:
+    """Resolves a court given by ID, by name ("Court 2") or by its number ("2")."""
+    value = value.strip()
+    if value.isdigit() and int(value) in config.COURT_MAPPING:
+        return int(value)
+    for court_id, name in config.COURT_MAPPING.items():
+        if value.lower() in (name.lower(), name.lower().split()[-1]):
+            return court_id
+    return None
+
+
 def build_url(day_iso: str) -> str:
     """Constructs the API URL for a specific date."""
     qs = {"facilityId": config.FACILITY_ID, "sport": config.SPORT, "startDate": day_iso}
@@ -40,17 +89,35 @@ def build_url(day_iso: str) -> str:
     return url
 
 
+def cache_key(date_str: str) -> str:
+    """Identifies a slot API response by facility, sport, courts and start date."""
+    courts = ",".join(str(cid) for cid in sorted(config.COURT_IDS))
+    return f"{config.FACILITY_ID}|{config.SPORT}|{courts}|{date_str}"
+
+
 def fetch_booked_slots(date_str: str) -> Optional[Dict]:
-    """Fetches booked slots from the Eversports API using cloudscraper."""
+    """Fetches booked slots, served from the response cache while it is fresh."""
+    return response_cache.get_cache().get(cache_key(date_str), date_str, lambda: request_booked_slots(date_str))
+
+
+def request_booked_slots(date_str: str) -> Optional[Dict]:
+    """Fetches booked slots from the Eversports API using cloudscraper.
+
+    The response is streamed, and each booking record is validated as soon as it is complete and
+    reduced to its compact form, see `validate_booking`. Malformed records are counted and skipped.
+    """
     full_url = build_url(date_str)
     logger.info(f"Fetching data for {date_str} from {full_url}")
 
     try:
         scraper = cloudscraper.create_scraper()
-        response = scraper.get(full_url, headers=config.COMMON_HEADERS, timeout=10)
+        scraper.cookies.update(persist.load_cookies())
+        response = scraper.get(full_url, headers=config.COMMON_HEADERS, timeout=10, stream=True)
         logger.debug(f"Response status: {response.status_code}")
         response.raise_for_status()
-        data: Dict = response.json()
+        data = read_bookings(response.iter_content(chunk_size=STREAM_CHUNK_SIZE), date_str)
+        # Keeps the clearance of a solved challenge for the next requests
+        persist.save_cookies(dict(scraper.cookies.get_dict()))
         return data
     except Exception as e:
         logger.error(f"Error fetching data: {e}")
@@ -59,79 +126,272 @@ def fetch_booked_slots(date_str: str) -> Optional[Dict]:
         return None
 
 
+def read_bookings(chunks: Iterable[bytes], date_str: str) -> Dict:
+    """Parses a slot API response body into its valid booking records, counting malformed ones.
+
+    The response keeps the time it was fetched, so a copy served from the response cache reports
+    when the bookings were actually seen. Raises ValueError if the body has no complete `slots` array.
+    """
+    bookings, malformed = [], 0
+    for record in iter_json_array(_decode_chunks(chunks), "slots"):
+        booking = validate_booking(record)
+        if booking is None:
+            malformed += 1
+        else:
+            bookings.append(booking)
+    if malformed:
+        metrics.increment("malformed_bookings", malformed)
+        logger.warning(f"Skipped {malformed} malformed booking records for {date_str}")
+    return {"slots": bookings, "fetched_at": datetime.now().astimezone().isoformat()}
+
+
+def _decode_chunks(chunks: Iterable[bytes]) -> Iterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    for chunk in chunks:
+        yield decoder.decode(chunk)
+    yield decoder.decode(b"", final=True)
+
+
+def iter_json_array(chunks: Iterable[str], key: str) -> Iterator[object]:
+    """Yields the items of the first array under `key` one by one while the text arrives in chunks.
+
+    Only the current item is ever parsed, so the whole document never exists as objects at once.
+    Raises ValueError if there is no such array or it is truncated.
+    """
+    start_pattern = re.compile(rf'"{re.escape(key)}"\s*:\s*\[')
+    chunk_iter = iter(chunks)
+    buffer = ""
+    for chunk in chunk_iter:
+        buffer += chunk
+        match = start_pattern.search(buffer)
+        if match:
+            buffer = buffer[match.end() :]
+            break
+        # Keep enough of the tail to find a key split across chunks
+        buffer = buffer[-256:]
+    else:
+        raise ValueError(f"No '{key}' array in response")
+
+    position = 0
+    while True:
+        while position < len(buffer) and buffer[position] in " \t\r\n,":
+            position += 1
+        if position == len(buffer):
+            more = next(chunk_iter, None)
+            if more is None:
+                raise ValueError(f"Response ended inside the '{key}' array")
+            buffer, position = more, 0
+            continue
+        if buffer[position] == "]":
+            return
+        try:
+            item, position = _json_decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            # The item is incomplete, or malformed if no more text arrives
+            more = next(chunk_iter, None)
+            if more is None:
+                raise
+            buffer, position = buffer[position:] + more, 0
+            continue
+        yield item
+        if position > STREAM_CHUNK_SIZE:
+            buffer, position = buffer[position:], 0
+
+
+def _normalize_time(value) -> Optional[str]:
+    """Returns an API time as HHMM, zero-padding e.g. "930", or None if it is not a time of day."""
+    if not isinstance(value, str) or len(value) not in (3, 4) or not value.isdigit():
+        return None
+    hhmm = value.zfill(4)
+    hours, minutes = int(hhmm[:2]), int(hhmm[2:])
+    if minutes > 59 or hours > 24 or (hours == 24 and minutes):
+        return None
+    return hhmm
+
+
+def validate_booking(record) -> Optional[Dict]:
+    """Checks a booking record against the fields we use and reduces it to date, court, start and end.
+
+    Returns None for a malformed record, e.g. a missing court or a start time that is not HHMM.
+    """
+    if not isinstance(record, dict):
+        return None
+    date_str, court = record.get("date"), record.get("court")
+    if not isinstance(date_str, str):
+        return None
+    try:
+        date.fromisoformat(date_str)
+    except ValueError:
+        return None
+    if not isinstance(court, int) or isinstance(court, bool) or court <= 0:
+        return None
+    start = _normalize_time(record.get("start"))
+    if start is None:
+        return None
+    end, duration = record.get("end"), record.get("duration")
+    if end is not None:
+        end = _normalize_time(end)
+        if end is None:
+            return None
+    if duration is not None and (not isinstance(duration, int) or isinstance(duration, bool) or duration <= 0):
+        return None
+    interval = booking_interval({"start": start, "end": end, "duration": duration})
+    if interval is None:
+        return None
+    return {"date": date_str, "court": court, "start": start, "end": _hhmm(interval[1]).replace(":", "")}
+
+
+def booking_interval(booking: Dict) -> Optional[Tuple[int, int]]:
+    """Returns a booking's [start, end) in minutes after midnight.
+
+    The end comes from `end` (HHMM) or `duration` (minutes) when the API provides them, and
+    defaults to one slot.
+    """
+    start_raw = booking.get("start")  # e.g., "1100"
+    if not start_raw:
+        return None
+    start = _minutes(start_raw)
+    if booking.get("end"):
+        end = _minutes(booking["end"])
+    elif booking.get("duration"):
+        end = start + int(booking["duration"])
+    else:
+        end = start + config.SLOT_DURATION_MINUTES
+    return start, max(end, start + 1)
+
+
 def parse_booked_slots(data: Dict, date_str: str, all_slots: List[str]) -> Dict[str, Set[int]]:
     """Parses the API response to map booked slots to court IDs."""
     if "slots" not in data:
-        logger.error("Unexpected JSON format. 'slots' key missing.")
-        logger.debug(f"Response data: {data}")
+        logger.error(f"Unexpected JSON format. 'slots' key missing, got keys {sorted(data)[:10]}.")
         return {}
+    return book_slots(data["slots"], date_str, all_slots)
 
-    booked_courts_by_slot: Dict[str, Set[int]] = {slot: set() for slot in all_slots}
 
-    for booking in data["slots"]:
-        if booking.get("date") == date_str:
-            start_raw = booking.get("start")  # e.g., "1100"
-            court_id = booking.get("court")
+def book_slots(bookings: Iterable[Dict], date_str: str, all_slots: List[str]) -> Dict[str, Set[int]]:
+    """Maps booking records onto the slot grid of a date.
 
-            if start_raw and court_id:
-                start_formatted = f"{start_raw[:2]}:{start_raw[2:]}"
-                if start_formatted in booked_courts_by_slot:
-                    booked_courts_by_slot[start_formatted].add(court_id)
-                else:
-                    logger.warning(f"Booking found for slot {start_formatted} which is not in our generated schedule.")
+    Each booking is an interval that blocks every slot of the grid it overlaps. The slots are
+    found by bisecting the sorted slot starts, so a booking costs O(log n) plus the slots it covers.
+    """
+    booked_courts_by_slot: Dict[str, Set[int]] = {slot: set() for slot in all_slots}
+    starts = sorted(_minutes(slot) for slot in all_slots)
+    duration = config.SLOT_DURATION_MINUTES
+
+    for booking in bookings:
+        if booking.get("date") != date_str:
+            continue
+        court_id = booking.get("court")
+        interval = booking_interval(booking)
+        if not court_id or interval is None:
+            continue
+
+        booking_start, booking_end = interval
+        # Slot [s, s + duration) overlaps the booking iff booking_start - duration < s < booking_end
+        first = bisect.bisect_right(starts, booking_start - duration)
+        last = bisect.bisect_left(starts, booking_end)
+        if first >= last:
+            logger.warning(f"Booking at {_hhmm(booking_start)} does not overlap any slot in our generated schedule.")
+            continue
+        for slot_start in starts[first:last]:
+            booked_courts_by_slot[_hhmm(slot_start)].add(court_id)
 
     return booked_courts_by_slot
 
 
 def calculate_free_slots(booked_courts_by_slot: Dict[str, Set[int]], all_slots: List[str]) -> Dict[str, List[int]]:
-    """Calculates which courts are free for each slot."""
-    all_court_ids = set(config.COURT_IDS)
+    """Calculates which courts are free for each slot, as sorted court IDs."""
+    all_court_ids = sorted(set(config.COURT_IDS))
     free_slots_map = {}
 
     for slot in all_slots:
-        booked_ids = booked_courts_by_slot.get(slot, set())
-        free_ids = list(all_court_ids - booked_ids)
+        booked_ids = booked_courts_by_slot.get(slot)
+        free_ids = [cid for cid in all_court_ids if cid not in booked_ids] if booked_ids else list(all_court_ids)
         if free_ids:
             free_slots_map[slot] = free_ids
 
     return free_slots_map
 
 
-def get_day_availability(date_str: str, all_slots: List[str], history: Dict) -> Optional[DayAvailability]:
-    """Fetches data and returns a structured availability object for a single date."""
+def fetch_free_slots(date_str: str, all_slots: List[str]) -> Tuple[Optional[FreeSlotsMap], str | None]:
+    """Fetches the bookings of a date and returns its free courts per slot, None if the fetch failed,
+    with the time the bookings were fetched.
+    """
     data = fetch_booked_slots(date_str)
+    return free_slots_from(data, date_str, all_slots), fetched_at_of(data)
+
 
+def fetched_at_of(data: Optional[Dict]) -> str | None:
+    """Returns when a response was fetched, None for responses cached before fetch times were kept."""
+    return data.get("fetched_at") if data else None
+
+
+def free_slots_from(data: Optional[Dict], date_str: str, all_slots: List[str]) -> Optional[FreeSlotsMap]:
+    """Returns the free courts per slot of a fetched response, or None if the fetch failed."""
     if not data:
-        print(f"Failed to fetch data for {date_str}.")
+        logger.warning(f"Failed to fetch data for {date_str}.")
         return None
 
     booked_courts_by_slot = parse_booked_slots(data, date_str, all_slots)
-    free_slots_map = calculate_free_slots(booked_courts_by_slot, all_slots)
-
+    return calculate_free_slots(booked_courts_by_slot, all_slots)
+
+
+def build_day_availability(
+    date_str: str,
+    free_slots_map: FreeSlotsMap,
+    all_slots: List[str],
+    history: Dict,
+    fetched_at: str | None = None,
+    block_slots: int | None = None,
+) -> DayAvailability:
+    """Builds the availability of a date from its free courts, flagging slots that were not free before.
+
+    `fetched_at` defaults to now, for bookings whose fetch time is unknown. The day lists blocks of at
+    least `block_slots` consecutive free slots, by default REPORT_BLOCK_SLOTS; 0 leaves them out.
+    """
     # Compare with history to identify new slots
     prev_free_slots_map = history.get(date_str, {})
 
     slots_data = []
     new_slots_count = 0
 
-    for slot in sorted(free_slots_map.keys()):
+    for slot in sorted(free_slots_map):
         free_court_ids = free_slots_map[slot]
-        free_court_names = [config.COURT_MAPPING.get(cid, f"Unknown({cid})") for cid in sorted(free_court_ids)]
+        if any(a > b for a, b in zip(free_court_ids, free_court_ids[1:])):
+            free_court_ids = sorted(free_court_ids)
 
-        # Check for new availability
-        prev_free_courts = set(prev_free_slots_map.get(slot, []))
-        current_free_courts = set(free_court_ids)
-        newly_free_courts = current_free_courts - prev_free_courts
-
-        is_new = bool(newly_free_courts)
+        # Check for new availability, i.e. a court that was not free before
+        prev_free_courts = prev_free_slots_map.get(slot)
+        is_new = not prev_free_courts or any(cid not in prev_free_courts for cid in free_court_ids)
         if is_new:
             new_slots_count += 1
 
-        slots_data.append(Slot(time=slot, courts=free_court_names, court_ids=free_court_ids, is_new=is_new))
+        slots_data.append(
+            Slot(time=slot, courts=court_names(tuple(free_court_ids)), court_ids=free_court_ids, is_new=is_new)
+        )
 
     return DayAvailability(
         date=date_str,
         slots=slots_data,
         new_count=new_slots_count,
         free_slots_map=free_slots_map,
+        blocks=(
+            blocks.find_blocks(
+                free_slots_map,
+                all_slots,
+                config.REPORT_BLOCK_SLOTS if block_slots is None else block_slots,
+                config.BLOCK_SAME_COURT,
+            )
+            if block_slots != 0
+            else []
+        ),
+        fetched_at=fetched_at or datetime.now().astimezone().isoformat(),
     )
+
+
+def get_day_availability(date_str: str, all_slots: List[str], history: Dict) -> Optional[DayAvailability]:
+    """Fetches data and returns a structured availability object for a single date."""
+    free_slots_map, fetched_at = fetch_free_slots(date_str, all_slots)
+    if free_slots_map is None:
+        return None
+    return build_day_availability(date_str, free_slots_map, all_slots, history, fetched_at=fetched_at)
@@ -0,0 +1,293 @@
+import dataclasses
+import hashlib
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from eversports_scraper import bot, config, persist, run, scraper
+from eversports_scraper.errors import NoTargetDatesError
+from eversports_scraper.models import DayAvailability, TargetInterval
+
+logger = logging.getLogger(__name__)
+
+# Filtered responses are memoised until the next scrape; this caps the number of distinct queries kept
+MAX_CACHED_QUERIES = 1024
+
+Response = Tuple[bytes, str]
+
+
+def _encode(data) -> Response:
+    body = json.dumps(data, separators=(",", ":")).encode()
+    return body, f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+
+
+class AvailabilityIndex:
+    """In-memory availability of the latest scrape, with responses precomputed per date.
+
+    Each date's JSON body and ETag are built once per scrape. Filtered queries are computed on
+    first use and memoised until the next update, so repeated queries are served from memory.
+    """
+
+    def __init__(self, event_retention_minutes: int | None = None):
+        self._lock = threading.Lock()
+        self.days: Dict[str, DayAvailability] = {}
+        self.responses: Dict[str, Response] = {}
+        self.queries: Dict[Tuple, Response] = {}
+        self.events: List[Dict] = []
+        self.event_retention = timedelta(
+            minutes=config.SERVE_EVENT_RETENTION_MINUTES if event_retention_minutes is None else event_retention_minutes
+        )
+        self.last_updated: datetime | None = None
+        self.last_error: str | None = None
+
+    def update(self, day_availabilities: List[DayAvailability], now: datetime | None = None):
+        """Replaces the indexed dates and records courts that became free since the previous update."""
+        now = now or datetime.now().astimezone()
+        detected_at = now.isoformat()
+        events: List[Dict] = []
+        for day in day_availabilities:
+            previous = self.days.get(day.date)
+            for slot in day.slots:
+                if previous is None:
+                    newly_free = slot.court_ids if slot.is_new else []
+                else:
+                    known = set(previous.free_slots_map.get(slot.time, []))
+                    newly_free = [cid for cid in slot.court_ids if cid not in known]
+                events.extend(
+                    {"date": day.date, "time": slot.time, "court_id": cid, "detected_at": detected_at}
+                    for cid in sorted(newly_free)
+                )
+
+        days = {day.date: day for day in sorted(day_availabilities, key=lambda d: d.date)}
+        responses = {date_str: _encode(self._serialize(day)) for date_str, day in days.items()}
+        responses["*"] = _encode({"last_updated": detected_at, "days": [self._serialize(day) for day in days.values()]})
+        cutoff = (now - self.event_retention).isoformat()
+        with self._lock:
+            self.days = days
+            self.responses = responses
+            self.queries = {}
+            self.events = [e for e in self.events if e["detected_at"] >= cutoff] + events
+            self.last_updated = now
+            self.last_error = None
+        logger.info(f"Indexed {len(days)} days, {len(events)} newly free courts")
+
+    def snapshot(self) -> List[DayAvailability]:
+        with self._lock:
+            return list(self.days.values())
+
+    def record_error(self, error: str):
+        with self._lock:
+            self.last_error = error
+
+    @staticmethod
+    def _serialize(day: DayAvailability, slots=None) -> Dict:
+        return {
+            "date": day.date,
+            "slots": [dataclasses.asdict(s) for s in (day.slots if slots is None else slots)],
+        }
+
+    def availability(
+        self, date_str: str | None = None, start: str | None = None, end: str | None = None, court: int | None = None
+    ) -> Response | None:
+        """Returns the JSON body and ETag for a query, or None if the date is not indexed."""
+        key = date_str or "*"
+        with self._lock:
+            if key not in self.responses:
+                return None
+            if start is None and end is None and court is None:
+                return self.responses[key]
+            query = (key, start, end, court)
+            if query in self.queries:
+                return self.queries[query]
+            days = [self.days[date_str]] if date_str else list(self.days.values())
+
+        window = TargetInterval(date=key, start_time=start or "00:00", end_time=end or "23:59")
+        filtered = []
+        for day in days:
+            slots = [
+                dataclasses.replace(s, courts=[config.COURT_MAPPING.get(court, str(court))], court_ids=[court])
+                if court is not None
+                else s
+                for s in day.slots
+                if run.has_time_overlap(s.time, window) and (court is None or court in s.court_ids)
+            ]
+            filtered.append(self._serialize(day, slots))
+        response = _encode(filtered[0] if date_str else {"days": filtered})
+
+        with self._lock:
+            if len(self.queries) >= MAX_CACHED_QUERIES:
+                self.queries.clear()
+            self.queries[query] = response
+        return response
+
+    def new_since(self, since: datetime) -> List[Dict]:
+        threshold = since.isoformat()
+        with self._lock:
+            return [e for e in self.events if e["detected_at"] > threshold]
+
+    def health(self, now: datetime | None = None, interval: float | None = None) -> Tuple[int, Dict]:
+        """Reports whether a scrape has succeeded recently enough to trust the index."""
+        now = now or datetime.now().astimezone()
+        interval = config.SERVE_INTERVAL_SECONDS if interval is None else interval
+        with self._lock:
+            last_updated, last_error, day_count = self.last_updated, self.last_error, len(self.days)
+        if last_updated is None:
+            status = "starting"
+        elif now - last_updated > timedelta(seconds=3 * interval):
+            status = "stale"
+        else:
+            status = "ok"
+        body = {
+            "status": status,
+            "last_updated": last_updated.isoformat() if last_updated else None,
+            "last_error": last_error,
+            "days": day_count,
+        }
+        return (200 if status == "ok" else 503), body
+
+    def seed_from_report(self):
+        """Serves the last published report until the first scrape completes."""
+        if not os.path.exists(config.REPORT_FILE):
+            return
+        try:
+            with open(config.REPORT_FILE, "r") as f:
+                data = json.load(f)
+            days = persist.load_days(data["days"])
+        except Exception as e:
+            logger.warning(f"Could not seed index from {config.REPORT_FILE}: {e}")
+            return
+        self.update(
+            [dataclasses.replace(d, slots=[dataclasses.replace(s, is_new=False) for s in d.slots]) for d in days]
+        )
+        with self._lock:
+            self.last_updated = datetime.fromisoformat(data["last_updated"])
+
+
+def _parse_time(value: str | None) -> str | None:
+    if value is None:
+        return None
+    return datetime.strptime(value, "%H:%M").strftime("%H:%M")
+
+
+def make_handler(index: AvailabilityIndex):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status: int, body: bytes, etag: str | None = None):
+            if etag is not None and self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            if etag is not None:
+                self.send_header("ETag", etag)
+                self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _error(self, status: int, message: str):
+            self._send(status, json.dumps({"error": message}).encode())
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            if url.path == "/availability":
+                try:
+                    date_str = params.get("date")
+                    if date_str:
+                        datetime.strptime(date_str, "%Y-%m-%d")
+                    start, end = _parse_time(params.get("from")), _parse_time(params.get("to"))
+                except ValueError:
+                    return self._error(400, "Use date=YYYY-MM-DD and from/to=HH:MM")
+                court = None
+                if "court" in params:
+                    court = scraper.resolve_court(params["court"])
+                    if court is None:
+                        return self._error(400, f"Unknown court '{params['court']}'")
+                response = index.availability(date_str, start, end, court)
+                if response is None:
+                    return self._error(404, f"Date {date_str} is not being monitored")
+                return self._send(200, *response)
+            if url.path == "/new-since":
+                try:
+                    since = datetime.fromisoformat(params["ts"]).astimezone()
+                except (KeyError, ValueError):
+                    return self._error(400, "Use ts=<ISO 8601 timestamp>")
+                body, _ = _encode({"since": since.isoformat(), "slots": index.new_since(since)})
+                return self._send(200, body)
+            if url.path == "/health":
+                status, health = index.health()
+                return self._send(status, json.dumps(health).encode())
+            return self._error(404, "Not found")
+
+        def log_message(self, format, *args):
+            logger.debug(f"{self.address_string()} {format % args}")
+
+    return Handler
+
+
+def scrape_loop(
+    index: AvailabilityIndex, stop: threading.Event, interval: float, start_date: str | None = None, days: int = 3
+):
+    """Scrapes every `interval` seconds and feeds the results into the index until `stop` is set."""
+    while not stop.is_set():
+        try:
+            outcome = run.run(start_date=start_date, days=days)
+            if outcome is not None:
+                # Dates skipped for lack of time or whose fetch failed keep what the previous scrape found
+                unfetched = outcome.skipped_dates + outcome.failed_dates
+                kept = [index.days[d] for d in unfetched if d in index.days]
+                index.update(outcome.day_availabilities + kept)
+        except NoTargetDatesError as e:
+            index.record_error(str(e))
+        except Exception as e:
+            logger.exception(f"Scrape failed: {e}")
+            index.record_error(str(e))
+        stop.wait(interval)
+
+
+def serve(
+    host: str | None = None,
+    port: int | None = None,
+    interval: float | None = None,
+    start_date: str | None = None,
+    days: int = 3,
+    with_bot: bool = False,
+):
+    """Runs the scraper in the background and serves its results over HTTP until interrupted.
+
+    With `with_bot`, Telegram bot commands are answered from the same in-memory index.
+    """
+    host = host or config.SERVE_HOST
+    port = config.SERVE_PORT if port is None else port
+    interval = config.SERVE_INTERVAL_SECONDS if interval is None else interval
+
+    index = AvailabilityIndex()
+    index.seed_from_report()
+    stop = threading.Event()
+    worker = threading.Thread(
+        target=scrape_loop, args=(index, stop, interval, start_date, days), name="scrape-loop", daemon=True
+    )
+    worker.start()
+    if with_bot:
+        if config.TELEGRAM_BOT_TOKEN:
+            command_bot = bot.CommandBot(config.TELEGRAM_BOT_TOKEN, snapshot=index.snapshot)
+            threading.Thread(target=command_bot.run_forever, args=(stop,), name="bot", daemon=True).start()
+        else:
+            logger.warning("TELEGRAM_BOT_TOKEN is not set. Not answering bot commands.")
+
+    httpd = ThreadingHTTPServer((host, port), make_handler(index))
+    logger.info(f"Serving availability on http://{host}:{httpd.server_port} (scraping every {interval:.0f}s)")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Shutting down")
+    finally:
+        stop.set()
+        httpd.server_close()
@@ -0,0 +1,209 @@
+import json
+import logging
+import os
+import socket
+import sqlite3
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from eversports_scraper import config, persist, run, scraper
+from eversports_scraper.models import DayAvailability, HistoryState, ScrapeOutcome
+
+logger = logging.getLogger(__name__)
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def lease_key(date_str: str, facility_id: int | None = None) -> str:
+    return f"{facility_id or config.FACILITY_ID}|{date_str}"
+
+
+class LeaseStore:
+    """Coordinates workers through leases on dates in a shared SQLite file.
+
+    A worker claims a date before fetching it and completes the lease afterwards. A date can be
+    claimed again once its lease expired without completion, or once the completed fetch is older
+    than one round, so concurrent workers never fetch the same date twice in a round.
+    """
+
+    def __init__(self, path: str | None = None, lease_seconds: float | None = None, round_seconds: float | None = None):
+        self.path = path or config.SHARD_LEASE_DB
+        self.lease_seconds = config.SHARD_LEASE_SECONDS if lease_seconds is None else lease_seconds
+        self.round_seconds = config.SHARD_ROUND_SECONDS if round_seconds is None else round_seconds
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        # Autocommit mode, so each claim is its own short IMMEDIATE transaction
+        self.connection = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS leases ("
+            "key TEXT PRIMARY KEY, worker TEXT NOT NULL, expires_at REAL NOT NULL, completed_at REAL)"
+        )
+
+    def close(self):
+        self.connection.close()
+
+    def claim(self, key: str, worker: str, now: float | None = None) -> bool:
+        """Claims `key` for `worker`. Returns False if another worker holds it or fetched it this round."""
+        now = time.time() if now is None else now
+        cursor = self.connection.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            row = cursor.execute("SELECT expires_at, completed_at FROM leases WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                expires_at, completed_at = row
+                if completed_at is None and expires_at > now:
+                    cursor.execute("ROLLBACK")
+                    return False
+                if completed_at is not None and completed_at > now - self.round_seconds:
+                    cursor.execute("ROLLBACK")
+                    return False
+            cursor.execute(
+                "INSERT OR REPLACE INTO leases (key, worker, expires_at, completed_at) VALUES (?, ?, ?, NULL)",
+                (key, worker, now + self.lease_seconds),
+            )
+            cursor.execute("COMMIT")
+            return True
+        except sqlite3.Error:
+            cursor.execute("ROLLBACK")
+            raise
+
+    def complete(self, key: str, worker: str, now: float | None = None):
+        now = time.time() if now is None else now
+        self.connection.execute("UPDATE leases SET completed_at = ? WHERE key = ? AND worker = ?", (now, key, worker))
+
+    def release(self, key: str, worker: str):
+        """Gives up an uncompleted lease, e.g. after a failed fetch, so another worker may retry."""
+        self.connection.execute(
+            "DELETE FROM leases WHERE key = ? AND worker = ? AND completed_at IS NULL", (key, worker)
+        )
+
+
+def _partial_path(date_str: str) -> str:
+    return os.path.join(config.SHARD_DIR, f"{date_str}.json")
+
+
+def save_partial(date_str: str, free_slots_map: Dict[str, List[int]], worker: str, fetched_at: str | None = None):
+    """Saves the free courts of one date as fetched by a worker at `fetched_at`, by default now."""
+    data = {
+        "date": date_str,
+        "worker": worker,
+        "fetched_at": fetched_at or datetime.now().astimezone().isoformat(),
+        "free_slots_map": free_slots_map,
+    }
+    persist.write_json_atomic(_partial_path(date_str), data)
+
+
+def load_partial(date_str: str) -> Optional[Dict]:
+    path = _partial_path(date_str)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r") as f:
+            data: Dict = json.load(f)
+        return data
+    except (json.JSONDecodeError, IOError) as e:
+        logger.warning(f"Failed to load partial snapshot {path}: {e}")
+        return None
+
+
+def prune_partials(today: str | None = None):
+    """Removes the partial snapshots of past dates."""
+    today = today or datetime.now().date().isoformat()
+    if not os.path.exists(config.SHARD_DIR):
+        return
+    for filename in os.listdir(config.SHARD_DIR):
+        if filename.endswith(".json") and filename[: -len(".json")] < today:
+            os.remove(os.path.join(config.SHARD_DIR, filename))
+
+
+def work(
+    worker: str | None = None,
+    start_date: str | None = None,
+    days: int = 3,
+    deadline: float | None = None,
+    store: LeaseStore | None = None,
+) -> List[str]:
+    """Fetches every target date no other worker claimed this round. Returns the dates fetched.
+
+    Workers claim one date at a time, so a slow date only holds up the worker fetching it and the
+    work spreads evenly however many workers run.
+    """
+    worker = worker or default_worker_id()
+    started = time.monotonic()
+    deadline = config.RUN_DEADLINE_SECONDS if deadline is None else deadline
+    run.apply_catalog()
+    _, engine = run.scrape_targets(start_date, days)
+    target_intervals = run.prioritize_targets(engine.scrape_targets(), persist.load_checkpoint())
+
+    owns_store = store is None
+    store = store or LeaseStore()
+    fetched: List[str] = []
+    try:
+        for target_interval in target_intervals:
+            if deadline > 0 and time.monotonic() >= started + deadline:
+                logger.warning(f"Worker {worker} ran out of time after {len(fetched)} dates")
+                break
+            key = lease_key(target_interval.date)
+            if not store.claim(key, worker):
+                logger.debug(f"Worker {worker} skips {target_interval.date}, claimed by another worker")
+                continue
+            free_slots_map, fetched_at = scraper.fetch_free_slots(
+                target_interval.date, scraper.get_all_slots(target_interval.date)
+            )
+            if free_slots_map is None:
+                store.release(key, worker)
+                continue
+            save_partial(target_interval.date, free_slots_map, worker, fetched_at)
+            store.complete(key, worker)
+            fetched.append(target_interval.date)
+    finally:
+        if owns_store:
+            store.close()
+    logger.info(f"Worker {worker} fetched {len(fetched)} of {len(target_intervals)} dates")
+    return fetched
+
+
+def partial_day_availability(
+    date_str: str,
+    all_slots: List[str],
+    history: HistoryState,
+    merged_at: str | None = None,
+    now: datetime | None = None,
+) -> DayAvailability | None:
+    """Builds a date's availability from the partial snapshot of whichever worker fetched it.
+
+    A snapshot that is not newer than `merged_at`, the fetch time already in the history, was
+    merged before, and one older than SHARD_PARTIAL_MAX_AGE_SECONDS is outdated; both are skipped
+    so that a single fetch is not counted as several polls.
+    """
+    partial = load_partial(date_str)
+    if partial is None:
+        logger.warning(f"No partial snapshot for {date_str}, keeping its history")
+        return None
+    fetched_at = datetime.fromisoformat(partial["fetched_at"])
+    if merged_at and fetched_at <= datetime.fromisoformat(merged_at):
+        logger.info(f"Partial snapshot for {date_str} was merged already, keeping its history")
+        return None
+    age = ((now or datetime.now().astimezone()) - fetched_at).total_seconds()
+    if age > config.SHARD_PARTIAL_MAX_AGE_SECONDS:
+        logger.warning(f"Partial snapshot for {date_str} is {age:.0f}s old, keeping its history")
+        return None
+    return scraper.build_day_availability(
+        date_str, partial["free_slots_map"], all_slots, history, fetched_at=partial["fetched_at"]
+    )
+
+
+def merge(start_date: str | None = None, days: int = 3) -> ScrapeOutcome:
+    """Builds the history, report and notifications from the workers' partial snapshots."""
+    prune_partials()
+    merged_at = persist.load_fetch_times()
+    now = datetime.now().astimezone()
+
+    def get_day(date_str: str, all_slots: List[str], history: HistoryState) -> DayAvailability | None:
+        return partial_day_availability(date_str, all_slots, history, merged_at.get(date_str), now)
+
+    return run.run(start_date=start_date, days=days, deadline=0, get_day=get_day)
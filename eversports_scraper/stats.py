@@ -0,0 +1,162 @@
+import csv
+import logging
+import os
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+from eversports_scraper import archive, config, persist
+from eversports_scraper.errors import ConfigurationError
+
+if TYPE_CHECKING:
+    import numpy
+
+logger = logging.getLogger(__name__)
+
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+# Upper bounds in hours of the lead time buckets, i.e. how long before the slot it became free
+LEAD_TIME_BUCKETS = [1, 3, 6, 12, 24, 48, 72, 168, 336]
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ConfigurationError("The stats command needs NumPy. Install it with `pip install -e .[stats]`.") from None
+    return numpy
+
+
+def load_columns(archive_dir: str | None = None) -> Dict[str, "numpy.ndarray"]:
+    """Memory-maps the archive columns, cut to the cells every column has completely."""
+    np = _numpy()
+    archive_dir = archive_dir or config.ARCHIVE_DIR
+    meta = archive.load_meta(archive_dir)
+    # Mapped under the archive lock, so a compaction never swaps some columns but not others under us
+    with persist.locked(archive.lock_path(archive_dir)):
+        sizes = {
+            name: os.path.getsize(archive.column_path(name, archive_dir)) // np.dtype(dtype).itemsize
+            for name, dtype in meta.items()
+        }
+        # An append interrupted halfway leaves some columns longer than others
+        count = min(sizes.values())
+        if count == 0:
+            return {name: np.zeros(0, dtype=dtype) for name, dtype in meta.items()}
+        return {
+            name: np.memmap(archive.column_path(name, archive_dir), dtype=dtype, mode="r", shape=(count,))
+            for name, dtype in meta.items()
+        }
+
+
+def occupancy_heatmap(columns: Dict[str, "numpy.ndarray"]) -> Tuple[List[int], "numpy.ndarray"]:
+    """Returns the slot start minutes and the booked share of each weekday and slot, NaN where never polled."""
+    np = _numpy()
+    slots, slot_index = np.unique(columns["slot"], return_inverse=True)
+    # 1970-01-01 was a Thursday
+    weekday = (columns["date"].astype(np.int64) + 3) % 7
+    cell = weekday * len(slots) + slot_index
+    total = np.bincount(cell, minlength=7 * len(slots))
+    booked = np.bincount(cell, weights=1 - columns["free"], minlength=7 * len(slots))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        share = booked / total
+    return [int(s) for s in slots], share.reshape(7, len(slots))
+
+
+def transitions(columns: Dict[str, "numpy.ndarray"]) -> Dict[str, "numpy.ndarray"]:
+    """Pairs each observation of a court in a slot with its next poll.
+
+    Returns the previous and next free flags, the poll time of the next observation and the slot
+    it belongs to, as arrays over all consecutive pairs.
+    """
+    np = _numpy()
+    courts, court_index = np.unique(columns["court"], return_inverse=True)
+    key = (columns["date"].astype(np.int64) * 1440 + columns["slot"]) * len(courts) + court_index
+    order = np.lexsort((columns["poll_time"], key))
+    key = key[order]
+    same = key[1:] == key[:-1]
+    free = columns["free"][order]
+    after = order[1:][same]
+    return {
+        "free_before": free[:-1][same],
+        "free_after": free[1:][same],
+        "poll_time": columns["poll_time"][after].astype(np.int64),
+        "date": columns["date"][after].astype(np.int64),
+        "slot": columns["slot"][after].astype(np.int64),
+    }
+
+
+def cancellation_rates(pairs: Dict[str, "numpy.ndarray"]) -> "numpy.ndarray":
+    """Returns per weekday the share of booked observations that were free on the next poll."""
+    np = _numpy()
+    booked = pairs["free_before"] == 0
+    weekday = (pairs["date"] + 3) % 7
+    cancelled = np.bincount(weekday[booked], weights=pairs["free_after"][booked], minlength=7)
+    observed = np.bincount(weekday[booked], minlength=7)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rates: "numpy.ndarray" = cancelled / observed
+    return rates
+
+
+def lead_times(pairs: Dict[str, "numpy.ndarray"]) -> "numpy.ndarray":
+    """Returns the hours between a court being found free again and the start of its slot."""
+    cancelled = (pairs["free_before"] == 0) & (pairs["free_after"] == 1)
+    slot_start = pairs["date"][cancelled] * 1440 + pairs["slot"][cancelled]
+    hours: "numpy.ndarray" = (slot_start - pairs["poll_time"][cancelled]) / 60
+    return hours
+
+
+def lead_time_distribution(hours: "numpy.ndarray") -> List[Tuple[str, int]]:
+    np = _numpy()
+    edges = [0] + LEAD_TIME_BUCKETS + [np.inf]
+    counts, _ = np.histogram(hours, bins=edges)
+    labels = [f"<{upper}h" for upper in LEAD_TIME_BUCKETS] + [f">={LEAD_TIME_BUCKETS[-1]}h"]
+    return [(label, int(count)) for label, count in zip(labels, counts)]
+
+
+def _format_minutes(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def export_csv(directory: str, slots: List[int], heatmap, rates, distribution: List[Tuple[str, int]]):
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "occupancy_heatmap.csv"), "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["weekday"] + [_format_minutes(s) for s in slots])
+        for weekday, row in zip(WEEKDAYS, heatmap):
+            writer.writerow([weekday] + ["" if value != value else f"{value:.4f}" for value in row])
+    with open(os.path.join(directory, "cancellation_rates.csv"), "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["weekday", "cancellation_rate"])
+        for weekday, rate in zip(WEEKDAYS, rates):
+            writer.writerow([weekday, "" if rate != rate else f"{rate:.4f}"])
+    with open(os.path.join(directory, "lead_times.csv"), "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["lead_time", "count"])
+        writer.writerows(distribution)
+    logger.info(f"Exported stats to {directory}")
+
+
+def main(csv_dir: str | None = None, archive_dir: str | None = None):
+    """Prints occupancy, cancellation and lead time statistics of the archive, optionally as CSV."""
+    archive_dir = archive_dir or config.ARCHIVE_DIR
+    if not os.path.exists(os.path.join(archive_dir, "columns.json")):
+        print(f"No archive found in {archive_dir}.")
+        return
+    columns = load_columns(archive_dir)
+    slots, heatmap = occupancy_heatmap(columns)
+    pairs = transitions(columns)
+    rates = cancellation_rates(pairs)
+    distribution = lead_time_distribution(lead_times(pairs))
+
+    cancellations = int((pairs["free_before"] < pairs["free_after"]).sum())
+    print(f"{len(columns['free'])} cells archived, {cancellations} cancellations")
+    print("\nBooked share by weekday and slot:")
+    print("     " + " ".join(_format_minutes(s) for s in slots))
+    for weekday, row in zip(WEEKDAYS, heatmap):
+        print(f"{weekday}  " + " ".join("   - " if value != value else f"{value:5.0%}" for value in row))
+    print("\nCancellation rate by weekday:")
+    for weekday, rate in zip(WEEKDAYS, rates):
+        print(f"{weekday}  " + ("-" if rate != rate else f"{rate:.1%}"))
+    print("\nLead time of cancellations:")
+    for label, count in distribution:
+        print(f"{label:>6}  {count}")
+
+    if csv_dir:
+        export_csv(csv_dir, slots, heatmap, rates, distribution)
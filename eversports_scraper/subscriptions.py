@@ -0,0 +1,162 @@
+import json
+import logging
+import os
+from collections import defaultdict
+from typing import Callable, Dict, List, Tuple
+
+from pydantic import ValidationError
+
+from eversports_scraper import config, persist, scraper
+from eversports_scraper.models import NewSlotsData, Slot, Subscription, TargetInterval
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SUBSCRIBER = "default"
+# Outbox route of the backends shared by every subscriber (webhook, email, file), so each slot
+# reaches them once however many subscribers it matched
+ALL_SUBSCRIBERS = "*"
+
+
+def default_subscription() -> Subscription:
+    """The single subscriber described by the environment configuration."""
+    return Subscription(name=DEFAULT_SUBSCRIBER, sheet_url=config.TARGET_DATES_CSV_URL, chat_id=config.TELEGRAM_CHAT_ID)
+
+
+def registered_subscriptions() -> List[Subscription]:
+    """Loads the subscribers of the registry file, none if it is missing or unreadable."""
+    if not os.path.exists(config.SUBSCRIPTIONS_FILE):
+        return []
+    try:
+        with open(config.SUBSCRIPTIONS_FILE, "r") as f:
+            data = json.load(f)
+        subscriptions = [Subscription(**s) for s in data["subscriptions"]]
+    except (json.JSONDecodeError, KeyError, TypeError, ValidationError, IOError) as e:
+        logger.error(f"Failed to load subscriptions from {config.SUBSCRIPTIONS_FILE}: {e}")
+        return []
+
+    names = [s.name for s in subscriptions]
+    if len(set(names)) != len(names):
+        logger.warning("Duplicate subscriber names in registry; later entries override earlier ones.")
+    logger.info(f"Loaded {len(subscriptions)} subscriptions")
+    return subscriptions
+
+
+def with_default(registered: List[Subscription]) -> List[Subscription]:
+    """Adds the default subscriber to the registered ones, unless subscribers with sheets of their own replace it.
+
+    A registered entry of the default subscriber, e.g. with the dates its chat added through the
+    bot, takes the sheet and chat it leaves unset from the environment, so changes there still apply.
+    """
+    default = default_subscription()
+    merged, has_default = [], False
+    for subscription in registered:
+        if subscription.name == DEFAULT_SUBSCRIBER:
+            has_default = True
+            subscription = subscription.model_copy(
+                update={
+                    "sheet_url": subscription.sheet_url or default.sheet_url,
+                    "chat_id": subscription.chat_id or default.chat_id,
+                }
+            )
+        merged.append(subscription)
+    if not has_default and not any(s.sheet_url for s in registered):
+        merged.insert(0, default)
+    return merged
+
+
+def load_subscriptions() -> List[Subscription]:
+    """Loads the subscriber registry, falling back to the default subscriber."""
+    return with_default(registered_subscriptions())
+
+
+def save_subscriptions(subscriptions: List[Subscription]):
+    """Persists the subscriber registry."""
+    try:
+        persist.write_json_atomic(config.SUBSCRIPTIONS_FILE, {"subscriptions": [s.model_dump() for s in subscriptions]})
+    except IOError as e:
+        logger.error(f"Failed to save subscriptions: {e}")
+
+
+class MatchingEngine:
+    """Matches scraped slots against every subscriber's targets through a date index.
+
+    Each date is scraped once no matter how many subscribers watch it, and new slots are fanned
+    out only to the subscribers indexed under that date.
+    """
+
+    def __init__(
+        self,
+        subscriptions: List[Subscription],
+        targets: Dict[str, List[TargetInterval]],
+        overlaps: Callable[[str, TargetInterval], bool],
+    ):
+        self.overlaps = overlaps
+        self.subscriptions = {s.name: s for s in subscriptions}
+        self.by_date: Dict[str, List[Tuple[Subscription, TargetInterval]]] = defaultdict(list)
+        for name, intervals in targets.items():
+            for interval in intervals:
+                self.by_date[interval.date].append((self.subscriptions[name], interval))
+
+    def scrape_targets(self) -> List[TargetInterval]:
+        """Returns one target per unique date, covering every subscriber's window on that date."""
+        targets = []
+        for date_str in sorted(self.by_date):
+            intervals = [interval for _, interval in self.by_date[date_str]]
+            if any(i.start_time is None or i.end_time is None for i in intervals):
+                targets.append(TargetInterval(date=date_str))
+                continue
+            start = min((i.start_time for i in intervals if i.start_time), key=scraper._minutes)
+            end = max((i.end_time for i in intervals if i.end_time), key=scraper._minutes)
+            targets.append(TargetInterval(date=date_str, start_time=start, end_time=end))
+        return targets
+
+    def match(self, new_slots_data: NewSlotsData) -> Dict[str, NewSlotsData]:
+        """Fans new slots out to the subscribers whose targets and court preferences match."""
+        matched: Dict[str, NewSlotsData] = defaultdict(list)
+        for date_str, slots in new_slots_data:
+            per_subscriber: Dict[str, Dict[str, Slot]] = defaultdict(dict)
+            for subscription, interval in self.by_date.get(date_str, []):
+                wanted = set(subscription.courts) if subscription.courts else None
+                for slot in slots:
+                    if not self.overlaps(slot.time, interval):
+                        continue
+                    court_ids = sorted(cid for cid in slot.court_ids if wanted is None or cid in wanted)
+                    if not court_ids:
+                        continue
+                    names = dict(zip(sorted(slot.court_ids), slot.courts))
+                    per_subscriber[subscription.name][slot.time] = Slot(
+                        time=slot.time,
+                        courts=[names[cid] for cid in court_ids],
+                        court_ids=court_ids,
+                        is_new=slot.is_new,
+                    )
+            for name, by_time in per_subscriber.items():
+                matched[name].append((date_str, [by_time[t] for t in sorted(by_time)]))
+        return dict(matched)
+
+
+def merge_matches(matched: Dict[str, NewSlotsData]) -> NewSlotsData:
+    """Combines the slots matched for each subscriber into one list, with the union of their courts."""
+    by_date: Dict[str, Dict[str, Dict[int, str]]] = defaultdict(lambda: defaultdict(dict))
+    new_times: Dict[Tuple[str, str], bool] = {}
+    for new_slots_data in matched.values():
+        for date_str, slots in new_slots_data:
+            for slot in slots:
+                by_date[date_str][slot.time].update(zip(slot.court_ids, slot.courts))
+                new_times[(date_str, slot.time)] = new_times.get((date_str, slot.time), False) or slot.is_new
+    merged: NewSlotsData = []
+    for date_str in sorted(by_date):
+        slots = []
+        for slot_time in sorted(by_date[date_str]):
+            courts = by_date[date_str][slot_time]
+            court_ids = sorted(courts)
+            slots.append(
+                Slot(
+                    time=slot_time,
+                    courts=[courts[cid] for cid in court_ids],
+                    court_ids=court_ids,
+                    is_new=new_times[(date_str, slot_time)],
+                )
+            )
+        merged.append((date_str, slots))
+    return merged
@@ -1,4 +1,10 @@
 import logging
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional, Tuple
 
 import requests
 
@@ -6,22 +12,291 @@ from eversports_scraper import config
 
 logger = logging.getLogger(__name__)
 
+# Telegram rejects messages longer than this (counted after entity parsing, so we stay conservative)
+MAX_MESSAGE_LENGTH = 4096
 
-def send_telegram_message(message: str):
-    """Sends a message to the configured Telegram chat."""
+# Lines like "*2025-11-26*:" start a new date block in our notification messages
+DATE_HEADER_PATTERN = re.compile(r"^\*\d{4}-\d{2}-\d{2}\*:")
+
+
+def split_message(message: str, limit: int = MAX_MESSAGE_LENGTH) -> List[str]:
+    """Splits a message into chunks of at most `limit` characters.
+
+    Chunks are cut at date boundaries where possible, then at line boundaries. Only a single
+    line longer than `limit` is cut mid-line.
+    """
+    if len(message) <= limit:
+        return [message]
+
+    # Group lines into blocks, each starting at a date header
+    blocks: List[str] = []
+    current: List[str] = []
+    for line in message.split("\n"):
+        if DATE_HEADER_PATTERN.match(line) and current:
+            blocks.append("\n".join(current))
+            current = []
+        current.append(line)
+    blocks.append("\n".join(current))
+
+    # Blocks that are too large on their own are broken down into lines
+    pieces: List[str] = []
+    for block in blocks:
+        if len(block) <= limit:
+            pieces.append(block)
+            continue
+        for line in block.split("\n"):
+            pieces.extend(line[i : i + limit] for i in range(0, max(len(line), 1), limit))
+
+    chunks: List[str] = []
+    buffer = ""
+    for piece in pieces:
+        candidate = f"{buffer}\n{piece}" if buffer else piece
+        if len(candidate) <= limit:
+            buffer = candidate
+        else:
+            chunks.append(buffer)
+            buffer = piece
+    if buffer:
+        chunks.append(buffer)
+
+    return [c.strip("\n") for c in chunks if c.strip()]
+
+
+@dataclass
+class QueuedMessage:
+    chat_id: str
+    text: str
+    queued_at: float
+    sent: bool | None = None  # Set once a flush delivered the message or gave up on it
+
+
+class TelegramNotifier:
+    """Queues messages and delivers them over a pooled HTTP session.
+
+    Messages for the same chat that are queued within `merge_window` seconds of the first are
+    merged, and packed into as few messages as Telegram's length limit allows. Sending honours
+    `retry_after` on HTTP 429 up to the caller's deadline and keeps at least `min_interval`
+    seconds between messages to the same chat.
+
+    A notifier is safe to share between threads: one flush sends at a time, so concurrent callers
+    never post the same queued message twice or step over each other's rate limit.
+    """
+
+    def __init__(
+        self,
+        token: str,
+        api_base: Optional[str] = None,
+        merge_window: Optional[float] = None,
+        min_interval: Optional[float] = None,
+        max_retries: int = 3,
+        timeout: Optional[float] = None,
+    ):
+        self.token = token
+        self.api_base = (api_base or config.TELEGRAM_API_BASE).rstrip("/")
+        self.merge_window = config.TELEGRAM_MERGE_WINDOW_SECONDS if merge_window is None else merge_window
+        self.min_interval = config.TELEGRAM_MIN_INTERVAL_SECONDS if min_interval is None else min_interval
+        self.max_retries = max_retries
+        self.timeout = config.TELEGRAM_TIMEOUT_SECONDS if timeout is None else timeout
+        self.session = requests.Session()
+        self.queue: Deque[QueuedMessage] = deque()
+        self._last_sent: Dict[str, float] = {}
+        # Leading chunks already sent of an oversized message, so a retry doesn't post them again
+        self._sent_chunks: Dict[Tuple[str, str], int] = {}
+        self._queue_lock = threading.Lock()
+        self._send_lock = threading.Lock()
+
+    def enqueue(self, chat_id: str, message: str) -> QueuedMessage:
+        """Adds a message to the send queue and returns it, to look up whether it was sent after a flush."""
+        with self._queue_lock:
+            queued = QueuedMessage(str(chat_id), message, time.monotonic())
+            self.queue.append(queued)
+        return queued
+
+    def _next_batch(self, force: bool = True) -> Optional[List[QueuedMessage]]:
+        """Pops the next message whose merge window has passed, with the queued messages for the same chat
+        within its window. With `force`, the next message is popped even if its window is still open.
+        """
+        with self._queue_lock:
+            if not self.queue:
+                return None
+            first = self.queue[0]
+            if not force and time.monotonic() - first.queued_at < self.merge_window:
+                return None
+            batch: List[QueuedMessage] = []
+            remaining: Deque[QueuedMessage] = deque()
+            for item in self.queue:
+                if item.chat_id == first.chat_id and item.queued_at - first.queued_at <= self.merge_window:
+                    batch.append(item)
+                else:
+                    remaining.append(item)
+            self.queue = remaining
+            return batch
+
+    def _chunks(self, batch: List[QueuedMessage]) -> List[Tuple[str, List[QueuedMessage]]]:
+        """Packs whole messages into chunks up to the length limit, so a failed chunk only fails its messages.
+
+        Only a message longer than the limit is split, and its chunks sent before a failure are skipped.
+        """
+        chunks: List[Tuple[str, List[QueuedMessage]]] = []
+        text = ""
+        members: List[QueuedMessage] = []
+        for item in batch:
+            if len(item.text) > MAX_MESSAGE_LENGTH:
+                already_sent = self._sent_chunks.get((item.chat_id, item.text), 0)
+                chunks.extend((part, [item]) for part in split_message(item.text)[already_sent:])
+                continue
+            candidate = f"{text}\n\n{item.text}" if text else item.text
+            if text and len(candidate) > MAX_MESSAGE_LENGTH:
+                chunks.append((text, members))
+                candidate, members = item.text, []
+            text, members = candidate, members + [item]
+        if text:
+            chunks.append((text, members))
+        return chunks
+
+    def _wait_for_rate_limit(self, chat_id: str):
+        last = self._last_sent.get(chat_id)
+        if last is not None:
+            wait = self.min_interval - (time.monotonic() - last)
+            if wait > 0:
+                time.sleep(wait)
+
+    def _sleep_until_retry(self, seconds: float, deadline: float | None) -> bool:
+        """Sleeps before a retry, unless the retry would start after `deadline`."""
+        if deadline is not None and time.monotonic() + seconds > deadline:
+            logger.error(f"Not retrying the Telegram message in {seconds}s, past the notification deadline")
+            return False
+        time.sleep(seconds)
+        return True
+
+    def _send(self, chat_id: str, text: str, deadline: float | None = None) -> bool:
+        """Sends a single message, retrying on rate limits and transient errors until `deadline`."""
+        url = f"{self.api_base}/bot{self.token}/sendMessage"
+        payload = {"chat_id": chat_id, "text": text, "parse_mode": "Markdown"}
+
+        for attempt in range(self.max_retries + 1):
+            self._wait_for_rate_limit(chat_id)
+            try:
+                response = self.session.post(url, json=payload, timeout=self.timeout)
+                self._last_sent[chat_id] = time.monotonic()
+
+                if response.status_code == 429:
+                    retry_after = _retry_after(response)
+                    logger.warning(f"Telegram rate limit hit, retrying after {retry_after}s")
+                    if not self._sleep_until_retry(retry_after, deadline):
+                        return False
+                    continue
+
+                response.raise_for_status()
+                return True
+            except requests.exceptions.RequestException as e:
+                status = getattr(e.response, "status_code", None)
+                if status is not None and 400 <= status < 500:
+                    # Client errors (bad token, bad chat id, ...) won't succeed on retry
+                    logger.error(f"Failed to send Telegram message: {e}")
+                    return False
+                if attempt == self.max_retries:
+                    logger.error(f"Failed to send Telegram message after {attempt + 1} attempts: {e}")
+                    return False
+                backoff = 2**attempt
+                logger.warning(f"Telegram send failed ({e}), retrying in {backoff}s")
+                if not self._sleep_until_retry(backoff, deadline):
+                    return False
+
+        logger.error("Failed to send Telegram message: rate limit retries exhausted")
+        return False
+
+    def _send_batch(self, batch: List[QueuedMessage], deadline: float | None) -> None:
+        chat_id = batch[0].chat_id
+        chunks = self._chunks(batch)
+        failed = False
+        for i, (text, members) in enumerate(chunks):
+            # After a failure the chat is likely unreachable, so the remaining chunks wait for a retry
+            if failed or not self._send(chat_id, text, deadline):
+                failed = True
+                for item in members:
+                    item.sent = False
+                continue
+            logger.info(f"Telegram notification sent successfully ({i + 1}/{len(chunks)}).")
+            if len(members[0].text) > MAX_MESSAGE_LENGTH:
+                key = (chat_id, members[0].text)
+                self._sent_chunks[key] = self._sent_chunks.get(key, 0) + 1
+        for item in batch:
+            if item.sent is None:
+                item.sent = True
+                self._sent_chunks.pop((item.chat_id, item.text), None)
+
+    def flush(self, force: bool = True, deadline: float | None = None) -> bool:
+        """Delivers queued messages; without `force`, only those whose merge window has passed.
+
+        Returns True if every delivered message was sent in full.
+        """
+        all_sent = True
+        # Held from popping a batch until it is sent, so a message is never seen unsent by one caller
+        # while another is sending it
+        with self._send_lock:
+            while True:
+                batch = self._next_batch(force)
+                if batch is None:
+                    return all_sent
+                self._send_batch(batch, deadline)
+                all_sent = all_sent and all(item.sent for item in batch)
+
+    def deliver(self, chat_id: str, message: str, deadline: float | None = None) -> bool:
+        """Queues a message, waits out its merge window and sends it. Returns True if it was sent in full."""
+        queued = self.enqueue(chat_id, message)
+        window_left = queued.queued_at + self.merge_window - time.monotonic()
+        if deadline is not None:
+            window_left = min(window_left, deadline - time.monotonic())
+        if window_left > 0:
+            time.sleep(window_left)
+        self.flush(force=False, deadline=deadline)
+        if queued.sent is None:
+            # The deadline cut the merge window short
+            self.flush(deadline=deadline)
+        return bool(queued.sent)
+
+    def close(self):
+        self.session.close()
+
+
+def _retry_after(response) -> float:
+    """Extracts the wait time from a 429 response, falling back to one second."""
+    try:
+        return float(response.json()["parameters"]["retry_after"])
+    except (ValueError, KeyError, TypeError):
+        pass
+    try:
+        return float(response.headers.get("Retry-After", 1))
+    except (ValueError, TypeError):
+        return 1.0
+
+
+# Notifiers are kept per token so the HTTP session is reused across messages
+_notifiers: Dict[str, TelegramNotifier] = {}
+_notifiers_lock = threading.Lock()
+
+
+def get_notifier(token: str) -> TelegramNotifier:
+    """Returns the shared notifier for a bot token."""
+    with _notifiers_lock:
+        if token not in _notifiers:
+            _notifiers[token] = TelegramNotifier(token)
+        return _notifiers[token]
+
+
+def send_telegram_message(message: str, chat_id: Optional[str] = None, deadline: float | None = None) -> bool:
+    """Sends a message to the configured Telegram chat. Returns True on success.
+
+    `deadline` is the `time.monotonic()` value by which to give up, by default NOTIFY_DEADLINE_SECONDS from now.
+    """
     token = config.TELEGRAM_BOT_TOKEN
-    chat_id = config.TELEGRAM_CHAT_ID
+    chat_id = chat_id or config.TELEGRAM_CHAT_ID
 
     if not token or not chat_id:
         logger.warning("Telegram configuration missing. Skipping notification.")
-        return
+        return False
 
-    url = f"https://api.telegram.org/bot{token}/sendMessage"
-    payload = {"chat_id": chat_id, "text": message, "parse_mode": "Markdown"}
-
-    try:
-        response = requests.post(url, json=payload, timeout=10)
-        response.raise_for_status()
-        logger.info("Telegram notification sent successfully.")
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Failed to send Telegram message: {e}")
+    if deadline is None:
+        deadline = time.monotonic() + config.NOTIFY_DEADLINE_SECONDS
+    return get_notifier(token).deliver(chat_id, message, deadline)
@@ -0,0 +1,52 @@
+from datetime import datetime
+from unittest.mock import patch
+
+from eversports_scraper import aggregates
+from eversports_scraper.models import DayAvailability, Slot
+
+
+def _day(date, free_slots_map):
+    slots = [
+        Slot(time=t, courts=[f"Court {cid - 77393}" for cid in ids], court_ids=ids, is_new=False)
+        for t, ids in sorted(free_slots_map.items())
+    ]
+    return DayAvailability(date=date, slots=slots, new_count=0, free_slots_map=free_slots_map)
+
+
+def test_free_counts_by_hour():
+    day = _day("2025-01-06", {"10:15": [77394, 77395], "10:45": [77396], "18:00": [77394]})
+
+    counts = aggregates.free_counts_by_hour([day])
+
+    assert counts == {"2025-01-06": {"10": 3, "18": 1}}
+
+
+@patch("eversports_scraper.aggregates.config.OPENING_HOURS", {2: ("17:00", "18:30")})
+@patch("eversports_scraper.aggregates.config.DEFAULT_OPENING_HOURS", ("10:15", "11:45"))
+def test_occupancy_heatmap():
+    # 2025-01-06 is a Monday; three courts, one free at 10:15, none at 11:00
+    monday = _day("2025-01-06", {"10:15": [77394]})
+    # Wednesdays open in the evening instead, with all courts free at 17:00
+    wednesday = _day("2025-01-08", {"17:00": [77394, 77395, 77396]})
+
+    heatmap = aggregates.occupancy_heatmap([monday, wednesday])
+
+    assert heatmap["hours"] == ["10", "11", "17"]
+    assert heatmap["values"][0] == [round(2 / 3, 2), 1.0, None]
+    # No data for Tuesday
+    assert heatmap["values"][1] == [None, None, None]
+    assert heatmap["values"][2] == [None, None, round(3 / 6, 2)]
+
+
+def test_next_free_per_court():
+    days = [
+        _day("2025-01-07", {"10:15": [77394, 77395]}),
+        _day("2025-01-06", {"09:00": [77396], "18:00": [77394]}),
+    ]
+
+    result = aggregates.next_free_per_court(days, datetime(2025, 1, 6, 12, 0))
+
+    assert result["Court 1"] == {"date": "2025-01-06", "time": "18:00"}
+    assert result["Court 2"] == {"date": "2025-01-07", "time": "10:15"}
+    # The only free slot for Court 3 is in the past
+    assert result["Court 3"] is None
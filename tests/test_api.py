@@ -0,0 +1,89 @@
+import json
+import time
+from unittest.mock import patch
+
+import pytest
+
+from eversports_scraper import config, metrics, response_cache, scraper, telegram_notifier
+from eversports_scraper.api import Scraper
+from eversports_scraper.errors import ConfigurationError, FetchError
+from eversports_scraper.models import TargetInterval
+
+SETTINGS = dict(CATALOG_DISCOVERY=False, ASYNC_FETCH=False, TARGET_DATES_CSV_URL="http://mock.url")
+
+
+def make_scraper(tmp_path, name, **settings):
+    return Scraper(state_dir=str(tmp_path / name / "state"), data_dir=str(tmp_path / name / "data"), **settings)
+
+
+@patch("eversports_scraper.notifiers.telegram_notifier.send_telegram_message")
+@patch("eversports_scraper.run.scraper.fetch_free_slots")
+@patch("eversports_scraper.run.scraper.get_all_slots", return_value=["10:15"])
+@patch("eversports_scraper.run.fetch_target_dates")
+def test_instances_keep_separate_state_and_settings(mock_fetch_dates, mock_slots, mock_fetch, mock_send, tmp_path):
+    mock_fetch_dates.return_value = [TargetInterval(date="2125-01-01")]
+    # Reports the courts configured during the call
+    mock_fetch.side_effect = lambda date_str, all_slots: ({"10:15": list(config.COURT_IDS)}, None)
+    defaults = {name: getattr(config, name) for name in ("HISTORY_FILE", "OUTBOX_FILE", "COURT_IDS", "ASYNC_FETCH")}
+    cache = response_cache._cache
+
+    first = make_scraper(tmp_path, "first", COURT_IDS=[77394, 77395], **SETTINGS)
+    second = make_scraper(tmp_path, "second", COURT_IDS=[77394], **SETTINGS)
+    outcome = first.scrape()
+    second.scrape()
+
+    assert outcome.day_availabilities[0].slots[0].court_ids == [77394, 77395]
+    with open(tmp_path / "first" / "data" / "availability.json") as f:
+        assert json.load(f)["availability"] == {"2125-01-01": {"10:15": [77394, 77395]}}
+    assert second.history() == {"2125-01-01": {"10:15": [77394]}}
+    assert (tmp_path / "second" / "state" / "outbox.json").exists()
+    assert {name: getattr(config, name) for name in defaults} == defaults
+    assert response_cache._cache is cache
+
+
+def test_instances_keep_their_own_notifiers_and_court_names(tmp_path):
+    first = make_scraper(tmp_path, "first", TELEGRAM_BOT_TOKEN="token", COURT_MAPPING={77394: "Court A"})
+    second = make_scraper(tmp_path, "second", TELEGRAM_BOT_TOKEN="token", COURT_MAPPING={77394: "Court B"})
+    shared_notifiers = telegram_notifier._notifiers
+
+    with first._configured():
+        first_notifier = telegram_notifier.get_notifier("token")
+        assert scraper.court_names((77394,)) == ["Court A"]
+    with second._configured():
+        assert telegram_notifier.get_notifier("token") is not first_notifier
+        assert scraper.court_names((77394,)) == ["Court B"]
+    with first._configured():
+        assert telegram_notifier.get_notifier("token") is first_notifier
+
+    assert telegram_notifier._notifiers is shared_notifiers and "token" not in shared_notifiers
+
+
+def test_calls_wait_for_revalidations_and_keep_metrics_apart(tmp_path):
+    first = make_scraper(tmp_path, "first")
+    second = make_scraper(tmp_path, "second")
+    seen_state_dirs = []
+
+    def slow_fetch():
+        time.sleep(0.2)
+        seen_state_dirs.append(config.STATE_DIR)
+        return None
+
+    with first._configured():
+        response_cache.get_cache()._revalidate("k", slow_fetch)
+        metrics.increment("response_cache.stale")
+    with second._configured():
+        assert metrics.snapshot() == {}
+
+    # The refresh ran with the settings of the instance that started it
+    assert seen_state_dirs == [str(tmp_path / "first" / "state")]
+
+
+@patch("eversports_scraper.api.scraper.get_day_availability", return_value=None)
+def test_fetch_day_raises_when_the_fetch_fails(mock_get_day, tmp_path):
+    with pytest.raises(FetchError):
+        make_scraper(tmp_path, "first", CATALOG_DISCOVERY=False).fetch_day("2125-01-01")
+
+
+def test_unknown_settings_are_rejected():
+    with pytest.raises(ConfigurationError, match="COURTS"):
+        Scraper(COURTS=[77394])
@@ -0,0 +1,97 @@
+import os
+from datetime import date, datetime
+from unittest.mock import patch
+
+from eversports_scraper import archive
+from eversports_scraper.models import DayAvailability
+
+
+@patch("eversports_scraper.archive.scraper.get_all_slots", return_value=["10:15", "11:00"])
+@patch("eversports_scraper.archive.config.COURT_IDS", [77394, 77395])
+def test_encode_cells_covers_every_court_and_slot(mock_slots):
+    day = DayAvailability(
+        date="1970-01-02", slots=[], new_count=0, free_slots_map={"11:00": [77395]}, fetched_at="1970-01-01T12:00:00"
+    )
+
+    columns = archive.encode_cells([day], datetime(1970, 1, 1, 13, 0))
+
+    assert list(columns["poll_time"]) == [12 * 60] * 4
+    assert list(columns["date"]) == [1] * 4
+    assert list(columns["slot"]) == [615, 615, 660, 660]
+    assert list(columns["court"]) == [77394, 77395, 77394, 77395]
+    assert list(columns["free"]) == [0, 0, 0, 1]
+
+
+@patch("eversports_scraper.archive.scraper.get_all_slots", return_value=["10:15", "11:00"])
+@patch("eversports_scraper.archive.config.COURT_IDS", [77394, 77395])
+def test_append_grows_each_column(mock_slots, tmp_path):
+    day = DayAvailability(date="2125-01-01", slots=[], new_count=0, free_slots_map={"10:15": [77394]})
+
+    with patch("eversports_scraper.persist.config.STATE_DIR", str(tmp_path)):
+        archive.append([day], archive_dir=str(tmp_path / "archive"))
+        archive.append([day], archive_dir=str(tmp_path / "archive"))
+
+    meta = archive.load_meta(str(tmp_path / "archive"))
+    assert os.path.getsize(archive.column_path("court", str(tmp_path / "archive"))) == 8 * 4
+    assert os.path.getsize(archive.column_path("free", str(tmp_path / "archive"))) == 8
+    assert meta["slot"] == "<u2"
+
+
+@patch("eversports_scraper.archive.scraper.get_all_slots", return_value=["10:15"])
+@patch("eversports_scraper.archive.config.COURT_IDS", [77394])
+def test_append_drops_polls_past_the_retention_window(mock_slots, tmp_path):
+    archive_dir = str(tmp_path / "archive")
+    day = DayAvailability(date="2125-01-01", slots=[], new_count=0, free_slots_map={"10:15": [77394]})
+
+    with patch("eversports_scraper.persist.config.STATE_DIR", str(tmp_path)), patch(
+        "eversports_scraper.archive.config.ARCHIVE_RETENTION_DAYS", 30
+    ):
+        archive.append([day], polled_at=datetime(2124, 11, 25, 12, 0), archive_dir=archive_dir)
+        archive.append([day], polled_at=datetime(2124, 12, 20, 12, 0), archive_dir=archive_dir)
+        assert os.path.getsize(archive.column_path("free", archive_dir)) == 2
+        archive.append([day], polled_at=datetime(2125, 1, 1, 12, 0), archive_dir=archive_dir)
+
+    # The November poll is past the window; the December one is kept
+    assert os.path.getsize(archive.column_path("free", archive_dir)) == 2
+    assert os.path.getsize(archive.column_path("poll_time", archive_dir)) == 2 * 4
+    assert not [name for name in os.listdir(archive_dir) if name.endswith(".tmp")]
+
+
+@patch("eversports_scraper.archive.scraper.get_all_slots", return_value=["10:15"])
+@patch("eversports_scraper.archive.config.COURT_IDS", [77394])
+def test_append_realigns_columns_after_an_interrupted_append(mock_slots, tmp_path):
+    archive_dir = str(tmp_path / "archive")
+    day = DayAvailability(date="2125-01-01", slots=[], new_count=0, free_slots_map={"10:15": [77394]})
+
+    with patch("eversports_scraper.persist.config.STATE_DIR", str(tmp_path)):
+        archive.append([day], archive_dir=archive_dir)
+        # An append that stopped after writing the first column and half of the second
+        with open(archive.column_path("poll_time", archive_dir), "ab") as f:
+            f.write(b"\x01\x00\x00\x00")
+        with open(archive.column_path("date", archive_dir), "ab") as f:
+            f.write(b"\x01\x00")
+        archive.append([day], archive_dir=archive_dir)
+
+    assert os.path.getsize(archive.column_path("poll_time", archive_dir)) == 2 * 4
+    assert os.path.getsize(archive.column_path("date", archive_dir)) == 2 * 4
+    assert os.path.getsize(archive.column_path("free", archive_dir)) == 2
+    assert list(archive._read_column("date", archive_dir)) == [(date(2125, 1, 1) - archive.EPOCH).days] * 2
+
+
+@patch("eversports_scraper.archive.scraper.get_all_slots", return_value=["10:15"])
+@patch("eversports_scraper.archive.config.COURT_IDS", [77394])
+def test_append_skips_responses_archived_before(mock_slots, tmp_path):
+    archive_dir = str(tmp_path / "archive")
+
+    def day(fetched_at):
+        return DayAvailability(date="2125-01-01", slots=[], new_count=0, free_slots_map={}, fetched_at=fetched_at)
+
+    with patch("eversports_scraper.persist.config.STATE_DIR", str(tmp_path)):
+        polled_at = datetime(2125, 1, 1, 10, 5)
+        archive.append([day("2125-01-01T10:00:00")], polled_at=polled_at, archive_dir=archive_dir)
+        # Served from the response cache, so the same poll again
+        archive.append([day("2125-01-01T10:00:00")], polled_at=polled_at, archive_dir=archive_dir)
+        assert os.path.getsize(archive.column_path("free", archive_dir)) == 1
+        archive.append([day("2125-01-01T10:05:00")], polled_at=polled_at, archive_dir=archive_dir)
+
+    assert os.path.getsize(archive.column_path("free", archive_dir)) == 2
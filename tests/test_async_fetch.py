@@ -0,0 +1,172 @@
+import asyncio
+import json
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from eversports_scraper import async_fetch, config, persist, response_cache, scraper
+
+httpx = pytest.importorskip("httpx")
+
+CHALLENGE_PAGE = b"<html><title>Just a moment...</title><script src='/cdn-cgi/challenge-platform/x.js'></script>"
+
+
+@pytest.fixture(autouse=True)
+def isolated_state(tmp_path):
+    with patch.multiple(
+        "eversports_scraper.config",
+        RESPONSE_CACHE_DIR=str(tmp_path / "responses"),
+        COOKIE_FILE=str(tmp_path / "cookies.json"),
+        METRICS_FILE=str(tmp_path / "metrics.json"),
+        HTTP2=False,
+    ), patch("eversports_scraper.response_cache._cache", None):
+        yield
+
+
+def bookings_body(date_str: str) -> bytes:
+    return json.dumps({"slots": [{"date": date_str, "start": "1015", "court": 77394}]}).encode()
+
+
+def test_is_challenge():
+    assert async_fetch.is_challenge(403, {}, CHALLENGE_PAGE)
+    assert async_fetch.is_challenge(200, {"cf-mitigated": "challenge"}, b"")
+    assert not async_fetch.is_challenge(403, {}, b'{"error": "forbidden"}')
+    assert not async_fetch.is_challenge(200, {}, CHALLENGE_PAGE)
+
+
+def test_fetch_all_sends_headers_and_cookies_and_caches_responses():
+    persist.save_cookies({"cf_clearance": "solved"})
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        date_str = request.url.params["startDate"]
+        return httpx.Response(200, content=bookings_body(date_str), headers={"set-cookie": "__cf_bm=fresh; Path=/"})
+
+    dates = ["2125-01-01", "2125-01-02", "2125-01-03"]
+    results = async_fetch.fetch_all(dates, transport=httpx.MockTransport(handler))
+
+    assert results["2125-01-02"]["slots"] == [{"date": "2125-01-02", "court": 77394, "start": "1015", "end": "1100"}]
+    assert all(r.headers["user-agent"] == config.COMMON_HEADERS["User-Agent"] for r in requests)
+    assert all("cf_clearance=solved" in r.headers["cookie"] for r in requests)
+    assert persist.load_cookies() == {"cf_clearance": "solved", "__cf_bm": "fresh"}
+
+    # Fresh responses are served from the cache without a request
+    assert async_fetch.fetch_all(dates, transport=httpx.MockTransport(handler)) == results
+    assert len(requests) == 3
+
+
+@patch("eversports_scraper.async_fetch.scraper.request_booked_slots")
+def test_fetch_all_falls_back_to_cloudscraper_only_for_challenged_dates(mock_request):
+    def handler(request):
+        date_str = request.url.params["startDate"]
+        if date_str == "2125-01-02":
+            return httpx.Response(403, content=CHALLENGE_PAGE)
+        if date_str == "2125-01-03":
+            return httpx.Response(500, content=b"")
+        return httpx.Response(200, content=bookings_body(date_str))
+
+    mock_request.return_value = {"slots": []}
+
+    results = async_fetch.fetch_all(["2125-01-01", "2125-01-02", "2125-01-03"], transport=httpx.MockTransport(handler))
+
+    mock_request.assert_called_once_with("2125-01-02")
+    assert results["2125-01-02"] == {"slots": []}
+    assert results["2125-01-03"] is None
+    assert len(results["2125-01-01"]["slots"]) == 1
+
+
+def test_fetch_all_runs_requests_concurrently_and_leaves_out_dates_past_the_deadline():
+    in_flight, peak = 0, 0
+
+    async def handler(request):
+        nonlocal in_flight, peak
+        date_str = request.url.params["startDate"]
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(5 if date_str == "2125-01-09" else 0.05)
+        in_flight -= 1
+        return httpx.Response(200, content=bookings_body(date_str))
+
+    dates = [f"2125-01-{day:02d}" for day in range(1, 10)]
+    started = time.monotonic()
+    results = async_fetch.fetch_all(dates, deadline=started + 0.5, transport=httpx.MockTransport(handler))
+
+    assert time.monotonic() - started < 2
+    assert sorted(results) == dates[:-1]
+    assert peak == len(dates)
+
+
+def test_fetch_all_parses_the_body_while_it_streams_in():
+    body = bookings_body("2125-01-01")
+    parsed_start = threading.Event()
+    read_bookings = scraper.read_bookings
+
+    def tracking_read_bookings(chunks, date_str):
+        def tracked():
+            for chunk in chunks:
+                yield chunk
+                # The parser asks for more, so it has consumed this chunk
+                parsed_start.set()
+
+        return read_bookings(tracked(), date_str)
+
+    parsed_before_rest = []
+
+    async def stream():
+        yield body[:16]
+        for _ in range(200):
+            if parsed_start.is_set():
+                break
+            await asyncio.sleep(0.01)
+        parsed_before_rest.append(parsed_start.is_set())
+        yield body[16:]
+
+    def handler(request):
+        return httpx.Response(200, content=stream())
+
+    with patch("eversports_scraper.async_fetch.scraper.STREAM_CHUNK_SIZE", 16), patch(
+        "eversports_scraper.async_fetch.scraper.read_bookings", tracking_read_bookings
+    ):
+        results = async_fetch.fetch_all(["2125-01-01"], transport=httpx.MockTransport(handler))
+
+    assert parsed_before_rest == [True]
+    assert len(results["2125-01-01"]["slots"]) == 1
+
+
+@patch("eversports_scraper.async_fetch.scraper.request_booked_slots")
+def test_fetch_all_serves_stale_responses_while_refreshing_them(mock_request):
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        # Booked at first, free once refreshed
+        slots = json.loads(bookings_body(request.url.params["startDate"]))["slots"] if len(requests) == 1 else []
+        return httpx.Response(200, content=json.dumps({"slots": slots}).encode())
+
+    first = async_fetch.fetch_all(["2125-01-01"], transport=httpx.MockTransport(handler))
+    cache = response_cache.get_cache()
+    stale = time.time() + cache.ttl_for("2125-01-01") + cache.stale_seconds / 2
+
+    with patch("eversports_scraper.response_cache.time.time", return_value=stale):
+        assert async_fetch.fetch_all(["2125-01-01"], transport=httpx.MockTransport(handler)) == first
+        cache.drain(timeout=5)
+
+    # Refreshed over the client, without cloudscraper
+    assert len(requests) == 2
+    mock_request.assert_not_called()
+    assert async_fetch.fetch_all(["2125-01-01"], transport=httpx.MockTransport(handler))["2125-01-01"]["slots"] == []
+
+
+def test_fetch_all_works_inside_a_running_event_loop():
+    def handler(request):
+        return httpx.Response(200, content=bookings_body(request.url.params["startDate"]))
+
+    async def embedding_application():
+        return async_fetch.fetch_all(["2125-01-01"], transport=httpx.MockTransport(handler))
+
+    results = asyncio.run(embedding_application())
+
+    assert len(results["2125-01-01"]["slots"]) == 1
@@ -0,0 +1,89 @@
+import json
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+
+from eversports_scraper import archive, backtest, stats
+from eversports_scraper.errors import ConfigurationError
+from eversports_scraper.models import DayAvailability, RuleSet
+
+np = pytest.importorskip("numpy")
+
+COURTS = [77394, 77395]
+GRID = ["17:00", "17:45", "18:30"]
+START = datetime(2125, 1, 1, 8, 0)
+
+
+@pytest.fixture
+def columns(tmp_path):
+    """Polls of 2125-01-01 every 5 minutes: court 77394 at 17:00 is cancelled, rebooked and cancelled again."""
+    free = {"17:00": [77394]}
+    polls = [{}, free, free, {}, free, free, free]
+    with patch("eversports_scraper.archive.scraper.get_all_slots", return_value=GRID), patch(
+        "eversports_scraper.archive.config.COURT_IDS", COURTS
+    ), patch("eversports_scraper.persist.config.STATE_DIR", str(tmp_path)):
+        for minutes, free_slots_map in zip(range(0, 35, 5), polls):
+            day = DayAvailability(date="2125-01-01", slots=[], new_count=0, free_slots_map=free_slots_map)
+            archive.append([day], polled_at=START + timedelta(minutes=minutes), archive_dir=str(tmp_path / "archive"))
+    return stats.load_columns(str(tmp_path / "archive"))
+
+
+def test_iter_snapshots_marks_unchanged_polls(columns):
+    snapshots = list(backtest.iter_snapshots(columns))
+
+    assert [s.changed for s in snapshots] == [True, True, False, True, True, False, False]
+    assert snapshots[2].free_slots_map == {"17:00": [77394]}
+    assert snapshots[0].all_slots == GRID
+
+
+def test_backtest_scores_alerts_delays_and_missed_opportunities(columns):
+    rule_sets = [
+        RuleSet(name="fast", cooldown_minutes=0, min_free_polls=1, min_block_slots=1),
+        RuleSet(name="cooldown", cooldown_minutes=60, min_free_polls=1, min_block_slots=1),
+        RuleSet(name="patient", cooldown_minutes=0, min_free_polls=3, min_block_slots=1),
+        RuleSet(name="blocks", cooldown_minutes=0, min_free_polls=1, min_block_slots=2),
+        RuleSet(name="evening", min_free_polls=1, min_block_slots=1, start_time="19:00", end_time="22:00"),
+        RuleSet(name="other court", cooldown_minutes=0, min_free_polls=1, min_block_slots=1, courts=[77395]),
+    ]
+
+    results = {r.rule_set: r for r in backtest.backtest(columns, rule_sets)}
+
+    assert (results["fast"].alerts, results["fast"].opportunities, results["fast"].delays) == (2, 2, [0, 0])
+    # The second cancellation comes within the cooldown of the first alert
+    assert (results["cooldown"].alerts, results["cooldown"].detected) == (1, 1)
+    # The first cancellation is booked again before its third free poll, the second is detected then
+    patient = results["patient"]
+    assert (patient.alerts, patient.opportunities, patient.detected, patient.delays) == (1, 2, 1, [10])
+    assert (results["blocks"].alerts, results["blocks"].opportunities, results["blocks"].detected) == (0, 2, 0)
+    assert (results["evening"].alerts, results["evening"].opportunities) == (0, 0)
+    assert (results["other court"].alerts, results["other court"].opportunities) == (0, 0)
+    assert results["fast"].messages == 2
+
+
+def test_backtest_of_an_unchanging_archive_alerts_no_rule_set(tmp_path):
+    with patch("eversports_scraper.archive.scraper.get_all_slots", return_value=GRID), patch(
+        "eversports_scraper.archive.config.COURT_IDS", COURTS
+    ), patch("eversports_scraper.persist.config.STATE_DIR", str(tmp_path)):
+        day = DayAvailability(date="2125-01-01", slots=[], new_count=0, free_slots_map={"17:00": COURTS})
+        for minutes in range(0, 35, 5):
+            archive.append([day], polled_at=START + timedelta(minutes=minutes), archive_dir=str(tmp_path / "archive"))
+    rule_sets = [
+        RuleSet(name=f"p{polls}", cooldown_minutes=0, min_free_polls=polls, min_block_slots=1) for polls in (1, 2, 3)
+    ]
+
+    results = backtest.backtest(stats.load_columns(str(tmp_path / "archive")), rule_sets)
+
+    assert [(r.alerts, r.opportunities) for r in results] == [(0, 0)] * 3
+
+
+def test_load_rule_sets(tmp_path):
+    assert backtest.load_rule_sets() == [RuleSet(name="current")]
+
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps([{"name": "strict", "min_free_polls": 2}]))
+    assert backtest.load_rule_sets(str(path)) == [RuleSet(name="strict", min_free_polls=2)]
+
+    path.write_text(json.dumps([{"min_free_polls": 2}]))
+    with pytest.raises(ConfigurationError):
+        backtest.load_rule_sets(str(path))
@@ -0,0 +1,77 @@
+from unittest.mock import patch
+
+from eversports_scraper import blocks
+from eversports_scraper.models import Slot
+from eversports_scraper.scraper import get_all_slots
+
+ALL_SLOTS = get_all_slots()  # 10:15, 11:00, 11:45, ...
+
+
+def test_run_starts_and_cover():
+    mask = 0b0111_0110
+
+    assert blocks.run_starts(mask, 1) == mask
+    assert blocks.run_starts(mask, 2) == 0b0011_0010
+    assert blocks.run_starts(mask, 3) == 0b0001_0000
+    assert blocks.run_starts(mask, 4) == 0
+    assert blocks.run_cover(mask, 3) == 0b0111_0000
+
+
+def test_maximal_runs():
+    assert blocks.maximal_runs(0b1101_1100) == [(2, 3), (6, 2)]
+    assert blocks.maximal_runs(0) == []
+
+
+def test_find_blocks_same_court():
+    free = {"17:45": [77394, 77395], "18:30": [77394], "19:15": [77394], "20:45": [77396], "21:30": [77396]}
+
+    found = blocks.find_blocks(free, ALL_SLOTS, 2)
+
+    assert [(b.start, b.end, b.slots, b.court) for b in found] == [
+        ("17:45", "20:00", 3, "Court 1"),
+        ("20:45", "22:15", 2, "Court 3"),
+    ]
+
+
+def test_find_blocks_any_court_may_switch_courts():
+    free = {"17:45": [77395], "18:30": [77394]}
+
+    assert blocks.find_blocks(free, ALL_SLOTS, 2) == []
+    found = blocks.find_blocks(free, ALL_SLOTS, 2, same_court=False)
+    assert [(b.start, b.end, b.court_id) for b in found] == [("17:45", "19:15", None)]
+
+
+def test_find_blocks_ends_follow_the_slot_duration():
+    free = {"12:15": [77394], "13:15": [77394]}
+    slots = ["12:15", "13:15"]
+
+    with patch("eversports_scraper.blocks.config.SLOT_DURATION_MINUTES", 45):
+        assert blocks.find_blocks(free, slots, 2)[0].end == "14:00"
+    with patch("eversports_scraper.blocks.config.SLOT_DURATION_MINUTES", 60):
+        assert blocks.find_blocks(free, slots, 2)[0].end == "14:15"
+
+
+def test_filter_slots_in_blocks():
+    free = {"17:45": [77394, 77395], "18:30": [77394], "20:45": [77396]}
+    new_slots = [
+        Slot(time="17:45", courts=["Court 1", "Court 2"], court_ids=[77394, 77395], is_new=True),
+        Slot(time="20:45", courts=["Court 3"], court_ids=[77396], is_new=True),
+    ]
+
+    kept = blocks.filter_slots_in_blocks(new_slots, free, ALL_SLOTS, 2)
+
+    assert [(s.time, s.court_ids, s.courts) for s in kept] == [("17:45", [77394], ["Court 1"])]
+    assert blocks.filter_slots_in_blocks(new_slots, free, ALL_SLOTS, 1) == new_slots
+
+
+def test_find_blocks_works_per_court_not_per_slot():
+    courts = list(range(1, 41))
+    free = {slot: [c for c in courts if (i + c) % 5] for i, slot in enumerate(ALL_SLOTS)}
+
+    with patch("eversports_scraper.blocks.maximal_runs", wraps=blocks.maximal_runs) as runs:
+        found = blocks.find_blocks(free, ALL_SLOTS, 3)
+
+    # One pass over each court's mask, however many slots the day has; timing lives in benchmarks/bench_blocks.py
+    assert runs.call_count == len(courts)
+    assert found and all(b.slots >= 3 for b in found)
+    assert {b.court_id for b in found} == set(courts)
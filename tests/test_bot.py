@@ -0,0 +1,203 @@
+import json
+import threading
+from datetime import date, datetime
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from eversports_scraper import bot, persist, subscriptions
+from eversports_scraper.models import DayAvailability, Slot, TargetInterval
+
+NOW = datetime(2125, 1, 1, 17, 0)  # A Monday
+
+DAYS = [
+    DayAvailability(
+        date="2125-01-01",
+        slots=[
+            Slot(time="10:15", courts=["Court 1"], court_ids=[77394], is_new=False),
+            Slot(time="18:15", courts=["Court 1", "Court 2"], court_ids=[77394, 77395], is_new=False),
+        ],
+        new_count=0,
+        free_slots_map={"10:15": [77394], "18:15": [77394, 77395]},
+    ),
+    DayAvailability(
+        date="2125-01-02",
+        slots=[Slot(time="19:45", courts=["Court 3"], court_ids=[77396], is_new=False)],
+        new_count=0,
+        free_slots_map={"19:45": [77396]},
+    ),
+]
+
+
+@pytest.fixture
+def command_bot():
+    return bot.CommandBot("TOKEN", snapshot=lambda: DAYS, api_base="http://unused")
+
+
+@pytest.fixture(autouse=True)
+def isolated_subscriptions(tmp_path):
+    with patch.multiple(
+        "eversports_scraper.config", SUBSCRIPTIONS_FILE=str(tmp_path / "subscriptions.json"), STATE_DIR=str(tmp_path)
+    ):
+        yield
+
+
+@pytest.mark.parametrize(
+    "token, expected",
+    [
+        ("today", "2125-01-01"),
+        ("Morgen", "2125-01-02"),
+        ("fri", "2125-01-05"),
+        ("mon", "2125-01-01"),
+        ("2125-03-04", "2125-03-04"),
+        ("04.03.2125", "2125-03-04"),
+        ("04.03.", "2125-03-04"),
+        ("31.12.", "2125-12-31"),
+        ("soon", None),
+    ],
+)
+def test_parse_date(token, expected):
+    assert bot.parse_date(token, date(2125, 1, 1)) == expected
+
+
+def test_parse_window():
+    assert bot.parse_window("18-21") == ("18:00", "21:00")
+    assert bot.parse_window("19:30-21:15") == ("19:30", "21:15")
+    assert bot.parse_window("21-18") is None
+    assert bot.parse_window("18") is None
+
+
+def test_free_filters_by_date_and_window(command_bot):
+    reply = command_bot.handle("/free today 18-21", "1", NOW)
+
+    assert "*2125-01-01*" in reply
+    assert "18:15 (Court 1, Court 2)" in reply
+    assert "10:15" not in reply
+    assert command_bot.handle("/free tomorrow 8-9", "1", NOW) == "No free slots on 2125-01-02 between 08:00 and 09:00."
+    assert "not monitored" in command_bot.handle("/free 2125-02-01", "1", NOW)
+
+
+def test_next_skips_past_slots_and_filters_court(command_bot):
+    assert command_bot.handle("/next", "1", NOW) == "Next free slot: *2125-01-01* 18:15 (Court 1, Court 2)"
+    assert command_bot.handle("/next court 3", "1", NOW) == "Next free slot: *2125-01-02* 19:45 (Court 3)"
+    assert command_bot.handle("/next court 7", "1", NOW) == "Unknown court '7'."
+
+
+@patch("eversports_scraper.config.BOT_ALLOWED_CHAT_IDS", ["42"])
+def test_watch_adds_target_to_chat_subscription(command_bot):
+    reply = command_bot.handle("/watch 03.01.2125 19:00-21:00", "42", NOW)
+    command_bot.handle("/watch 03.01.2125 19:00-21:00", "42", NOW)
+
+    assert "Watching *2125-01-03* 19:00-21:00" in reply
+    subs = {s.name: s for s in subscriptions.load_subscriptions()}
+    assert set(subs) == {"default", "chat-42"}
+    assert subs["chat-42"].targets == [TargetInterval(date="2125-01-03", start_time="19:00", end_time="21:00")]
+
+
+@patch.multiple("eversports_scraper.config", TELEGRAM_CHAT_ID="7", TARGET_DATES_CSV_URL="http://sheet/old")
+def test_watch_stores_only_registered_subscribers_and_not_the_environment(command_bot, tmp_path):
+    command_bot.handle("/watch 03.01.2125 19:00-21:00", "7", NOW)
+
+    stored = json.loads((tmp_path / "subscriptions.json").read_text())["subscriptions"]
+    assert [(s["name"], s["sheet_url"], s["chat_id"]) for s in stored] == [("default", None, None)]
+    with patch("eversports_scraper.config.TARGET_DATES_CSV_URL", "http://sheet/new"):
+        (default,) = subscriptions.load_subscriptions()
+    assert (default.sheet_url, default.chat_id) == ("http://sheet/new", "7")
+    assert [t.date for t in default.targets] == ["2125-01-03"]
+
+
+def test_replies_escape_echoed_input(command_bot):
+    assert command_bot.handle("/free some_day", "1", NOW).startswith("Could not understand 'some\\_day'.")
+    assert command_bot.handle("/next court *7*", "1", NOW) == "Unknown court '\\*7\\*'."
+
+
+@patch("eversports_scraper.config.BOT_MAX_WATCHES_PER_CHAT", 1)
+@patch("eversports_scraper.config.TARGET_HORIZON_DAYS", 28)
+@patch("eversports_scraper.config.BOT_ALLOWED_CHAT_IDS", ["42"])
+def test_watch_is_limited_to_allowed_chats_the_horizon_and_a_maximum(command_bot):
+    assert "may not watch" in command_bot.handle("/watch 03.01.2125 19:00-21:00", "666", NOW)
+    assert "too far ahead" in command_bot.handle("/watch 30.01.2125 19:00-21:00", "42", NOW)
+    assert "Watching" in command_bot.handle("/watch 29.01.2125 19:00-21:00", "42", NOW)
+    assert "already watches 1" in command_bot.handle("/watch 03.01.2125 19:00-21:00", "42", NOW)
+
+    subs = {s.name: s for s in subscriptions.load_subscriptions()}
+    assert set(subs) == {"default", "chat-42"}
+    assert [t.date for t in subs["chat-42"].targets] == ["2125-01-29"]
+
+
+def test_unknown_command_returns_help(command_bot):
+    assert command_bot.handle("/start", "1", NOW) == bot.HELP_TEXT
+    assert command_bot.handle("hello", "1", NOW) is None
+
+
+def test_report_snapshot_rereads_only_on_change(tmp_path):
+    report = tmp_path / "report.json"
+    report.write_text(json.dumps({"last_updated": NOW.isoformat(), "days": [persist.dump_day(d) for d in DAYS]}))
+
+    with patch("eversports_scraper.bot.config.REPORT_FILE", str(report)), patch.dict(bot._report_cache, clear=True):
+        assert [d.date for d in bot.report_snapshot()] == ["2125-01-01", "2125-01-02"]
+        with patch("builtins.open", MagicMock(side_effect=AssertionError("re-read"))):
+            assert len(bot.report_snapshot()) == 2
+
+
+@pytest.fixture
+def bot_api():
+    """A local stand-in for the Telegram Bot API serving one batch of updates."""
+    sent = []
+    updates = [
+        {"update_id": 10, "message": {"text": "/next", "chat": {"id": 1}}},
+        {"update_id": 11, "message": {"text": "just chatting", "chat": {"id": 1}}},
+    ]
+    offsets = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            if self.path.endswith("/getUpdates"):
+                offsets.append(body.get("offset"))
+                result = [u for u in updates if u["update_id"] >= (body.get("offset") or 0)]
+            else:
+                sent.append(body)
+                result = {"message_id": len(sent)}
+            payload = json.dumps({"ok": True, "result": result}).encode()
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}", sent, offsets
+    server.shutdown()
+    server.server_close()
+
+
+def test_poll_once_answers_commands_and_confirms_updates(bot_api):
+    url, sent, offsets = bot_api
+    command_bot = bot.CommandBot("TOKEN", snapshot=lambda: DAYS, api_base=url, poll_timeout=0)
+
+    assert command_bot.poll_once() == 2
+    assert command_bot.poll_once() == 0
+
+    assert offsets == [None, 12]
+    assert len(sent) == 1
+    assert sent[0]["chat_id"] == "1"
+    assert sent[0]["text"].startswith("Next free slot:")
+
+
+def test_poll_once_logs_a_failing_command_and_carries_on(bot_api):
+    url, sent, offsets = bot_api
+
+    def broken_snapshot():
+        raise RuntimeError("report unreadable")
+
+    command_bot = bot.CommandBot("TOKEN", snapshot=broken_snapshot, api_base=url, poll_timeout=0)
+
+    assert command_bot.poll_once() == 2
+    assert command_bot.offset == 12
+    assert sent == []
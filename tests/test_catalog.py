@@ -0,0 +1,115 @@
+import json
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+
+from eversports_scraper import catalog, config
+
+NOW = datetime(2125, 1, 1, 6, 0).astimezone()
+
+WIDGET_STATE = {
+    "props": {
+        "pageProps": {
+            "facility": {
+                "id": 76443,
+                "courts": [
+                    {"id": 77394, "name": "Court 1 ", "sport": {"slug": "badminton"}},
+                    {"id": 77395, "name": "Court 2", "sport": {"slug": "badminton"}},
+                    {"id": 90001, "name": "Squash 1", "sport": {"slug": "squash"}},
+                    {"id": "x", "name": "Broken"},
+                ],
+                "openingHours": [
+                    {"day": "monday", "open": "10:15", "close": "23:00"},
+                    {"day": 6, "open": "0900", "close": "2000"},
+                    {"day": "sunday", "open": "22:00", "close": "08:00"},
+                ],
+            }
+        }
+    }
+}
+
+
+def _widget_html(state):
+    return (
+        "<html><body><div id='root'></div>"
+        f'<script id="__NEXT_DATA__" type="application/json">{json.dumps(state)}</script>'
+        "</body></html>"
+    )
+
+
+@pytest.fixture(autouse=True)
+def isolated_catalog(tmp_path):
+    with patch("eversports_scraper.catalog.config.CATALOG_DIR", str(tmp_path / "catalog")):
+        yield
+
+
+def test_parse_widget_finds_courts_of_sport_and_opening_hours():
+    found = catalog.parse_widget(_widget_html(WIDGET_STATE), 76443, NOW)
+
+    assert found is not None
+    assert found.courts == {77394: "Court 1", 77395: "Court 2"}
+    assert found.opening_hours == {0: ("10:15", "23:00"), 5: ("09:00", "20:00")}
+    assert found.fetched_at == found.checked_at == NOW.isoformat()
+
+
+def test_parse_widget_without_courts():
+    assert catalog.parse_widget("<html><script>var x = 1;</script></html>", 76443) is None
+
+
+def test_get_catalog_uses_cache_until_refresh(caplog):
+    first = catalog.parse_widget(_widget_html(WIDGET_STATE), 76443, NOW)
+    with patch("eversports_scraper.catalog.fetch_catalog", return_value=first) as fetch:
+        assert catalog.get_catalog(76443, NOW) == first
+        assert catalog.get_catalog(76443, NOW + timedelta(hours=1)) == first
+    assert fetch.call_count == 1
+
+    state = json.loads(json.dumps(WIDGET_STATE))
+    state["props"]["pageProps"]["facility"]["courts"].append({"id": 77396, "name": "Court 3"})
+    later = NOW + timedelta(hours=config.CATALOG_REFRESH_HOURS)
+    second = catalog.parse_widget(_widget_html(state), 76443, later)
+    with patch("eversports_scraper.catalog.fetch_catalog", return_value=second):
+        assert catalog.get_catalog(76443, later).courts[77396] == "Court 3"
+    assert "court 77396 (Court 3) added" in caplog.text
+
+
+def test_get_catalog_keeps_cached_copy_when_discovery_fails():
+    first = catalog.parse_widget(_widget_html(WIDGET_STATE), 76443, NOW)
+    later = NOW + timedelta(hours=config.CATALOG_REFRESH_HOURS)
+    with patch("eversports_scraper.catalog.fetch_catalog", side_effect=[first, None]) as fetch:
+        catalog.get_catalog(76443, NOW)
+        assert catalog.get_catalog(76443, later).courts == first.courts
+        # The failed attempt counts as a check, so the next run doesn't retry right away
+        assert catalog.get_catalog(76443, later + timedelta(hours=1)).fetched_at == NOW.isoformat()
+    assert fetch.call_count == 2
+
+
+def test_get_catalog_without_cache_and_failed_discovery():
+    with patch("eversports_scraper.catalog.fetch_catalog", return_value=None) as fetch:
+        assert catalog.get_catalog(76443, NOW) is None
+        assert catalog.get_catalog(76443, NOW + timedelta(hours=1)) is None
+    assert fetch.call_count == 1
+
+
+@patch.multiple("eversports_scraper.catalog.config", COURT_IDS=[1], COURT_MAPPING={1: "Old"}, OPENING_HOURS={})
+def test_apply_replaces_configured_courts():
+    catalog.apply(catalog.parse_widget(_widget_html(WIDGET_STATE), 76443, NOW))
+
+    assert config.COURT_IDS == [77394, 77395]
+    assert config.COURT_MAPPING == {77394: "Court 1", 77395: "Court 2"}
+    assert config.OPENING_HOURS[5] == ("09:00", "20:00")
+
+
+@patch("eversports_scraper.catalog.config.WIDGET_URLS", {76443: "http://widget/76443", 80000: "http://widget/80000"})
+@patch("eversports_scraper.catalog.cloudscraper.create_scraper")
+def test_fetch_catalog_uses_the_facility_widget_page(mock_create_scraper):
+    mock_get = mock_create_scraper.return_value.get
+    mock_get.return_value.text = _widget_html(WIDGET_STATE)
+
+    found = catalog.fetch_catalog(80000, NOW)
+
+    assert mock_get.call_args.args[0] == "http://widget/80000"
+    assert found is not None and found.facility_id == 80000
+    # Without a known widget page nothing is fetched
+    assert catalog.fetch_catalog(12345, NOW) is None
+    assert mock_get.call_count == 1
@@ -1,13 +1,77 @@
 from unittest.mock import MagicMock, patch
 
+import pytest
+
 from eversports_scraper import cli
+from eversports_scraper.errors import ConfigurationError, NoTargetDatesError
 
 
+@patch("eversports_scraper.cli.run.print_outcome")
 @patch("eversports_scraper.cli.run.run")
 @patch("eversports_scraper.cli.parse_arguments")
-def test_main_calls_run(mock_args, mock_run):
-    mock_args.return_value = MagicMock(start_date="2025-01-01", days=5, verbose=True)
+def test_main_calls_run(mock_args, mock_run, mock_print):
+    mock_args.return_value = MagicMock(start_date="2025-01-01", days=5, deadline=None, verbose=True)
 
     cli.main()
 
-    mock_run.assert_called_once_with(start_date="2025-01-01", days=5)
+    mock_run.assert_called_once_with(start_date="2025-01-01", days=5, deadline=None)
+    mock_print.assert_called_once_with(mock_run.return_value)
+
+
+@patch("eversports_scraper.cli.server.serve")
+@patch("eversports_scraper.cli.run.run")
+def test_main_serve_subcommand(mock_run, mock_serve):
+    with patch("sys.argv", ["eversports_scraper", "--days", "7", "serve", "--port", "9000"]):
+        cli.main()
+
+    mock_run.assert_not_called()
+    mock_serve.assert_called_once_with(host=None, port=9000, interval=None, start_date=None, days=7, with_bot=False)
+
+
+@patch("eversports_scraper.cli.run.print_outcome")
+@patch("eversports_scraper.cli.shards.merge")
+@patch("eversports_scraper.cli.shards.work")
+def test_main_shard_and_merge_subcommands(mock_work, mock_merge, mock_print):
+    with patch("sys.argv", ["eversports_scraper", "--deadline", "300", "shard", "--worker", "w1"]):
+        cli.main()
+    with patch("sys.argv", ["eversports_scraper", "merge"]):
+        cli.main()
+
+    mock_work.assert_called_once_with(worker="w1", start_date=None, days=3, deadline=300.0)
+    mock_merge.assert_called_once_with(start_date=None, days=3)
+
+
+@patch("eversports_scraper.cli.stats.main")
+def test_main_stats_subcommand(mock_stats):
+    with patch("sys.argv", ["eversports_scraper", "stats", "--csv", "out"]):
+        cli.main()
+
+    mock_stats.assert_called_once_with(csv_dir="out")
+
+
+@patch("eversports_scraper.cli.backtest.main")
+def test_main_backtest_subcommand(mock_backtest):
+    with patch("sys.argv", ["eversports_scraper", "backtest", "--rules", "rules.json"]):
+        cli.main()
+
+    mock_backtest.assert_called_once_with(rules_path="rules.json")
+
+
+@patch("eversports_scraper.cli.run.run")
+def test_main_exits_cleanly_without_target_dates_and_with_1_on_errors(mock_run):
+    mock_run.side_effect = NoTargetDatesError("No future dates found in Google Sheet")
+    with patch("sys.argv", ["eversports_scraper"]):
+        cli.main()
+
+    mock_run.side_effect = ConfigurationError("Start date must be in YYYY-MM-DD format")
+    with patch("sys.argv", ["eversports_scraper"]), pytest.raises(SystemExit) as exc_info:
+        cli.main()
+    assert exc_info.value.code == 1
+
+
+@patch("eversports_scraper.cli.latency.main")
+def test_main_latency_subcommand(mock_latency):
+    with patch("sys.argv", ["eversports_scraper", "latency"]):
+        cli.main()
+
+    mock_latency.assert_called_once_with()
@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from eversports_scraper.cooldown import NotificationIndex
+from eversports_scraper.models import DayAvailability, Slot
+
+NOW = datetime(2125, 1, 1, 18, 0).astimezone()
+DATE = "2125-01-02"
+
+
+def _day(free_slots_map, new_times=None):
+    new_times = set(free_slots_map) if new_times is None else new_times
+    slots = [Slot(time=t, courts=[], court_ids=ids, is_new=t in new_times) for t, ids in free_slots_map.items()]
+    return DayAvailability(date=DATE, slots=slots, new_count=len(new_times), free_slots_map=free_slots_map)
+
+
+def test_newly_free_court_is_eligible_immediately_by_default():
+    index = NotificationIndex(cooldown_minutes=60, min_free_polls=1)
+
+    assert index.observe(_day({"18:00": [77394]}), {}, NOW) == {"18:00": [77394]}
+    # Still free on the next poll: not new anymore
+    assert index.observe(_day({"18:00": [77394]}), {"18:00": [77394]}, NOW) == {}
+
+
+def test_min_free_polls_delays_notification():
+    index = NotificationIndex(cooldown_minutes=60, min_free_polls=3)
+    free = {"18:00": [77394]}
+
+    assert index.observe(_day(free), {}, NOW) == {}
+    assert index.observe(_day(free, set()), free, NOW) == {}
+    assert index.observe(_day(free, set()), free, NOW) == {"18:00": [77394]}
+    assert index.observe(_day(free, set()), free, NOW) == {}
+
+
+def test_court_booked_in_between_resets_streak():
+    index = NotificationIndex(cooldown_minutes=60, min_free_polls=2)
+    free = {"18:00": [77394]}
+
+    index.observe(_day(free), {}, NOW)
+    index.observe(_day({}), free, NOW)
+    assert index.observe(_day(free), {}, NOW) == {}
+    assert index.observe(_day(free, set()), free, NOW) == {"18:00": [77394]}
+
+
+def test_cooldown_suppresses_flapping_court():
+    index = NotificationIndex(cooldown_minutes=60, min_free_polls=1)
+    free = {"18:00": [77394]}
+
+    assert index.observe(_day(free), {}, NOW) == {"18:00": [77394]}
+    index.mark_notified([f"{DATE}|18:00|77394"], NOW)
+
+    # Rebooked, then cancelled again within the cooldown
+    index.observe(_day({}), free, NOW + timedelta(minutes=10))
+    assert index.observe(_day(free), {}, NOW + timedelta(minutes=20)) == {}
+
+    # After the cooldown the court is notified again
+    index.observe(_day({}), free, NOW + timedelta(minutes=70))
+    assert index.observe(_day(free), {}, NOW + timedelta(minutes=80)) == {"18:00": [77394]}
+
+
+def test_unknown_court_not_flagged_new_is_treated_as_known():
+    index = NotificationIndex(cooldown_minutes=60, min_free_polls=1)
+
+    assert index.observe(_day({"18:00": [77394]}, new_times=set()), {}, NOW) == {}
+
+
+def test_evict_drops_past_dates_and_expired_notifications():
+    index = NotificationIndex(
+        streaks={"2124-12-31": {"18:00|77394": 1}, DATE: {"18:00|77394": 1}},
+        notified={
+            f"{DATE}|18:00|77394": (NOW - timedelta(minutes=90)).isoformat(),
+            f"{DATE}|19:00|77394": NOW.isoformat(),
+        },
+        cooldown_minutes=60,
+    )
+
+    index.evict(NOW)
+
+    assert list(index.streaks) == [DATE]
+    assert list(index.notified) == [f"{DATE}|19:00|77394"]
+
+
+def test_save_and_load_roundtrip(tmp_path):
+    with patch("eversports_scraper.cooldown.config.NOTIFY_INDEX_FILE", str(tmp_path / "index.json")):
+        index = NotificationIndex()
+        index.observe(_day({"18:00": [77394]}), {}, NOW)
+        index.mark_notified([f"{DATE}|18:00|77394"], NOW)
+        index.save(NOW)
+
+        loaded = NotificationIndex.load()
+
+    assert loaded.streaks == {DATE: {"18:00|77394": 1}}
+    assert f"{DATE}|18:00|77394" in loaded.notified
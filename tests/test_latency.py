@@ -0,0 +1,97 @@
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+
+from eversports_scraper import latency
+from eversports_scraper.models import DayAvailability
+
+T0 = "2125-01-01T10:00:00+01:00"
+T1 = "2125-01-01T10:05:00+01:00"
+T2 = "2125-01-01T10:10:00+01:00"
+NOW = datetime.fromisoformat("2125-01-01T10:12:00+01:00")
+
+
+@pytest.fixture(autouse=True)
+def isolated_state(tmp_path):
+    with patch.multiple(
+        "eversports_scraper.config",
+        LATENCY_FILE=str(tmp_path / "latency.json"),
+        STATE_DIR=str(tmp_path),
+        LATENCY_SLO_SECONDS=600,
+    ):
+        yield
+
+
+def make_day(date_str, free_slots_map, fetched_at):
+    return DayAvailability(date=date_str, slots=[], new_count=0, free_slots_map=free_slots_map, fetched_at=fetched_at)
+
+
+def delivered(date_str, slot_time, court_id, delivered_at, subscriber="default"):
+    return {
+        f"{subscriber}|{date_str}|{slot_time}|{court_id}": {
+            "subscriber": subscriber,
+            "date": date_str,
+            "time": slot_time,
+            "court_id": court_id,
+            "status": "delivered",
+            "delivered_at": delivered_at,
+        }
+    }
+
+
+def test_freed_courts_are_bounded_by_the_previous_poll():
+    history = {"2125-01-05": {"10:15": [77394], "11:00": []}}
+    days = [
+        make_day("2125-01-05", {"10:15": [77394, 77395], "11:00": [77396]}, T1),
+        # Never polled before, so its free courts are not counted as freed
+        make_day("2125-01-06", {"10:15": [77394]}, T1),
+    ]
+
+    events = latency.freed_courts(days, history, {"2125-01-05": T0})
+
+    assert [(e["time"], e["court_id"]) for e in events] == [("10:15", 77395), ("11:00", 77396)]
+    assert latency.latencies(events, "detection") == [300, 300]
+    assert events[0]["booked_at"] == T0 and events[0]["detected_at"] == T1
+
+
+def test_record_run_stamps_first_delivery_and_keeps_refreed_courts_apart():
+    history = {"2125-01-05": {"10:15": []}}
+    day = make_day("2125-01-05", {"10:15": [77394]}, T1)
+
+    first = latency.record_run([day], history, {"2125-01-05": T0}, {}, now=NOW)
+    assert first["detection"] == {"count": 1, "p50": 300, "p90": 300, "max": 300}
+    assert first["delivery"] == {"count": 0}
+
+    entries = {
+        **delivered("2125-01-05", "10:15", 77394, "2125-01-01T10:06:00+01:00", subscriber="b"),
+        **delivered("2125-01-05", "10:15", 77394, "2125-01-01T10:05:30+01:00", subscriber="a"),
+    }
+    second = latency.record_run([], history, {}, entries, now=NOW)
+    assert second["delivery"]["p50"] == 30
+    assert second["end_to_end"]["p50"] == 330
+
+    # Booked and freed again: the old delivery does not count for the new event
+    refreed = make_day("2125-01-05", {"10:15": [77394]}, T2)
+    third = latency.record_run([refreed], {"2125-01-05": {"10:15": []}}, {"2125-01-05": T1}, entries, now=NOW)
+    assert third["delivery"] == {"count": 0}
+
+    data = latency.load()
+    assert len(data["runs"]) == 3
+    assert [e.get("delivered_at") for e in data["events"]] == ["2125-01-01T10:05:30+01:00", None]
+    assert latency.slo_share(data["events"]) == 1.0
+
+
+def test_main_reports_latency_per_day(capsys):
+    history = {"2125-01-05": {"10:15": []}}
+    day = make_day("2125-01-05", {"10:15": [77394, 77395]}, T1)
+    latency.record_run([day], history, {"2125-01-05": T0}, delivered("2125-01-05", "10:15", 77394, T2), now=NOW)
+
+    latency.main()
+
+    output = capsys.readouterr().out
+    assert "SLO: notified within 10m" in output
+    rows = [line.split() for line in output.splitlines() if line.startswith(("2125-01-01", "all"))]
+    # 2 freed, detected within 5m, 1 delivered 5m after detection and 10m after last seen booked
+    assert rows[0] == ["2125-01-01", "2", "5m", "5m", "1", "5m", "5m", "10m", "100%"]
+    assert rows[1][0] == "all"
@@ -0,0 +1,171 @@
+import json
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest.mock import patch
+
+import pytest
+
+from eversports_scraper import notifiers
+from eversports_scraper.models import Slot, Subscription
+
+NEW_SLOTS = [("2025-01-01", [Slot(time="18:00", courts=["Court 1"], court_ids=[77394], is_new=True)])]
+
+
+@pytest.fixture
+def http_receiver():
+    """A local HTTP server that records JSON bodies POSTed to it."""
+    received = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers["Content-Length"])
+            received.append(json.loads(self.rfile.read(length)))
+            self.send_response(200)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/hook", received
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def smtp_receiver():
+    """A minimal local SMTP server that records the DATA of each message."""
+    messages = []
+
+    class Handler(socketserver.StreamRequestHandler):
+        def reply(self, line):
+            self.wfile.write(f"{line}\r\n".encode())
+
+        def handle(self):
+            self.reply("220 localhost ready")
+            while True:
+                line = self.rfile.readline().decode().strip()
+                if not line:
+                    return
+                command = line.split(" ")[0].upper()
+                if command in ("EHLO", "HELO"):
+                    self.reply("250 localhost")
+                elif command == "DATA":
+                    self.reply("354 End data with <CR><LF>.<CR><LF>")
+                    data = []
+                    while True:
+                        data_line = self.rfile.readline().decode()
+                        if data_line.rstrip("\r\n") == ".":
+                            break
+                        data.append(data_line)
+                    messages.append("".join(data))
+                    self.reply("250 OK")
+                elif command == "QUIT":
+                    self.reply("221 Bye")
+                    return
+                else:
+                    self.reply("250 OK")
+
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.server_address[1], messages
+    server.shutdown()
+    server.server_close()
+
+
+def test_webhook_backend_posts_json(http_receiver):
+    url, received = http_receiver
+
+    assert notifiers.WebhookBackend(url, timeout=5).send(NEW_SLOTS) is True
+
+    assert received[0]["total"] == 1
+    assert received[0]["days"][0]["date"] == "2025-01-01"
+    assert received[0]["days"][0]["slots"][0]["courts"] == ["Court 1"]
+
+
+def test_webhook_backend_failure_returns_false():
+    # Nothing listens on this port
+    assert notifiers.WebhookBackend("http://127.0.0.1:9/hook", timeout=1).send(NEW_SLOTS) is False
+
+
+def test_email_backend_sends_message(smtp_receiver):
+    port, messages = smtp_receiver
+    backend = notifiers.EmailBackend("127.0.0.1", port, "bot@example.com", ["player@example.com"], timeout=5)
+
+    assert backend.send(NEW_SLOTS) is True
+
+    assert len(messages) == 1
+    assert "Subject: New badminton slots found (1)" in messages[0]
+    assert "18:00 (Court 1)" in messages[0]
+
+
+def test_file_backend_appends(tmp_path):
+    path = tmp_path / "notifications.log"
+    backend = notifiers.FileBackend(str(path))
+
+    backend.send(NEW_SLOTS)
+    backend.send(NEW_SLOTS)
+
+    assert path.read_text().count("2025-01-01:") == 2
+
+
+def test_file_backend_stdout(capsys):
+    notifiers.FileBackend("-").send(NEW_SLOTS)
+    assert "18:00 (Court 1)" in capsys.readouterr().out
+
+
+def test_telegram_backend_formats_markdown():
+    with patch("eversports_scraper.notifiers.telegram_notifier.send_telegram_message") as mock_send:
+        mock_send.return_value = True
+        assert notifiers.TelegramBackend(chat_id="123").send(NEW_SLOTS) is True
+
+    message = mock_send.call_args.args[0]
+    assert "*2025-01-01*:" in message
+    assert mock_send.call_args.kwargs["chat_id"] == "123"
+
+
+@patch("eversports_scraper.notifiers.config.TELEGRAM_BOT_TOKEN", "token")
+@patch("eversports_scraper.notifiers.config.SMTP_HOST", None)
+@patch("eversports_scraper.notifiers.config.WEBHOOK_URL", None)
+@patch("eversports_scraper.notifiers.config.NOTIFIERS", ["telegram", "webhook", "email", "file", "pigeon"])
+def test_configured_notifiers_skips_incomplete_backends():
+    names = [n.name for n in notifiers.configured_notifiers()]
+
+    assert names == ["telegram", "file"]
+    with patch("eversports_scraper.notifiers.config.TELEGRAM_BOT_TOKEN", None):
+        assert [n.name for n in notifiers.configured_notifiers()] == ["file"]
+
+
+@patch("eversports_scraper.notifiers.config.TELEGRAM_BOT_TOKEN", "token")
+@patch("eversports_scraper.notifiers.config.NOTIFY_FILE", "-")
+@patch("eversports_scraper.notifiers.config.NOTIFIERS", ["telegram", "file"])
+def test_subscriber_routes_share_global_backends_and_skip_chatless_subscribers():
+    routes = notifiers.subscriber_routes(
+        [Subscription(name="alice", chat_id="1"), Subscription(name="bob"), Subscription(name="carol", chat_id="3")]
+    )
+
+    assert sorted(routes) == ["*", "alice", "carol"]
+    assert [(b.name, b.chat_id) for b in routes["alice"]] == [("telegram", "1")]
+    assert [b.name for b in routes["*"]] == ["file"]
+
+
+def test_dispatch_runs_backends_concurrently():
+    release = threading.Event()
+
+    def slow():
+        release.wait(5)
+        return "slow"
+
+    start = time.monotonic()
+    results = notifiers.dispatch({"slow": slow, "fast": lambda: "fast"}, deadline=0.2)
+    elapsed = time.monotonic() - start
+    release.set()
+
+    assert results == {"slow": None, "fast": "fast"}
+    assert elapsed < 2
@@ -0,0 +1,188 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+
+from eversports_scraper import notifiers, outbox
+from eversports_scraper.models import Slot
+
+NOW = datetime(2125, 1, 1, 12, 0).astimezone()
+
+
+@pytest.fixture(autouse=True)
+def isolated_outbox(tmp_path):
+    with patch.multiple(
+        "eversports_scraper.config", OUTBOX_FILE=str(tmp_path / "outbox.json"), STATE_DIR=str(tmp_path)
+    ):
+        yield
+
+
+def _new_slots(date_str="2125-01-02"):
+    return [(date_str, [Slot(time="10:15", courts=["Court 1", "Court 2"], court_ids=[77395, 77394], is_new=True)])]
+
+
+class FakeBackend(notifiers.Notifier):
+    def __init__(self, name="fake", result=True, max_length=None):
+        super().__init__()
+        self.name = name
+        self.result = result
+        self.max_length = max_length
+        self.sent = []
+
+    def format(self, new_slots_data):
+        return "\n".join(f"{d} {s.time} {','.join(s.courts)}" for d, slots in new_slots_data for s in slots)
+
+    def send(self, new_slots_data, deadline=None):
+        self.sent.append(self.format(new_slots_data))
+        return self.result
+
+
+def test_enqueue_creates_one_entry_per_court():
+    added = outbox.enqueue(_new_slots(), now=NOW)
+
+    entries = outbox.load_outbox()
+    assert added == 2
+    assert set(entries) == {"default|2125-01-02|10:15|77394", "default|2125-01-02|10:15|77395"}
+    assert entries["default|2125-01-02|10:15|77394"]["court"] == "Court 1"
+    assert all(e["status"] == outbox.PENDING for e in entries.values())
+
+
+def test_enqueue_dedups_pending_entries():
+    outbox.enqueue(_new_slots(), now=NOW)
+    assert outbox.enqueue(_new_slots(), now=NOW) == 0
+
+
+def test_deliver_pending_marks_delivered_on_success():
+    outbox.enqueue(_new_slots(), now=NOW)
+    backend = FakeBackend()
+
+    delivered = outbox.deliver_pending({"default": [backend]}, now=NOW)
+
+    assert delivered == 2
+    assert backend.sent == ["2125-01-02 10:15 Court 1,Court 2"]
+    assert all(e["status"] == outbox.DELIVERED for e in outbox.load_outbox().values())
+
+    # Nothing left to send, and a re-detection does not queue the same courts again
+    assert outbox.deliver_pending({"default": [backend]}, now=NOW) == 0
+    assert outbox.enqueue(_new_slots(), now=NOW) == 0
+    assert len(backend.sent) == 1
+
+
+def test_deliver_pending_retries_after_failure():
+    outbox.enqueue(_new_slots(), now=NOW)
+
+    assert outbox.deliver_pending({"default": [FakeBackend(result=False)]}, now=NOW) == 0
+    entries = outbox.load_outbox()
+    assert all(e["status"] == outbox.PENDING and e["attempts"] == 1 for e in entries.values())
+
+    assert outbox.deliver_pending({"default": [FakeBackend()]}, now=NOW) == 2
+
+
+def test_deliver_pending_tracks_each_backend():
+    outbox.enqueue(_new_slots(), now=NOW)
+    ok = FakeBackend("ok")
+    failing = FakeBackend("failing", result=False)
+
+    assert outbox.deliver_pending({"default": [ok, failing]}, now=NOW) == 0
+    assert all(e["delivered_to"] == ["ok"] for e in outbox.load_outbox().values())
+
+    # Only the backend that failed is retried
+    failing.result = True
+    assert outbox.deliver_pending({"default": [ok, failing]}, now=NOW) == 2
+    assert len(ok.sent) == 1
+    assert len(failing.sent) == 2
+
+
+def test_deliver_pending_without_backends_keeps_entries():
+    outbox.enqueue(_new_slots(), now=NOW)
+
+    assert outbox.deliver_pending({}, now=NOW) == 0
+    assert all(e["status"] == outbox.PENDING for e in outbox.load_outbox().values())
+
+
+def test_prune_drops_past_dates_and_old_deliveries():
+    entries = {
+        "past": {"date": "2124-12-31", "status": outbox.PENDING},
+        "old": {
+            "date": "2125-01-02",
+            "status": outbox.DELIVERED,
+            "delivered_at": (NOW - timedelta(days=1)).isoformat(),
+        },
+        "recent": {"date": "2125-01-02", "status": outbox.DELIVERED, "delivered_at": NOW.isoformat()},
+        "pending": {"date": "2125-01-01", "status": outbox.PENDING},
+    }
+
+    assert set(outbox.prune(entries, NOW)) == {"recent", "pending"}
+
+
+def test_deliver_pending_packs_messages_by_date():
+    outbox.enqueue(_new_slots("2125-01-02") + _new_slots("2125-01-03"), now=NOW)
+    limited = FakeBackend("limited", max_length=40)
+    unlimited = FakeBackend("unlimited")
+
+    outbox.deliver_pending({"default": [limited, unlimited]}, now=NOW)
+
+    assert len(limited.sent) == 2
+    assert limited.sent[0].startswith("2125-01-02")
+    assert limited.sent[1].startswith("2125-01-03")
+    assert len(unlimited.sent) == 1
+
+
+def test_deliver_pending_records_when_the_send_completed():
+    outbox.enqueue(_new_slots(), now=NOW)
+
+    clock = [0.0]
+
+    class SlowBackend(FakeBackend):
+        def send(self, new_slots_data, deadline=None):
+            clock[0] += 90  # The send completes 90s after delivery started
+            return super().send(new_slots_data, deadline)
+
+    with patch("eversports_scraper.outbox.time.monotonic", side_effect=lambda: clock[0]):
+        outbox.deliver_pending({"default": [SlowBackend()]}, now=NOW)
+
+    expected = (NOW + timedelta(seconds=90)).isoformat()
+    assert {e["delivered_at"] for e in outbox.load_outbox().values()} == {expected}
+
+
+def test_deliver_pending_ignores_backends_finishing_after_the_deadline():
+    outbox.enqueue(_new_slots(), now=NOW)
+    release = threading.Event()
+
+    class SlowBackend(FakeBackend):
+        def send(self, new_slots_data, deadline=None):
+            release.wait(5)
+            return super().send(new_slots_data, deadline)
+
+    slow = SlowBackend("slow")
+    with patch("eversports_scraper.config.NOTIFY_DEADLINE_SECONDS", 0.1):
+        assert outbox.deliver_pending({"default": [slow]}, now=NOW) == 0
+    release.set()
+    while not slow.sent:
+        time.sleep(0.01)
+    time.sleep(0.05)
+
+    # The late send is not recorded, so the entries are retried on the next run
+    assert all(e["status"] == outbox.PENDING and e["attempts"] == 0 for e in outbox.load_outbox().values())
+
+
+def test_deliver_pending_stops_at_the_run_deadline():
+    outbox.enqueue(_new_slots("2125-01-02") + _new_slots("2125-01-03"), now=NOW)
+    deadlines = []
+
+    class DeadlineBackend(FakeBackend):
+        def send(self, new_slots_data, deadline=None):
+            deadlines.append(deadline)
+            return super().send(new_slots_data, deadline)
+
+    backend = DeadlineBackend(max_length=40)
+    with patch("eversports_scraper.config.NOTIFY_DEADLINE_SECONDS", 60):
+        # Nothing is sent once the run deadline has passed
+        assert outbox.deliver_pending({"default": [backend]}, now=NOW, deadline=time.monotonic() - 1) == 0
+        assert backend.sent == []
+        assert outbox.deliver_pending({"default": [backend]}, now=NOW, deadline=time.monotonic() + 5) == 4
+
+    assert len(backend.sent) == 2
+    assert all(d is not None and d <= time.monotonic() + 5 for d in deadlines)
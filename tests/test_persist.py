@@ -1,5 +1,9 @@
+import json
+import threading
 from datetime import datetime
-from unittest.mock import MagicMock, mock_open, patch
+from unittest.mock import mock_open, patch
+
+import pytest
 
 from eversports_scraper import config, persist
 from eversports_scraper.models import DayAvailability
@@ -36,46 +40,187 @@ def test_load_history_no_file():
         assert history == {}
 
 
-@patch("eversports_scraper.persist.datetime")
-@patch("eversports_scraper.persist.json.dump")
-@patch("eversports_scraper.persist.ensure_data_dir")
-def test_save_history(mock_ensure, mock_dump, mock_datetime):
+@pytest.fixture
+def data_files(tmp_path):
+    with patch.multiple(
+        "eversports_scraper.persist.config",
+        DATA_DIR=str(tmp_path),
+        STATE_DIR=str(tmp_path / ".state"),
+        HISTORY_FILE=str(tmp_path / "availability.json"),
+        REPORT_FILE=str(tmp_path / "report.json"),
+    ):
+        yield tmp_path
+
+
+def test_save_history(data_files):
     """Test that save_history wraps data with timestamp."""
-    # Mock datetime to return a consistent timestamp
-    mock_now = MagicMock()
-    mock_astimezone = MagicMock()
-    mock_astimezone.isoformat.return_value = "2025-01-01T12:00:00Z"
-    mock_now.astimezone.return_value = mock_astimezone
-    mock_datetime.now.return_value = mock_now
-
-    with patch("builtins.open", mock_open()):
-        history = {"test": "data"}
-        persist.save_history(history)
-
-        # Check that json.dump was called with wrapped data
-        args, _ = mock_dump.call_args
-        saved_data = args[0]
-        assert "last_updated" in saved_data
-        assert "availability" in saved_data
-        assert saved_data["availability"] == history
-        assert saved_data["last_updated"] == "2025-01-01T12:00:00Z"
-
-
-def test_save_report():
-    with patch("eversports_scraper.persist.ensure_data_dir"), patch("builtins.open", mock_open()):
-        results = [DayAvailability(date="2025-01-01", slots=[], new_count=0, free_slots_map={})]
-        persist.save_report(results)
-
-
-@patch("eversports_scraper.persist.json.dump")
-def test_save_report_structure(mock_dump):
-    with patch("eversports_scraper.persist.ensure_data_dir"), patch("builtins.open", mock_open()):
-        results = [DayAvailability(date="2025-01-01", slots=[], new_count=0, free_slots_map={})]
-        persist.save_report(results)
-
-        args, _ = mock_dump.call_args
-        data = args[0]
-        assert "last_updated" in data
-        datetime.fromisoformat(data["last_updated"])
-        assert "days" in data
-        assert data["days"][0]["date"] == "2025-01-01"
+    history = {"2125-01-01": {"10:15": [77394]}}
+    persist.save_history(history)
+
+    with open(data_files / "availability.json") as f:
+        saved_data = json.load(f)
+    assert "last_updated" in saved_data
+    assert "availability" in saved_data
+    assert saved_data["availability"] == history
+    datetime.fromisoformat(saved_data["last_updated"])
+
+
+def test_save_report(data_files):
+    results = [DayAvailability(date="2025-01-01", slots=[], new_count=0, free_slots_map={})]
+    assert persist.save_report(results) == results
+
+
+def test_save_report_structure(data_files):
+    results = [DayAvailability(date="2025-01-01", slots=[], new_count=0, free_slots_map={})]
+    persist.save_report(results)
+
+    with open(data_files / "report.json") as f:
+        data = json.load(f)
+    assert "last_updated" in data
+    datetime.fromisoformat(data["last_updated"])
+    assert "days" in data
+    assert data["days"][0]["date"] == "2025-01-01"
+
+
+def test_save_history_merges_overlapping_runs_by_fetch_time(data_files):
+    # A full-horizon run fetched both dates, a focused run fetched one of them later but finished first
+    persist.save_history({"2125-01-01": {"10:15": []}}, {"2125-01-01": "2125-01-01T10:05:00+01:00"})
+    persist.save_history(
+        {"2125-01-01": {"10:15": [77394]}, "2125-01-02": {"10:15": [77395]}},
+        {"2125-01-01": "2125-01-01T10:00:00+01:00", "2125-01-02": "2125-01-01T10:01:00+01:00"},
+    )
+
+    with open(data_files / "availability.json") as f:
+        saved = json.load(f)
+    assert saved["availability"] == {"2125-01-01": {"10:15": []}, "2125-01-02": {"10:15": [77395]}}
+    assert saved["fetched_at"]["2125-01-01"] == "2125-01-01T10:05:00+01:00"
+    assert persist.load_history() == saved["availability"]
+
+
+def test_save_report_keeps_dates_of_other_runs_and_drops_past_ones(data_files):
+    persist.save_report(
+        [
+            DayAvailability(date="2020-01-01", slots=[], new_count=0, free_slots_map={}),
+            DayAvailability(date="2125-01-02", slots=[], new_count=0, free_slots_map={}, fetched_at="2125-01-01"),
+        ]
+    )
+    ours = [DayAvailability(date="2125-01-01", slots=[], new_count=0, free_slots_map={}, fetched_at="2125-01-01")]
+    days = persist.save_report(ours)
+
+    assert [d.date for d in days] == ["2125-01-01", "2125-01-02"]
+    # The day passed in is returned as is, the one of the other run is read from the file
+    assert days[0] is ours[0] and isinstance(days[1], DayAvailability)
+
+
+def test_concurrent_saves_lose_no_dates(data_files):
+    def save(day):
+        date_str = f"2125-01-{day:02d}"
+        persist.save_history({date_str: {}}, {date_str: datetime.now().astimezone().isoformat()})
+
+    threads = [threading.Thread(target=save, args=(day,)) for day in range(1, 21)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(persist.load_history()) == 20
+
+
+def test_save_day_shards_writes_manifest_and_skips_unchanged(tmp_path):
+    days_dir = tmp_path / "days"
+    manifest_file = tmp_path / "manifest.json"
+    with patch.multiple(
+        "eversports_scraper.persist.config",
+        DATA_DIR=str(tmp_path),
+        STATE_DIR=str(tmp_path / ".state"),
+        DAYS_DIR=str(days_dir),
+        MANIFEST_FILE=str(manifest_file),
+    ):
+        day1 = DayAvailability(date="2025-01-01", slots=[], new_count=0, free_slots_map={})
+        day2 = DayAvailability(date="2025-01-02", slots=[], new_count=0, free_slots_map={"10:15": [77394]})
+        persist.save_day_shards([day1, day2])
+
+        manifest = json.loads(manifest_file.read_text())
+        assert [d["date"] for d in manifest["days"]] == ["2025-01-01", "2025-01-02"]
+        assert len(list(days_dir.iterdir())) == 2
+
+        first_file = days_dir / manifest["days"][0]["file"].split("/")[-1]
+        mtime = first_file.stat().st_mtime_ns
+
+        # Only the second day changes; the first day's file must not be rewritten
+        day2_changed = DayAvailability(date="2025-01-02", slots=[], new_count=0, free_slots_map={})
+        persist.save_day_shards([day1, day2_changed])
+
+        new_manifest = json.loads(manifest_file.read_text())
+        assert new_manifest["days"][0]["hash"] == manifest["days"][0]["hash"]
+        assert new_manifest["days"][1]["hash"] != manifest["days"][1]["hash"]
+        assert first_file.stat().st_mtime_ns == mtime
+        # The stale shard of the changed day is pruned
+        assert len(list(days_dir.iterdir())) == 2
+
+
+def test_save_day_shards_keeps_the_file_of_a_day_fetched_again_unchanged(tmp_path):
+    days_dir = tmp_path / "days"
+    manifest_file = tmp_path / "manifest.json"
+    with patch.multiple(
+        "eversports_scraper.persist.config",
+        DATA_DIR=str(tmp_path),
+        STATE_DIR=str(tmp_path / ".state"),
+        DAYS_DIR=str(days_dir),
+        MANIFEST_FILE=str(manifest_file),
+    ):
+        free = {"10:15": [77394]}
+        persist.save_day_shards(
+            [
+                DayAvailability(
+                    date="2099-01-01", slots=[], new_count=0, free_slots_map=free, fetched_at="2098-12-31T10:00"
+                )
+            ]
+        )
+        (shard,) = days_dir.iterdir()
+        mtime = shard.stat().st_mtime_ns
+        persist.save_day_shards(
+            [
+                DayAvailability(
+                    date="2099-01-01", slots=[], new_count=0, free_slots_map=free, fetched_at="2098-12-31T10:05"
+                )
+            ]
+        )
+
+        assert list(days_dir.iterdir()) == [shard]
+        assert shard.stat().st_mtime_ns == mtime
+        assert "fetched_at" not in json.loads(shard.read_text())
+        assert json.loads(manifest_file.read_text())["days"][0]["fetched_at"] == "2098-12-31T10:05"
+
+
+def test_save_day_shards_prunes_only_after_replacing_the_manifest(tmp_path):
+    days_dir = tmp_path / "days"
+    manifest_file = tmp_path / "manifest.json"
+    write = persist.write_json_atomic
+    present_at_manifest_write = []
+
+    def write_json_atomic(path, data, indent=2):
+        if path == str(manifest_file):
+            present_at_manifest_write.append(sorted(p.name for p in days_dir.iterdir()))
+        write(path, data, indent)
+
+    with patch.multiple(
+        "eversports_scraper.persist.config",
+        DATA_DIR=str(tmp_path),
+        STATE_DIR=str(tmp_path / ".state"),
+        DAYS_DIR=str(days_dir),
+        MANIFEST_FILE=str(manifest_file),
+    ), patch("eversports_scraper.persist.write_json_atomic", side_effect=write_json_atomic):
+        persist.save_day_shards([DayAvailability(date="2025-01-01", slots=[], new_count=0, free_slots_map={})])
+        persist.save_day_shards([DayAvailability(date="2025-01-01", slots=[], new_count=1, free_slots_map={})])
+
+    # The old day file was still there for readers of the old manifest, and is gone afterwards
+    assert len(present_at_manifest_write[1]) == 2
+    assert len(list(days_dir.iterdir())) == 1
+
+
+def test_checkpoint_round_trip(tmp_path):
+    with patch("eversports_scraper.persist.config.CHECKPOINT_FILE", str(tmp_path / "checkpoint.json")):
+        assert persist.load_checkpoint() == []
+        persist.save_checkpoint(["2125-01-02", "2125-01-03"])
+        assert persist.load_checkpoint() == ["2125-01-02", "2125-01-03"]
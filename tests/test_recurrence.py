@@ -0,0 +1,56 @@
+from datetime import date
+
+from eversports_scraper import recurrence
+from eversports_scraper.models import RecurrenceRule
+
+
+def test_is_rule_row():
+    assert recurrence.is_rule_row(["every Tue Thu", "18:00", "21:00"])
+    assert recurrence.is_rule_row(["Jeden Di/Do"])
+    assert not recurrence.is_rule_row(["26.11.2025", "18:00", "21:00"])
+    assert not recurrence.is_rule_row([])
+
+
+def test_parse_rule_row_full():
+    rule = recurrence.parse_rule_row(
+        ["every Tue, Thu", "18:00", "21:00", "01.11.2026", "31.12.2026", "24.12.2026; 31.12.2026"]
+    )
+
+    assert rule == RecurrenceRule(
+        weekdays=[1, 3],
+        start_time="18:00",
+        end_time="21:00",
+        valid_from="2026-11-01",
+        valid_until="2026-12-31",
+        exclusions=["2026-12-24", "2026-12-31"],
+    )
+
+
+def test_parse_rule_row_minimal_and_german():
+    rule = recurrence.parse_rule_row(["jeden Sa+So"])
+
+    assert rule.weekdays == [5, 6]
+    assert rule.start_time is None
+    assert rule.valid_from is None
+
+
+def test_parse_rule_row_invalid():
+    assert recurrence.parse_rule_row(["every someday"]) is None
+    assert recurrence.parse_rule_row(["every Tue", "25:99"]) is None
+
+
+def test_expand_within_horizon_and_validity():
+    rules = [
+        RecurrenceRule(weekdays=[1, 3], start_time="18:00", end_time="21:00", exclusions=["2026-11-05"]),
+        RecurrenceRule(weekdays=[5], valid_from="2026-11-14"),
+    ]
+
+    # 2026-11-02 is a Monday; two weeks of horizon
+    targets = list(recurrence.CalendarIndex(rules).expand(date(2026, 11, 2), 14))
+
+    assert [(t.date, t.start_time) for t in targets] == [
+        ("2026-11-03", "18:00"),
+        ("2026-11-10", "18:00"),
+        ("2026-11-12", "18:00"),
+        ("2026-11-14", None),
+    ]
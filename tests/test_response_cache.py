@@ -0,0 +1,108 @@
+import os
+import threading
+import time
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from eversports_scraper import metrics
+from eversports_scraper.response_cache import ResponseCache
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def _cache(tmp_path, **kwargs):
+    defaults = dict(max_entries=10, ttl_near=60, ttl_far=600, far_days=10, stale_seconds=60)
+    defaults.update(kwargs)
+    return ResponseCache(directory=str(tmp_path), **defaults)
+
+
+def test_ttl_grows_with_distance():
+    cache = ResponseCache(directory="unused", ttl_near=60, ttl_far=600, far_days=10)
+    today = date(2125, 1, 1)
+
+    assert cache.ttl_for("2125-01-01", today) == 60
+    assert cache.ttl_for("2125-01-06", today) == 330
+    assert cache.ttl_for("2125-03-01", today) == 600
+    # Past dates are treated like today
+    assert cache.ttl_for("2124-12-30", today) == 60
+
+
+def test_fresh_entry_is_served_without_fetching(tmp_path):
+    cache = _cache(tmp_path)
+    fetch = MagicMock(return_value={"slots": [1]})
+
+    assert cache.get("k", "2125-01-01", fetch) == {"slots": [1]}
+    assert cache.get("k", "2125-01-01", fetch) == {"slots": [1]}
+
+    fetch.assert_called_once()
+    assert metrics.snapshot() == {"response_cache.hit": 1, "response_cache.miss": 1}
+
+
+def test_failed_fetch_is_not_cached(tmp_path):
+    cache = _cache(tmp_path)
+    fetch = MagicMock(side_effect=[None, {"slots": []}])
+
+    assert cache.get("k", "2125-01-01", fetch) is None
+    assert cache.get("k", "2125-01-01", fetch) == {"slots": []}
+
+
+def test_stale_entry_is_served_while_revalidating(tmp_path):
+    cache = _cache(tmp_path)
+    today = date.today().isoformat()
+    cache.get("k", today, lambda: {"version": 1})
+
+    release = threading.Event()
+
+    def slow_fetch():
+        release.wait(5)
+        return {"version": 2}
+
+    # Just past the 60s TTL but within the stale window
+    with patch("eversports_scraper.response_cache.time.time", return_value=time.time() + 90):
+        assert cache.get("k", today, slow_fetch) == {"version": 1}
+    release.set()
+    cache.drain(timeout=5)
+
+    assert cache.get("k", today, lambda: {"version": 3}) == {"version": 2}
+    assert metrics.snapshot()["response_cache.stale"] == 1
+
+
+def test_expired_entry_beyond_stale_window_is_fetched_inline(tmp_path):
+    cache = _cache(tmp_path)
+    today = date.today().isoformat()
+    cache.get("k", today, lambda: {"version": 1})
+
+    with patch("eversports_scraper.response_cache.time.time", return_value=time.time() + 500):
+        assert cache.get("k", today, lambda: {"version": 2}) == {"version": 2}
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = _cache(tmp_path, max_entries=2)
+    cache.get("a", "2125-01-01", lambda: {"a": 1})
+    cache.get("b", "2125-01-01", lambda: {"b": 1})
+    # Make "b" the least recently used
+    os.utime(cache._path("b"), (0, 0))
+
+    cache.get("c", "2125-01-01", lambda: {"c": 1})
+
+    assert len(os.listdir(tmp_path)) == 2
+    assert not os.path.exists(cache._path("b"))
+    assert metrics.snapshot()["response_cache.evicted"] == 1
+
+
+def test_zero_max_entries_disables_cache(tmp_path):
+    cache = _cache(tmp_path, max_entries=0)
+    fetch = MagicMock(return_value={"slots": []})
+
+    cache.get("k", "2125-01-01", fetch)
+    cache.get("k", "2125-01-01", fetch)
+
+    assert fetch.call_count == 2
+    assert not os.listdir(tmp_path)
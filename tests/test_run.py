@@ -1,15 +1,40 @@
 from unittest.mock import MagicMock, patch
 
-from eversports_scraper.models import DayAvailability, Slot, TargetInterval
+import pytest
+
+from eversports_scraper.errors import NoTargetDatesError
+from eversports_scraper.models import DayAvailability, Slot, Subscription, TargetInterval
 from eversports_scraper.run import (
     _parse_target_date_row,
     fetch_target_dates,
     filter_future_dates,
+    get_subscriber_targets,
     has_time_overlap,
+    prioritize_targets,
     run,
 )
 
 
+@pytest.fixture(autouse=True)
+def isolated_outbox(tmp_path):
+    with patch.multiple(
+        "eversports_scraper.config",
+        OUTBOX_FILE=str(tmp_path / "outbox.json"),
+        NOTIFY_INDEX_FILE=str(tmp_path / "notify_index.json"),
+        SUBSCRIPTIONS_FILE=str(tmp_path / "subscriptions.json"),
+        TELEGRAM_CHAT_ID="fake_chat_id",
+        SHEET_CACHE_DIR=str(tmp_path / "sheets"),
+        RESPONSE_CACHE_DIR=str(tmp_path / "responses"),
+        METRICS_FILE=str(tmp_path / "metrics.json"),
+        LATENCY_FILE=str(tmp_path / "latency.json"),
+        CHECKPOINT_FILE=str(tmp_path / "checkpoint.json"),
+        ARCHIVE_DIR=str(tmp_path / "archive"),
+        CATALOG_DISCOVERY=False,
+        ASYNC_FETCH=False,
+    ), patch("eversports_scraper.response_cache._cache", None):
+        yield
+
+
 def test_parse_target_date_row_valid():
     row = ["26.11.2025", "10:00", "12:00"]
     result = _parse_target_date_row(row)
@@ -54,6 +79,55 @@ def test_fetch_target_dates_failure(mock_get):
     assert dates == []
 
 
+def _csv_response(text, status_code=200, headers=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.text = text
+    response.headers = headers or {}
+    response.raise_for_status.return_value = None
+    return response
+
+
+@patch("eversports_scraper.run.requests.get")
+def test_fetch_target_dates_revalidates_with_etag(mock_get):
+    mock_get.return_value = _csv_response("21.11.2125", headers={"ETag": '"v1"', "Last-Modified": "Mon"})
+    assert [d.date for d in fetch_target_dates("http://fake.url")] == ["2125-11-21"]
+
+    mock_get.return_value = _csv_response("", status_code=304)
+    dates = fetch_target_dates("http://fake.url")
+
+    assert [d.date for d in dates] == ["2125-11-21"]
+    sent_headers = mock_get.call_args.kwargs["headers"]
+    assert sent_headers["If-None-Match"] == '"v1"'
+    assert sent_headers["If-Modified-Since"] == "Mon"
+
+
+@patch("eversports_scraper.run._parse_target_csv")
+@patch("eversports_scraper.run.requests.get")
+def test_fetch_target_dates_skips_parse_for_unchanged_content(mock_get, mock_parse):
+    mock_parse.return_value = ([TargetInterval(date="2125-11-21")], [])
+    mock_get.return_value = _csv_response("21.11.2125")
+
+    fetch_target_dates("http://fake.url")
+    dates = fetch_target_dates("http://fake.url")
+
+    mock_parse.assert_called_once()
+    assert [d.date for d in dates] == ["2125-11-21"]
+
+
+@patch("eversports_scraper.run.requests.get")
+def test_fetch_target_dates_serves_last_good_copy_on_failure(mock_get):
+    mock_get.return_value = _csv_response("21.11.2125,18:00,20:00")
+    fetch_target_dates("http://fake.url")
+
+    mock_get.return_value = None
+    mock_get.side_effect = Exception("Sheet unavailable")
+    dates = fetch_target_dates("http://fake.url")
+
+    assert len(dates) == 1
+    assert dates[0].start_time == "18:00"
+
+
 @patch("eversports_scraper.run.requests.get")
 def test_fetch_target_dates_with_header(mock_get):
     """Test parsing CSV with header row."""
@@ -220,11 +294,16 @@ def test_has_time_overlap_edge_cases():
     assert not has_time_overlap("21:15", target)  # After interval
     assert not has_time_overlap("15:00", target)  # Before interval
 
+    # Longer slots reach further into the interval
+    assert has_time_overlap("16:15", target, duration=60)
+    assert not has_time_overlap("16:00", target, duration=60)
+
 
 @patch("eversports_scraper.run.fetch_target_dates")
 @patch("eversports_scraper.run.scraper.get_all_slots")
 @patch("eversports_scraper.run.scraper.get_day_availability")
-@patch("eversports_scraper.run.telegram_notifier.send_telegram_message")
+@patch("eversports_scraper.notifiers.config.TELEGRAM_BOT_TOKEN", "fake_token")
+@patch("eversports_scraper.notifiers.telegram_notifier.send_telegram_message")
 @patch("eversports_scraper.run.persist.save_history")
 @patch("eversports_scraper.run.persist.save_report")
 @patch("eversports_scraper.run.persist.load_history")
@@ -255,7 +334,8 @@ def test_main_flow(
         run(start_date=None, days=3)
 
         mock_fetch_dates.assert_called_once()
-        mock_get_slots.assert_called_once()
+        # The slot grid is derived for each scraped day
+        mock_get_slots.assert_any_call("2125-01-01")
         mock_get_day.assert_called()
         mock_load_history.assert_called()
         mock_save_history.assert_called()
@@ -266,7 +346,8 @@ def test_main_flow(
 @patch("eversports_scraper.run.fetch_target_dates")
 @patch("eversports_scraper.run.scraper.get_all_slots")
 @patch("eversports_scraper.run.scraper.get_day_availability")
-@patch("eversports_scraper.run.telegram_notifier.send_telegram_message")
+@patch("eversports_scraper.notifiers.config.TELEGRAM_BOT_TOKEN", "fake_token")
+@patch("eversports_scraper.notifiers.telegram_notifier.send_telegram_message")
 @patch("eversports_scraper.run.persist.save_history")
 @patch("eversports_scraper.run.persist.save_report")
 @patch("eversports_scraper.run.persist.load_history")
@@ -298,7 +379,8 @@ def test_main_flow_manual_override(
 @patch("eversports_scraper.run.fetch_target_dates")
 @patch("eversports_scraper.run.scraper.get_all_slots")
 @patch("eversports_scraper.run.scraper.get_day_availability")
-@patch("eversports_scraper.run.telegram_notifier.send_telegram_message")
+@patch("eversports_scraper.notifiers.config.TELEGRAM_BOT_TOKEN", "fake_token")
+@patch("eversports_scraper.notifiers.telegram_notifier.send_telegram_message")
 @patch("eversports_scraper.run.persist.save_history")
 @patch("eversports_scraper.run.persist.save_report")
 @patch("eversports_scraper.run.persist.load_history")
@@ -330,7 +412,8 @@ def test_main_flow_csv_fallback(
 @patch("eversports_scraper.run.fetch_target_dates")
 @patch("eversports_scraper.run.scraper.get_all_slots")
 @patch("eversports_scraper.run.scraper.get_day_availability")
-@patch("eversports_scraper.run.telegram_notifier.send_telegram_message")
+@patch("eversports_scraper.notifiers.config.TELEGRAM_BOT_TOKEN", "fake_token")
+@patch("eversports_scraper.notifiers.telegram_notifier.send_telegram_message")
 def test_main_no_new_slots(mock_send_telegram, mock_get_day, mock_get_slots, mock_fetch_dates):
     mock_fetch_dates.return_value = [TargetInterval(date="2125-01-01", start_time=None, end_time=None)]
     mock_get_slots.return_value = ["10:00"]
@@ -349,7 +432,8 @@ def test_main_no_new_slots(mock_send_telegram, mock_get_day, mock_get_slots, moc
 @patch("eversports_scraper.run.fetch_target_dates")
 @patch("eversports_scraper.run.scraper.get_all_slots")
 @patch("eversports_scraper.run.scraper.get_day_availability")
-@patch("eversports_scraper.run.telegram_notifier.send_telegram_message")
+@patch("eversports_scraper.notifiers.config.TELEGRAM_BOT_TOKEN", "fake_token")
+@patch("eversports_scraper.notifiers.telegram_notifier.send_telegram_message")
 @patch("eversports_scraper.run.persist.save_history")
 @patch("eversports_scraper.run.persist.save_report")
 @patch("eversports_scraper.run.persist.load_history")
@@ -394,8 +478,8 @@ def test_notification_filtered_by_time(
 
 
 @patch("eversports_scraper.run.fetch_target_dates")
-def test_run_exits_gracefully_when_no_future_dates(mock_fetch_dates):
-    """Test that the scraper exits gracefully with code 0 when only past dates exist."""
+def test_run_raises_no_target_dates_when_no_future_dates(mock_fetch_dates):
+    """Test that a run without future dates raises instead of exiting the process."""
     # Mock fetch_target_dates to return only past dates
     mock_fetch_dates.return_value = [
         TargetInterval(date="2020-01-01", start_time=None, end_time=None),
@@ -403,9 +487,141 @@ def test_run_exits_gracefully_when_no_future_dates(mock_fetch_dates):
     ]
 
     with patch("eversports_scraper.run.config.TARGET_DATES_CSV_URL", "http://mock.url"):
-        with patch("sys.exit") as mock_exit:
+        with pytest.raises(NoTargetDatesError):
             run(start_date=None, days=3)
 
-            # Should exit with code 0 (success)
-            mock_exit.assert_called_once_with(0)
 
+@patch("eversports_scraper.run.fetch_target_dates")
+@patch("eversports_scraper.run.scraper.get_all_slots")
+@patch("eversports_scraper.run.scraper.get_day_availability")
+@patch("eversports_scraper.notifiers.config.TELEGRAM_BOT_TOKEN", "fake_token")
+@patch("eversports_scraper.notifiers.telegram_notifier.send_telegram_message")
+@patch("eversports_scraper.run.persist.save_history")
+@patch("eversports_scraper.run.persist.save_report")
+@patch("eversports_scraper.run.persist.load_history")
+def test_multiple_subscribers_share_one_scrape(
+    mock_load_history,
+    mock_save_report,
+    mock_save_history,
+    mock_send_telegram,
+    mock_get_day,
+    mock_get_slots,
+    mock_fetch_dates,
+):
+    from eversports_scraper import subscriptions
+    from eversports_scraper.models import Subscription
+
+    subscriptions.save_subscriptions(
+        [
+            Subscription(name="alice", sheet_url="http://sheet/a", chat_id="1"),
+            Subscription(name="bob", sheet_url="http://sheet/b", chat_id="2"),
+        ]
+    )
+    # Both subscribers watch the same date
+    mock_fetch_dates.return_value = [TargetInterval(date="2125-01-01", start_time="10:00", end_time="12:00")]
+    mock_get_slots.return_value = ["10:15"]
+    mock_load_history.return_value = {}
+    mock_get_day.return_value = DayAvailability(
+        date="2125-01-01",
+        slots=[Slot(time="10:15", courts=["Court 1"], court_ids=[77394], is_new=True)],
+        new_count=1,
+        free_slots_map={"10:15": [77394]},
+    )
+    mock_send_telegram.return_value = True
+
+    run(start_date=None, days=3)
+
+    assert mock_fetch_dates.call_count == 2
+    mock_get_day.assert_called_once()
+    assert sorted(c.kwargs["chat_id"] for c in mock_send_telegram.call_args_list) == ["1", "2"]
+
+
+@patch("eversports_scraper.run.requests.get")
+def test_fetch_target_dates_expands_recurrence_rules(mock_get):
+    mock_get.return_value = _csv_response(
+        "Date,Start,End\n21.11.2125,10:00,12:00\nevery Mon Tue Wed Thu Fri Sat Sun,18:00,20:00"
+    )
+
+    with patch("eversports_scraper.run.config.TARGET_HORIZON_DAYS", 5):
+        dates = fetch_target_dates("http://fake.url")
+
+    assert dates[0].date == "2125-11-21"
+    # One rule row covers every day of the horizon
+    assert len(dates) == 6
+    assert all(d.start_time == "18:00" for d in dates[1:])
+
+
+@patch("eversports_scraper.run.fetch_target_dates")
+def test_get_subscriber_targets_adds_watched_dates(mock_fetch_dates):
+    mock_fetch_dates.return_value = [TargetInterval(date="2125-01-01")]
+    watched = TargetInterval(date="2125-01-03", start_time="19:00", end_time="21:00")
+    past = TargetInterval(date="2020-01-01", start_time="19:00", end_time="21:00")
+    subs = [
+        Subscription(name="alice", sheet_url="http://sheet/a", targets=[watched]),
+        Subscription(name="chat-42", chat_id="42", targets=[watched, past]),
+    ]
+
+    targets = get_subscriber_targets(subs, None, 3)
+
+    assert targets["alice"] == [TargetInterval(date="2125-01-01"), watched]
+    assert targets["chat-42"] == [watched]
+
+
+def test_prioritize_targets_puts_skipped_then_windowed_dates_first():
+    targets = [
+        TargetInterval(date="2125-01-01"),
+        TargetInterval(date="2125-01-03", start_time="18:00", end_time="20:00"),
+        TargetInterval(date="2125-01-02", start_time="18:00", end_time="20:00"),
+        TargetInterval(date="2125-01-04"),
+    ]
+
+    assert [t.date for t in prioritize_targets(targets, [])] == ["2125-01-02", "2125-01-03", "2125-01-01", "2125-01-04"]
+    assert [t.date for t in prioritize_targets(targets, ["2125-01-04"])][:2] == ["2125-01-04", "2125-01-02"]
+
+
+@patch("eversports_scraper.run.scraper.get_all_slots")
+@patch("eversports_scraper.run.scraper.get_day_availability")
+@patch("eversports_scraper.run.persist.save_history")
+@patch("eversports_scraper.run.persist.load_history")
+def test_run_stops_at_deadline_and_resumes_skipped_dates(
+    mock_load_history, mock_save_history, mock_get_day, mock_get_slots
+):
+    mock_get_slots.return_value = ["10:15"]
+    mock_load_history.return_value = {"2125-01-02": {"10:15": [77394]}}
+    mock_get_day.side_effect = lambda date_str, *args: DayAvailability(
+        date=date_str, slots=[], new_count=0, free_slots_map={}
+    )
+
+    # A budget smaller than the reserve for saving leaves no time to fetch
+    outcome = run(start_date="2125-01-01", days=3, deadline=1)
+
+    mock_get_day.assert_not_called()
+    assert outcome.skipped_dates == ["2125-01-01", "2125-01-02", "2125-01-03"]
+    mock_save_history.assert_called_once_with({"2125-01-02": {"10:15": [77394]}}, {})
+
+    with patch("eversports_scraper.run.persist.load_checkpoint", return_value=["2125-01-03"]):
+        outcome = run(start_date="2125-01-01", days=3)
+
+    assert [c.args[0] for c in mock_get_day.call_args_list] == ["2125-01-03", "2125-01-01", "2125-01-02"]
+    assert outcome.skipped_dates == []
+
+
+@patch("eversports_scraper.run.scraper.get_all_slots", return_value=["10:15", "11:00"])
+@patch("eversports_scraper.run.scraper.get_day_availability")
+@patch("eversports_scraper.run.async_fetch.fetch_all")
+@patch("eversports_scraper.run.persist.load_history", return_value={})
+def test_run_prefetches_dates_concurrently_when_available(mock_load_history, mock_fetch_all, mock_get_day, mock_slots):
+    mock_fetch_all.return_value = {
+        "2125-01-01": {"slots": [{"date": "2125-01-01", "court": 77394, "start": "1015", "end": "1100"}]},
+        "2125-01-02": None,
+    }
+
+    with patch("eversports_scraper.run.async_fetch.available", return_value=True):
+        outcome = run(start_date="2125-01-01", days=2)
+
+    assert mock_fetch_all.call_args.args[0] == ["2125-01-01", "2125-01-02"]
+    mock_get_day.assert_not_called()
+    # The failed fetch keeps no day, the fetched one has the booked court missing at 10:15
+    assert [d.date for d in outcome.day_availabilities] == ["2125-01-01"]
+    assert 77394 not in outcome.day_availabilities[0].free_slots_map["10:15"]
+    assert 77394 in outcome.day_availabilities[0].free_slots_map["11:00"]
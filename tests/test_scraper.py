@@ -7,11 +7,19 @@ import pytest
 from eversports_scraper import config, scraper
 
 
+@pytest.fixture(autouse=True)
+def isolated_response_cache(tmp_path):
+    with patch("eversports_scraper.response_cache._cache", None), patch(
+        "eversports_scraper.config.RESPONSE_CACHE_DIR", str(tmp_path / "responses")
+    ):
+        yield
+
+
 @pytest.fixture
 def mock_response():
     mock = MagicMock()
     mock.status_code = 200
-    mock.json.return_value = {"slots": []}
+    mock.iter_content.return_value = [b'{"slots": []}']
     return mock
 
 
@@ -49,13 +57,14 @@ def test_fetch_booked_slots_success(mock_create_scraper):
     mock_scraper = MagicMock()
     mock_response = MagicMock()
     mock_response.status_code = 200
-    mock_response.json.return_value = {"slots": []}
+    mock_response.iter_content.return_value = [b'{"slots": []}']
     mock_response.raise_for_status.return_value = None
     mock_scraper.get.return_value = mock_response
     mock_create_scraper.return_value = mock_scraper
 
     data = scraper.fetch_booked_slots("2025-01-01")
-    assert data == {"slots": []}
+    assert data["slots"] == []
+    assert datetime.fromisoformat(data["fetched_at"]).tzinfo is not None
 
 
 @patch("eversports_scraper.scraper.cloudscraper.create_scraper")
@@ -68,6 +77,82 @@ def test_fetch_booked_slots_failure(mock_create_scraper):
     assert data is None
 
 
+@patch("eversports_scraper.scraper.cloudscraper.create_scraper")
+def test_fetch_booked_slots_reuses_cached_response(mock_create_scraper, mock_scraper_obj):
+    mock_create_scraper.return_value = mock_scraper_obj
+
+    first = scraper.fetch_booked_slots("2125-01-01")
+    # The cached copy keeps the time of the original fetch
+    assert scraper.fetch_booked_slots("2125-01-01") == first
+    assert first["slots"] == []
+
+    assert mock_scraper_obj.get.call_count == 1
+
+
+@patch("eversports_scraper.scraper.metrics.increment")
+@patch("eversports_scraper.scraper.cloudscraper.create_scraper")
+def test_fetch_booked_slots_streams_and_validates_records(mock_create_scraper, mock_increment, mock_scraper_obj):
+    body = json.dumps(
+        {
+            "facility": {"name": "x"},
+            "slots": [
+                {"date": "2125-01-01", "start": "1015", "court": 77394, "title": None, "booking": {"id": 1}},
+                {"date": "2125-01-01", "start": "1100", "court": 77395, "duration": 90},
+                {"date": "2125-01-01", "start": "10:15", "court": 77394},
+                {"date": "2125-01-01", "start": "1100"},
+                "garbage",
+            ],
+            "after": [1, 2],
+        }
+    ).encode()
+    # Split the body mid-record
+    mock_scraper_obj.get.return_value.iter_content.return_value = [body[i : i + 7] for i in range(0, len(body), 7)]
+    mock_create_scraper.return_value = mock_scraper_obj
+
+    data = scraper.fetch_booked_slots("2125-01-01")
+
+    assert data["slots"] == [
+        {"date": "2125-01-01", "court": 77394, "start": "1015", "end": "1100"},
+        {"date": "2125-01-01", "court": 77395, "start": "1100", "end": "1230"},
+    ]
+    mock_increment.assert_any_call("malformed_bookings", 3)
+
+
+@pytest.mark.parametrize(
+    "record, expected",
+    [
+        ({"start": "930"}, {"start": "0930", "end": "1015"}),
+        ({"start": "930", "end": "1000"}, {"start": "0930", "end": "1000"}),
+        ({"start": "2460"}, None),
+        ({"start": "2415"}, None),
+        ({"start": "1015", "end": "99"}, None),
+    ],
+)
+def test_validate_booking_accepts_only_times_of_day(record, expected):
+    booking = scraper.validate_booking({"date": "2125-01-01", "court": 77394, **record})
+
+    assert booking == (expected and {"date": "2125-01-01", "court": 77394, **expected})
+
+
+@pytest.mark.parametrize("body", [b'{"error": "rate limited"}', b'{"slots": [{"date": "2125-01-01", "start": "1015"'])
+@patch("eversports_scraper.scraper.cloudscraper.create_scraper")
+def test_fetch_booked_slots_rejects_missing_or_truncated_slots(mock_create_scraper, body, mock_scraper_obj):
+    mock_scraper_obj.get.return_value.iter_content.return_value = [body]
+    mock_create_scraper.return_value = mock_scraper_obj
+
+    assert scraper.fetch_booked_slots("2125-01-01") is None
+
+
+def test_iter_json_array_decodes_utf8_split_across_chunks():
+    body = '{"slots": [{"title": "Platz Süd"}, {"title": "Ärger"}]}'.encode()
+    chunks = [body[i : i + 1] for i in range(len(body))]
+
+    assert list(scraper.iter_json_array(scraper._decode_chunks(chunks), "slots")) == [
+        {"title": "Platz Süd"},
+        {"title": "Ärger"},
+    ]
+
+
 def test_parse_booked_slots():
     all_slots = ["10:15", "11:00"]
     date_str = "2025-01-01"
@@ -106,6 +191,34 @@ def test_parse_booked_slots_complex(slots_data_from_api):
     assert len(result["11:00"]) == 1
 
 
+def test_parse_booked_slots_maps_durations_onto_grid():
+    all_slots = scraper.get_all_slots()  # 10:15, 11:00, 11:45, 12:30, ...
+    data = {
+        "slots": [
+            {"date": "2025-01-01", "start": "1015", "court": 1, "duration": 90},
+            {"date": "2025-01-01", "start": "1130", "court": 2, "end": "1200"},
+            {"date": "2025-01-01", "start": "1245", "court": 3},
+            {"date": "2025-01-01", "start": "0800", "court": 4, "end": "0900"},
+        ]
+    }
+
+    result = scraper.parse_booked_slots(data, "2025-01-01", all_slots)
+
+    assert result["10:15"] == {1}
+    assert result["11:00"] == {1, 2}
+    assert result["11:45"] == {2}
+    # Off-grid start without an end defaults to one slot length
+    assert result["12:30"] == {3}
+    assert result["13:15"] == {3}
+    assert result["14:00"] == set()
+
+
+def test_get_all_slots_uses_opening_hours_per_day():
+    with patch.dict("eversports_scraper.scraper.config.OPENING_HOURS", {5: ("09:00", "12:00")}):
+        assert scraper.get_all_slots("2025-01-04") == ["09:00", "09:45", "10:30", "11:15"]  # Saturday
+        assert scraper.get_all_slots("2025-01-03")[0] == "10:15"
+
+
 def test_calculate_free_slots():
     all_slots = ["10:00"]
     # Assume COURT_IDS are [77394, 77395, 77396]
@@ -135,6 +248,15 @@ def test_get_day_availability(mock_fetch):
     assert result.new_count > 0  # Since history was empty, these are new
 
 
+@patch("eversports_scraper.scraper.fetch_booked_slots")
+def test_get_day_availability_keeps_the_response_fetch_time(mock_fetch):
+    mock_fetch.return_value = {"slots": [], "fetched_at": "2125-01-01T10:00:00+01:00"}
+
+    result = scraper.get_day_availability("2125-01-01", ["10:15"], {})
+
+    assert result.fetched_at == "2125-01-01T10:00:00+01:00"
+
+
 @patch("eversports_scraper.scraper.fetch_booked_slots")
 def test_get_day_availability_no_history(mock_fetch):
     """Test that all slots are marked as 'new' when there's no history (first run)."""
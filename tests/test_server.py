@@ -0,0 +1,148 @@
+import json
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer
+from unittest.mock import patch
+
+import pytest
+
+from eversports_scraper import server
+from eversports_scraper.models import DayAvailability, ScrapeOutcome, Slot
+
+NOW = datetime(2125, 1, 1, 18, 0).astimezone()
+
+
+def _day(date_str, free_slots_map, new_times=()):
+    slots = [
+        Slot(time=t, courts=[f"Court {cid - 77393}" for cid in ids], court_ids=ids, is_new=t in new_times)
+        for t, ids in sorted(free_slots_map.items())
+    ]
+    return DayAvailability(date=date_str, slots=slots, new_count=len(new_times), free_slots_map=free_slots_map)
+
+
+@pytest.fixture
+def index():
+    index = server.AvailabilityIndex(event_retention_minutes=60)
+    index.update(
+        [
+            _day("2125-01-02", {"10:15": [77394], "18:00": [77394, 77395]}, new_times={"18:00"}),
+            _day("2125-01-03", {"19:30": [77396]}),
+        ],
+        NOW,
+    )
+    return index
+
+
+@pytest.fixture
+def base_url(index):
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), server.make_handler(index))
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _get(url, headers=None):
+    request = urllib.request.Request(url, headers=headers or {})
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status, dict(response.headers), response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, dict(e.headers), e.read()
+
+
+def test_availability_for_date_is_precomputed(index):
+    body, etag = index.availability("2125-01-02")
+
+    assert (body, etag) == index.responses["2125-01-02"]
+    assert [s["time"] for s in json.loads(body)["slots"]] == ["10:15", "18:00"]
+
+
+def test_availability_filters_by_window_and_court(index):
+    body, _ = index.availability("2125-01-02", start="17:00", end="19:00", court=77395)
+
+    slots = json.loads(body)["slots"]
+    assert [(s["time"], s["court_ids"], s["courts"]) for s in slots] == [("18:00", [77395], ["Court 2"])]
+    # The filtered response is memoised until the next update
+    assert (
+        index.availability("2125-01-02", start="17:00", end="19:00", court=77395)
+        is index.queries[("2125-01-02", "17:00", "19:00", 77395)]
+    )
+
+
+def test_update_records_newly_free_courts(index):
+    assert [(e["date"], e["time"], e["court_id"]) for e in index.events] == [
+        ("2125-01-02", "18:00", 77394),
+        ("2125-01-02", "18:00", 77395),
+    ]
+
+    later = NOW + timedelta(minutes=5)
+    index.update([_day("2125-01-02", {"10:15": [77394, 77396], "18:00": [77394]}), _day("2125-01-03", {})], later)
+
+    assert [(e["time"], e["court_id"]) for e in index.new_since(NOW)] == [("10:15", 77396)]
+
+
+def test_events_expire_after_retention(index):
+    index.update([], NOW + timedelta(minutes=90))
+
+    assert index.events == []
+
+
+def test_health_reports_staleness(index):
+    assert index.health(NOW, interval=60)[0] == 200
+    status, body = index.health(NOW + timedelta(minutes=10), interval=60)
+    assert (status, body["status"]) == (503, "stale")
+    assert server.AvailabilityIndex().health(NOW)[1]["status"] == "starting"
+
+
+def test_scrape_loop_keeps_dates_that_were_skipped_or_failed(index):
+    stop = threading.Event()
+    fetched = _day("2125-01-04", {"10:15": [77394]})
+
+    def scrape(**kwargs):
+        stop.set()
+        return ScrapeOutcome({}, [fetched], [], skipped_dates=["2125-01-02"], failed_dates=["2125-01-03"])
+
+    with patch("eversports_scraper.server.run.run", side_effect=scrape):
+        server.scrape_loop(index, stop, interval=0)
+
+    assert sorted(index.days) == ["2125-01-02", "2125-01-03", "2125-01-04"]
+    assert index.availability("2125-01-03") is not None
+
+
+def test_http_availability_with_etag(base_url):
+    status, headers, body = _get(f"{base_url}/availability?date=2125-01-02&from=18:00&to=19:00")
+    assert status == 200
+    assert [s["time"] for s in json.loads(body)["slots"]] == ["18:00"]
+
+    status, _, body = _get(
+        f"{base_url}/availability?date=2125-01-02&from=18:00&to=19:00", {"If-None-Match": headers["ETag"]}
+    )
+    assert status == 304
+    assert body == b""
+
+
+def test_http_availability_all_dates_and_errors(base_url):
+    status, _, body = _get(f"{base_url}/availability?court=3")
+    assert status == 200
+    assert [(d["date"], len(d["slots"])) for d in json.loads(body)["days"]] == [("2125-01-02", 0), ("2125-01-03", 1)]
+
+    assert _get(f"{base_url}/availability?date=2125-02-01")[0] == 404
+    assert _get(f"{base_url}/availability?date=tomorrow")[0] == 400
+    assert _get(f"{base_url}/availability?court=9")[0] == 400
+    assert _get(f"{base_url}/nope")[0] == 404
+
+
+def test_http_new_since_and_health(base_url):
+    since = (NOW - timedelta(minutes=1)).isoformat()
+    status, _, body = _get(f"{base_url}/new-since?ts={urllib.parse.quote(since)}")
+    assert status == 200
+    assert len(json.loads(body)["slots"]) == 2
+
+    assert _get(f"{base_url}/new-since")[0] == 400
+    status, _, body = _get(f"{base_url}/health")
+    assert json.loads(body)["days"] == 2
@@ -0,0 +1,129 @@
+import json
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+
+from eversports_scraper import shards
+from eversports_scraper.models import TargetInterval
+
+DATES = [f"2125-01-{day:02d}" for day in range(1, 9)]
+
+
+@pytest.fixture(autouse=True)
+def isolated_state(tmp_path):
+    with patch.multiple(
+        "eversports_scraper.config",
+        SHARD_LEASE_DB=str(tmp_path / "leases.sqlite"),
+        SHARD_DIR=str(tmp_path / "shards"),
+        HISTORY_FILE=str(tmp_path / "availability.json"),
+        REPORT_FILE=str(tmp_path / "report.json"),
+        OUTBOX_FILE=str(tmp_path / "outbox.json"),
+        NOTIFY_INDEX_FILE=str(tmp_path / "notify_index.json"),
+        SUBSCRIPTIONS_FILE=str(tmp_path / "subscriptions.json"),
+        TELEGRAM_CHAT_ID="fake_chat_id",
+        METRICS_FILE=str(tmp_path / "metrics.json"),
+        LATENCY_FILE=str(tmp_path / "latency.json"),
+        CHECKPOINT_FILE=str(tmp_path / "checkpoint.json"),
+        ARCHIVE_DIR=str(tmp_path / "archive"),
+        CATALOG_DISCOVERY=False,
+        ASYNC_FETCH=False,
+    ):
+        yield
+
+
+@pytest.fixture
+def store():
+    store = shards.LeaseStore(lease_seconds=60, round_seconds=120)
+    yield store
+    store.close()
+
+
+def test_claim_excludes_other_workers_until_expiry_or_next_round(store):
+    assert store.claim("76443|2125-01-01", "a", now=1000)
+    assert not store.claim("76443|2125-01-01", "b", now=1010)
+    # An abandoned lease can be taken over
+    assert store.claim("76443|2125-01-01", "b", now=1061)
+
+    store.complete("76443|2125-01-01", "b", now=1070)
+    assert not store.claim("76443|2125-01-01", "a", now=1100)
+    assert store.claim("76443|2125-01-01", "a", now=1191)
+
+
+def test_release_lets_another_worker_retry(store):
+    assert store.claim("76443|2125-01-01", "a", now=1000)
+    store.release("76443|2125-01-01", "a")
+
+    assert store.claim("76443|2125-01-01", "b", now=1001)
+
+
+@patch("eversports_scraper.shards.scraper.get_all_slots", return_value=["10:15"])
+@patch("eversports_scraper.shards.scraper.fetch_free_slots")
+@patch("eversports_scraper.run.fetch_target_dates")
+def test_concurrent_workers_split_dates_without_double_fetching(mock_fetch_dates, mock_fetch, mock_slots):
+    mock_fetch_dates.return_value = [TargetInterval(date=d) for d in DATES]
+
+    def fetch(date_str, all_slots):
+        time.sleep(0.02)
+        return {"10:15": [77394]}, "2125-01-01T10:00:00+01:00"
+
+    mock_fetch.side_effect = fetch
+    results = {}
+
+    def worker(name):
+        results[name] = shards.work(worker=name, deadline=0)
+
+    with patch("eversports_scraper.run.config.TARGET_DATES_CSV_URL", "http://mock.url"):
+        threads = [threading.Thread(target=worker, args=(name,)) for name in ("a", "b", "c")]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert Counter(c.args[0] for c in mock_fetch.call_args_list) == Counter(DATES)
+    assert sorted(d for fetched in results.values() for d in fetched) == DATES
+    assert all(results.values())
+    # Partials keep the time of the fetch, which may have been served from the response cache
+    assert shards.load_partial(DATES[0])["fetched_at"] == "2125-01-01T10:00:00+01:00"
+
+
+@patch("eversports_scraper.notifiers.config.TELEGRAM_BOT_TOKEN", "fake_token")
+@patch("eversports_scraper.notifiers.telegram_notifier.send_telegram_message")
+@patch("eversports_scraper.run.persist.save_aggregates")
+@patch("eversports_scraper.run.persist.save_day_shards")
+@patch("eversports_scraper.run.scraper.get_all_slots", return_value=["10:15", "11:00"])
+@patch("eversports_scraper.run.fetch_target_dates")
+def test_merge_builds_history_and_report_from_partials(
+    mock_fetch_dates, mock_slots, mock_save_shards, mock_save_aggregates, mock_send, tmp_path
+):
+    mock_fetch_dates.return_value = [TargetInterval(date="2125-01-01"), TargetInterval(date="2125-01-02")]
+    shards.save_partial("2125-01-01", {"10:15": [77394], "11:00": []}, "a")
+    with open(tmp_path / "availability.json", "w") as f:
+        json.dump({"last_updated": "", "availability": {"2125-01-02": {"10:15": [77395]}}}, f)
+
+    with patch("eversports_scraper.run.config.TARGET_DATES_CSV_URL", "http://mock.url"):
+        outcome = shards.merge()
+
+    with open(tmp_path / "availability.json") as f:
+        history = json.load(f)["availability"]
+    # The date without a partial snapshot keeps its history
+    assert history == {"2125-01-01": {"10:15": [77394], "11:00": []}, "2125-01-02": {"10:15": [77395]}}
+    assert [d.date for d in outcome.day_availabilities] == ["2125-01-01"]
+    assert outcome.new_slots_data[0][0] == "2125-01-01"
+    mock_send.assert_called_once()
+
+
+def test_partial_day_availability_skips_merged_and_outdated_snapshots():
+    fetched_at = "2125-01-01T10:00:00+01:00"
+    now = datetime.fromisoformat("2125-01-01T10:01:00+01:00")
+    shards.save_partial("2125-01-01", {"10:15": [77394]}, "a", fetched_at)
+
+    day = shards.partial_day_availability("2125-01-01", ["10:15"], {}, "2125-01-01T09:58:00+01:00", now)
+    assert day is not None and day.fetched_at == fetched_at
+    # Merged by an earlier merge, or from a worker that stopped polling
+    assert shards.partial_day_availability("2125-01-01", ["10:15"], {}, fetched_at, now) is None
+    with patch("eversports_scraper.config.SHARD_PARTIAL_MAX_AGE_SECONDS", 30):
+        assert shards.partial_day_availability("2125-01-01", ["10:15"], {}, None, now) is None
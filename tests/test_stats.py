@@ -0,0 +1,91 @@
+import csv
+import time
+from unittest.mock import patch
+
+import pytest
+
+from eversports_scraper import archive, stats
+from eversports_scraper.models import DayAvailability
+
+np = pytest.importorskip("numpy")
+
+COURTS = [77394, 77395]
+
+
+@pytest.fixture
+def archive_dir(tmp_path):
+    """Three polls of Monday 2125-01-01: court 77394 at 18:30 gets booked, then cancelled 2 hours ahead."""
+    polls = [
+        ("2125-01-01T09:00:00", {"18:30": COURTS, "19:15": [77395]}),
+        ("2125-01-01T12:00:00", {"18:30": [77395], "19:15": [77395]}),
+        ("2125-01-01T16:30:00", {"18:30": COURTS, "19:15": [77395]}),
+    ]
+    with patch("eversports_scraper.archive.scraper.get_all_slots", return_value=["18:30", "19:15"]), patch(
+        "eversports_scraper.archive.config.COURT_IDS", COURTS
+    ), patch("eversports_scraper.persist.config.STATE_DIR", str(tmp_path)):
+        for fetched_at, free_slots_map in polls:
+            day = DayAvailability(
+                date="2125-01-01", slots=[], new_count=0, free_slots_map=free_slots_map, fetched_at=fetched_at
+            )
+            archive.append([day], archive_dir=str(tmp_path / "archive"))
+    return str(tmp_path / "archive")
+
+
+def test_heatmap_cancellations_and_lead_times(archive_dir):
+    columns = stats.load_columns(archive_dir)
+    slots, heatmap = stats.occupancy_heatmap(columns)
+    pairs = stats.transitions(columns)
+
+    assert slots == [18 * 60 + 30, 19 * 60 + 15]
+    assert heatmap[0].tolist() == pytest.approx([1 / 6, 1 / 2])
+    assert np.isnan(heatmap[1]).all()
+    # 77394 was booked at 18:30 once and at 19:15 twice, and only the 18:30 booking was cancelled
+    assert stats.cancellation_rates(pairs)[0] == pytest.approx(1 / 3)
+    assert stats.lead_times(pairs).tolist() == [2.0]
+    assert dict(stats.lead_time_distribution(stats.lead_times(pairs)))["<3h"] == 1
+
+
+def test_load_columns_ignores_incomplete_append(archive_dir):
+    with open(archive.column_path("free", archive_dir), "ab") as f:
+        f.write(b"\x01")
+
+    assert len(stats.load_columns(archive_dir)["free"]) == 12
+
+
+def test_main_exports_csv(archive_dir, tmp_path, capsys):
+    stats.main(csv_dir=str(tmp_path / "csv"), archive_dir=archive_dir)
+
+    assert "12 cells archived, 1 cancellations" in capsys.readouterr().out
+    with open(tmp_path / "csv" / "occupancy_heatmap.csv") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ["weekday", "18:30", "19:15"]
+    assert rows[1] == ["Mon", "0.1667", "0.5000"]
+
+
+def test_millions_of_cells_stay_fast(tmp_path):
+    count = 2_000_000
+    rng = np.random.default_rng(0)
+    directory = tmp_path / "archive"
+    directory.mkdir()
+    columns = {
+        "poll_time": (np.arange(count, dtype="<u4") // 1000) * 10,
+        "date": rng.integers(0, 60, count).astype("<i4"),
+        "slot": (615 + 45 * rng.integers(0, 17, count)).astype("<u2"),
+        "court": rng.choice(np.array(COURTS + [77396], dtype="<u4"), count),
+        "free": rng.integers(0, 2, count).astype("u1"),
+    }
+    for name, values in columns.items():
+        values.tofile(archive.column_path(name, str(directory)))
+    (directory / "columns.json").write_text(
+        '{"poll_time": "<u4", "date": "<i4", "slot": "<u2", "court": "<u4", "free": "u1"}'
+    )
+
+    started = time.perf_counter()
+    loaded = stats.load_columns(str(directory))
+    stats.occupancy_heatmap(loaded)
+    pairs = stats.transitions(loaded)
+    stats.cancellation_rates(pairs)
+    stats.lead_time_distribution(stats.lead_times(pairs))
+
+    assert time.perf_counter() - started < 10
+    assert isinstance(loaded["free"], np.memmap)
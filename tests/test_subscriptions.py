@@ -0,0 +1,104 @@
+import json
+from unittest.mock import patch
+
+from eversports_scraper import subscriptions
+from eversports_scraper.models import Slot, Subscription, TargetInterval
+from eversports_scraper.run import has_time_overlap
+
+ALICE = Subscription(name="alice", sheet_url="http://sheet/a", chat_id="1")
+BOB = Subscription(name="bob", sheet_url="http://sheet/b", chat_id="2", courts=[77396])
+
+
+def test_load_subscriptions_falls_back_to_default(tmp_path):
+    with patch.multiple(
+        "eversports_scraper.subscriptions.config",
+        SUBSCRIPTIONS_FILE=str(tmp_path / "missing.json"),
+        TARGET_DATES_CSV_URL="http://sheet/default",
+    ):
+        subs = subscriptions.load_subscriptions()
+
+    assert [s.name for s in subs] == ["default"]
+    assert subs[0].sheet_url == "http://sheet/default"
+
+
+def test_save_and_load_subscriptions(tmp_path):
+    path = tmp_path / "subscriptions.json"
+    with patch("eversports_scraper.subscriptions.config.SUBSCRIPTIONS_FILE", str(path)):
+        subscriptions.save_subscriptions([ALICE, BOB])
+        loaded = subscriptions.load_subscriptions()
+
+    assert loaded == [ALICE, BOB]
+    assert json.loads(path.read_text())["subscriptions"][1]["courts"] == [77396]
+
+
+def test_scrape_targets_one_per_date_covering_all_windows():
+    engine = subscriptions.MatchingEngine(
+        [ALICE, BOB],
+        {
+            "alice": [
+                TargetInterval(date="2125-01-01", start_time="18:00", end_time="20:00"),
+                TargetInterval(date="2125-01-02"),
+            ],
+            "bob": [
+                TargetInterval(date="2125-01-01", start_time="10:00", end_time="12:00"),
+                TargetInterval(date="2125-01-02", start_time="10:00", end_time="12:00"),
+            ],
+        },
+        has_time_overlap,
+    )
+
+    targets = engine.scrape_targets()
+
+    assert targets == [
+        TargetInterval(date="2125-01-01", start_time="10:00", end_time="20:00"),
+        TargetInterval(date="2125-01-02"),
+    ]
+
+
+def test_match_fans_out_by_window_and_court_preference():
+    engine = subscriptions.MatchingEngine(
+        [ALICE, BOB],
+        {
+            "alice": [TargetInterval(date="2125-01-01", start_time="18:00", end_time="20:00")],
+            "bob": [TargetInterval(date="2125-01-01")],
+        },
+        has_time_overlap,
+    )
+    new_slots = [
+        (
+            "2125-01-01",
+            [
+                Slot(time="10:15", courts=["Court 1"], court_ids=[77394], is_new=True),
+                Slot(time="18:00", courts=["Court 1", "Court 3"], court_ids=[77396, 77394], is_new=True),
+            ],
+        ),
+        ("2125-01-05", [Slot(time="18:00", courts=["Court 1"], court_ids=[77394], is_new=True)]),
+    ]
+
+    matched = engine.match(new_slots)
+
+    alice_slots = matched["alice"][0][1]
+    assert [s.time for s in alice_slots] == ["18:00"]
+    assert alice_slots[0].courts == ["Court 1", "Court 3"]
+    # Bob only wants Court 3 but any time
+    bob_slots = matched["bob"][0][1]
+    assert [(s.time, s.courts) for s in bob_slots] == [("18:00", ["Court 3"])]
+    # Nobody watches 2125-01-05
+    assert all(date != "2125-01-05" for data in matched.values() for date, _ in data)
+
+
+def test_merge_matches_unions_courts_across_subscribers():
+    matched = {
+        "alice": [("2125-01-01", [Slot(time="18:00", courts=["Court 3"], court_ids=[77396], is_new=True)])],
+        "bob": [
+            ("2125-01-01", [Slot(time="18:00", courts=["Court 1"], court_ids=[77394], is_new=True)]),
+            ("2125-01-02", [Slot(time="10:15", courts=["Court 1"], court_ids=[77394], is_new=True)]),
+        ],
+    }
+
+    merged = subscriptions.merge_matches(matched)
+
+    assert [(d, [(s.time, s.court_ids, s.courts) for s in slots]) for d, slots in merged] == [
+        ("2125-01-01", [("18:00", [77394, 77396], ["Court 1", "Court 3"])]),
+        ("2125-01-02", [("10:15", [77394], ["Court 1"])]),
+    ]
@@ -1,48 +1,215 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import MagicMock, patch
 
+import pytest
 import requests
 
 from eversports_scraper import telegram_notifier
 
 
-@patch("eversports_scraper.telegram_notifier.requests.post")
+@pytest.fixture(autouse=True)
+def reset_notifiers():
+    telegram_notifier._notifiers.clear()
+    yield
+    telegram_notifier._notifiers.clear()
+
+
+def _configure(mock_config, token="fake_token", chat_id="fake_chat_id"):
+    mock_config.TELEGRAM_BOT_TOKEN = token
+    mock_config.TELEGRAM_CHAT_ID = chat_id
+    mock_config.TELEGRAM_API_BASE = "https://api.telegram.org"
+    mock_config.TELEGRAM_MERGE_WINDOW_SECONDS = 0
+    mock_config.TELEGRAM_MIN_INTERVAL_SECONDS = 0
+    mock_config.TELEGRAM_TIMEOUT_SECONDS = 10
+    mock_config.NOTIFY_DEADLINE_SECONDS = 60
+
+
+def _response(status_code=200, json_data=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.json.return_value = json_data or {"ok": True}
+    response.raise_for_status.return_value = None
+    return response
+
+
+@patch("eversports_scraper.telegram_notifier.requests.Session")
 @patch("eversports_scraper.telegram_notifier.config")
-def test_send_telegram_message_success(mock_config, mock_post):
-    mock_config.TELEGRAM_BOT_TOKEN = "fake_token"
-    mock_config.TELEGRAM_CHAT_ID = "fake_chat_id"
+def test_send_telegram_message_success(mock_config, mock_session_cls):
+    _configure(mock_config)
 
-    mock_response = MagicMock()
-    mock_response.raise_for_status.return_value = None
-    mock_post.return_value = mock_response
+    mock_session = mock_session_cls.return_value
+    mock_session.post.return_value = _response()
 
-    telegram_notifier.send_telegram_message("Test message")
+    assert telegram_notifier.send_telegram_message("Test message") is True
 
-    mock_post.assert_called_once()
-    args, kwargs = mock_post.call_args
+    mock_session.post.assert_called_once()
+    args, kwargs = mock_session.post.call_args
     assert kwargs["json"]["text"] == "Test message"
     assert "fake_token" in args[0]
 
 
-@patch("eversports_scraper.telegram_notifier.requests.post")
+@patch("eversports_scraper.telegram_notifier.requests.Session")
 @patch("eversports_scraper.telegram_notifier.config")
-def test_send_telegram_message_missing_config(mock_config, mock_post):
+def test_send_telegram_message_missing_config(mock_config, mock_session_cls):
     mock_config.TELEGRAM_BOT_TOKEN = None
     mock_config.TELEGRAM_CHAT_ID = None
 
-    telegram_notifier.send_telegram_message("Test message")
+    assert telegram_notifier.send_telegram_message("Test message") is False
+
+    mock_session_cls.return_value.post.assert_not_called()
+
+
+@patch("eversports_scraper.telegram_notifier.time.sleep")
+@patch("eversports_scraper.telegram_notifier.requests.Session")
+@patch("eversports_scraper.telegram_notifier.config")
+def test_send_telegram_message_failure(mock_config, mock_session_cls, mock_sleep):
+    _configure(mock_config)
+
+    mock_session = mock_session_cls.return_value
+    mock_session.post.side_effect = requests.exceptions.RequestException("Network error")
+
+    # Should not raise exception, just log error after retrying
+    assert telegram_notifier.send_telegram_message("Test message") is False
 
-    mock_post.assert_not_called()
+    assert mock_session.post.call_count == 4
 
 
-@patch("eversports_scraper.telegram_notifier.requests.post")
+@patch("eversports_scraper.telegram_notifier.requests.Session")
 @patch("eversports_scraper.telegram_notifier.config")
-def test_send_telegram_message_failure(mock_config, mock_post):
-    mock_config.TELEGRAM_BOT_TOKEN = "fake_token"
-    mock_config.TELEGRAM_CHAT_ID = "fake_chat_id"
+def test_session_is_reused(mock_config, mock_session_cls):
+    _configure(mock_config)
+    mock_session_cls.return_value.post.return_value = _response()
+
+    telegram_notifier.send_telegram_message("one")
+    telegram_notifier.send_telegram_message("two")
+
+    mock_session_cls.assert_called_once()
+    assert mock_session_cls.return_value.post.call_count == 2
+
+
+@patch("eversports_scraper.telegram_notifier.time.sleep")
+@patch("eversports_scraper.telegram_notifier.requests.Session")
+def test_notifier_honours_retry_after(mock_session_cls, mock_sleep):
+    mock_session = mock_session_cls.return_value
+    mock_session.post.side_effect = [
+        _response(429, {"ok": False, "parameters": {"retry_after": 7}}),
+        _response(),
+    ]
+
+    notifier = telegram_notifier.TelegramNotifier("token", min_interval=0)
+    notifier.enqueue("chat", "hello")
+
+    assert notifier.flush() is True
+    mock_sleep.assert_any_call(7.0)
+    assert mock_session.post.call_count == 2
+
+
+@patch("eversports_scraper.telegram_notifier.requests.Session")
+def test_notifier_merges_burst_for_same_chat(mock_session_cls):
+    mock_session = mock_session_cls.return_value
+    mock_session.post.return_value = _response()
+
+    notifier = telegram_notifier.TelegramNotifier("token", merge_window=60, min_interval=0)
+    notifier.enqueue("chat", "first")
+    notifier.enqueue("chat", "second")
+    notifier.enqueue("other", "third")
+    notifier.flush()
+
+    assert mock_session.post.call_count == 2
+    first_payload = mock_session.post.call_args_list[0].kwargs["json"]
+    assert first_payload["text"] == "first\n\nsecond"
+    assert mock_session.post.call_args_list[1].kwargs["json"]["chat_id"] == "other"
+
+
+@patch("eversports_scraper.telegram_notifier.time.sleep")
+@patch("eversports_scraper.telegram_notifier.requests.Session")
+def test_deliver_merges_messages_queued_within_the_window(mock_session_cls, mock_sleep):
+    mock_session = mock_session_cls.return_value
+    mock_session.post.return_value = _response()
+    notifier = telegram_notifier.TelegramNotifier("token", merge_window=60, min_interval=0)
+
+    # Queued by another caller while this one waits out the window
+    first = notifier.enqueue("chat", "first")
+    assert notifier.deliver("chat", "second", deadline=time.monotonic() + 5) is True
+
+    mock_session.post.assert_called_once()
+    assert mock_session.post.call_args.kwargs["json"]["text"] == "first\n\nsecond"
+    assert first.sent is True
+
+
+@patch("eversports_scraper.telegram_notifier.time.sleep")
+@patch("eversports_scraper.telegram_notifier.requests.Session")
+def test_retry_after_past_the_deadline_gives_up(mock_session_cls, mock_sleep):
+    mock_session_cls.return_value.post.return_value = _response(429, {"ok": False, "parameters": {"retry_after": 600}})
+    notifier = telegram_notifier.TelegramNotifier("token", min_interval=0)
+    notifier.enqueue("chat", "hello")
+
+    assert notifier.flush(deadline=time.monotonic() + 30) is False
+    mock_sleep.assert_not_called()
+
+
+@patch("eversports_scraper.telegram_notifier.time.sleep")
+@patch("eversports_scraper.telegram_notifier.requests.Session")
+def test_retry_resends_only_unsent_chunks(mock_session_cls, mock_sleep):
+    mock_session = mock_session_cls.return_value
+    bad_request = requests.exceptions.HTTPError(response=MagicMock(status_code=400))
+    failing = _response()
+    failing.raise_for_status.side_effect = bad_request
+    mock_session.post.side_effect = [_response(), failing, _response(), _response()]
+    notifier = telegram_notifier.TelegramNotifier("token", min_interval=0)
+    long_day = "*2125-01-01*:\n" + "\n".join(f"  - slot {i}" for i in range(500))
+    other_day = "*2125-01-02*:\n  - 10:15 (Court 1)"
+
+    # The second of the long message's two chunks fails
+    long_message = notifier.enqueue("chat", long_day)
+    assert notifier.flush() is False
+    assert long_message.sent is False
+    sent_first = mock_session.post.call_args_list[0].kwargs["json"]["text"]
+
+    notifier.enqueue("chat", long_day)
+    notifier.enqueue("chat", other_day)
+    assert notifier.flush() is True
+    texts = [c.kwargs["json"]["text"] for c in mock_session.post.call_args_list]
+    assert texts.count(sent_first) == 1
+    assert len(texts) == 4 and texts[-1] == other_day
+
+
+@patch("eversports_scraper.telegram_notifier.requests.Session")
+def test_shared_notifier_sends_each_message_once_across_threads(mock_session_cls):
+    mock_session = mock_session_cls.return_value
+    mock_session.post.side_effect = lambda *args, **kwargs: time.sleep(0.01) or _response()
+    notifier = telegram_notifier.TelegramNotifier("token", merge_window=0, min_interval=0)
+    chats = [f"chat{i}" for i in range(8)]
+
+    with ThreadPoolExecutor(max_workers=len(chats)) as executor:
+        results = list(executor.map(lambda chat: notifier.deliver(chat, f"hello {chat}"), chats))
+
+    assert results == [True] * len(chats)
+    texts = sorted(c.kwargs["json"]["text"] for c in mock_session.post.call_args_list)
+    assert texts == sorted(f"hello {chat}" for chat in chats)
+
+
+def test_split_message_short_message_untouched():
+    assert telegram_notifier.split_message("hello") == ["hello"]
+
+
+def test_split_message_at_date_boundaries():
+    day1 = "*2025-01-01*:\n" + "\n".join(f"  - 10:{i:02d} (Court 1)" for i in range(10))
+    day2 = "*2025-01-02*:\n" + "\n".join(f"  - 11:{i:02d} (Court 2)" for i in range(10))
+    message = f"Header\n\n{day1}\n{day2}"
+
+    chunks = telegram_notifier.split_message(message, limit=len(day1) + 20)
+
+    assert all(len(c) <= len(day1) + 20 for c in chunks)
+    assert any(c.startswith("*2025-01-02*:") for c in chunks)
+    assert "\n".join(chunks).count("Court") == 20
+
 
-    mock_post.side_effect = requests.exceptions.RequestException("Network error")
+def test_split_message_oversized_block_split_by_lines():
+    block = "*2025-01-01*:\n" + "\n".join(f"  - slot {i}" for i in range(100))
 
-    # Should not raise exception, just log error
-    telegram_notifier.send_telegram_message("Test message")
+    chunks = telegram_notifier.split_message(block, limit=100)
 
-    mock_post.assert_called_once()
+    assert all(len(c) <= 100 for c in chunks)
+    assert sum(c.count("slot") for c in chunks) == 100